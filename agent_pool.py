@@ -0,0 +1,150 @@
+"""
+Warm pool of agent templates for project sessions.
+A template holds everything about an agent that does not depend on the
+project: system message, LLM route, tool schemas and executor-wrapped tool
+functions. Templates are built once per process (on first use or by
+warm()); sessions then only construct the agent object, or take a spare
+one that was constructed ahead of time in the background.
+"""
+import importlib
+import inspect
+import threading
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional
+
+from autogen.function_utils import get_function_schema
+from autogen.agentchat.contrib.agent_with_tool_calling import AgentWithToolCalling
+
+
+def _is_termination_msg(message: Dict[str, Any]) -> bool:
+    return (message.get("content") or "").rstrip().endswith("TERMINATE")
+
+
+class AgentTemplate:
+    """Session-independent parts of one agent from agents_config.yaml."""
+
+    def __init__(self, name: str, system_message: str, llm_config: Dict[str, Any],
+                 tool_schemas: List[Dict[str, Any]], tools: Dict[str, Callable]):
+        self.name = name
+        self.system_message = system_message
+        self.llm_config = llm_config
+        self.tool_schemas = tool_schemas
+        # Executor-wrapped tool functions by name (see ToolExecutor.wrap_tool)
+        self.tools = tools
+
+    def build(self):
+        """Constructs a new agent with the tool schemas already in its LLM config."""
+        llm_config = dict(self.llm_config)
+        if self.tool_schemas:
+            llm_config["tools"] = list(self.tool_schemas)
+        return AgentWithToolCalling(
+            name=self.name,
+            system_message=self.system_message,
+            llm_config=llm_config,
+            is_termination_msg=_is_termination_msg,
+        )
+
+
+class AgentPool:
+    """
+    Agent templates and spare, never-used agents per name.
+
+    Agents are not returned to the pool after a session: hooks and
+    histories are bound to their project, so every session gets fresh
+    instances, and refill() constructs replacements off the request path.
+    """
+
+    def __init__(self, agent_configs: Dict[str, Dict[str, Any]], llm_config_for: Callable[[str], Dict[str, Any]],
+                 wrap_tool: Callable[[Callable], Callable], spares: int = 1, tools_module: str = "tools"):
+        self.agent_configs = agent_configs
+        self.llm_config_for = llm_config_for
+        self.wrap_tool = wrap_tool
+        self.spares = max(0, spares)
+        self.tools_module = tools_module
+        self.templates: Dict[str, AgentTemplate] = {}
+        self.hits = 0
+        self.misses = 0
+        self._spare: Dict[str, List[Any]] = {}
+        self._lock = threading.RLock()
+        self._refilling: Optional[threading.Thread] = None
+
+    def template(self, name: str) -> AgentTemplate:
+        """Returns the template of an agent, building it on first use."""
+        with self._lock:
+            template = self.templates.get(name)
+            if template is None:
+                template = self.templates[name] = self._build_template(name)
+            return template
+
+    def _build_template(self, name: str) -> AgentTemplate:
+        config = self.agent_configs[name]
+        # tools.py pulls in the service client modules, so it is imported with the first template
+        tools = importlib.import_module(self.tools_module)
+        schemas, wrapped = [], {}
+        for tool_name in config.get('skills', []):
+            tool_func = getattr(tools, tool_name, None)
+            if tool_func is None:
+                logger.warning(f"Tool '{tool_name}' not found in tools.py for agent '{name}'")
+                continue
+            schemas.append(get_function_schema(tool_func, name=tool_name,
+                                               description=inspect.getdoc(tool_func) or tool_name))
+            wrapped[tool_name] = self.wrap_tool(tool_func)
+        return AgentTemplate(name, config['system_message'], self.llm_config_for(name), schemas, wrapped)
+
+    def acquire(self, name: str):
+        """
+        Returns a new agent for a session: a spare one if available, else freshly built.
+
+        Args:
+            name: Agent name from agents_config.yaml.
+        """
+        template = self.template(name)
+        with self._lock:
+            spare = self._spare.get(name)
+            if spare:
+                self.hits += 1
+                return spare.pop()
+            self.misses += 1
+        return template.build()
+
+    def refill(self):
+        """Builds all templates and constructs spare agents up to `spares` per name."""
+        for name in self.agent_configs:
+            template = self.template(name)
+            while True:
+                with self._lock:
+                    if len(self._spare.setdefault(name, [])) >= self.spares:
+                        break
+                agent = template.build()
+                with self._lock:
+                    self._spare[name].append(agent)
+
+    def warm(self, background: bool = True):
+        """
+        Refills the pool, in a daemon thread unless `background` is False.
+
+        Calls while a background refill is running are ignored.
+        """
+        if not background:
+            self.refill()
+            return
+        with self._lock:
+            if self._refilling and self._refilling.is_alive():
+                return
+            self._refilling = threading.Thread(target=self._refill_logged, name="aria-agent-pool", daemon=True)
+            self._refilling.start()
+
+    def _refill_logged(self):
+        try:
+            self.refill()
+        except Exception as e:
+            logger.warning(f"Agent pool refill failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "templates": len(self.templates),
+                "spares": sum(len(agents) for agents in self._spare.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
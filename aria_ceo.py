@@ -10,6 +10,9 @@ Changes:
 3. **NEW:** Integrated persistent conversation memory using diskcache for all agents.
 """
 
+import time
+_IMPORTS_STARTED = time.perf_counter()
+
 import os
 import asyncio
 import json
@@ -17,34 +20,33 @@ from datetime import datetime
 from pathlib import Path
 from loguru import logger
 import yaml
-import time
-import websockets
+from contextlib import nullcontext
 
-from autogen import AssistantAgent, GroupChat, GroupChatManager, ConversableAgent
-from autogen.agentchat.contrib.agent_with_tool_calling import AgentWithToolCalling
+from autogen import Agent, AssistantAgent, GroupChat, GroupChatManager, ConversableAgent
 
 # Import Memory Manager
 from memory_manager import MemoryManager
-import tools
-
-# Import integrations
-from integrations.github_integration import GitHubIntegration
-from integrations.dockerhub_integration import DockerHubIntegration
+from context_manager import ContextManager
+from llm_router import LLMRouter
+from dashboard_stream import DashboardStreamer
+from token_stream import TokenStreamer
+from slack_status import SlackStatus
+from project_session import ProjectSession, ProjectScheduler
+from executors import ToolExecutor, ToolDispatcher
+from code_extractor import StreamingCodeExtractor
+from llm_cache import LLMResponseCache
+from speaker_selection import build_speaker_selection
+from convergence import ConvergenceMonitor
+from instrumentation import Instrumentation, StartupReport
+from checkpoint import CheckpointStore, STAGES
+from clients import registry as client_registry
+from mongo_writer import writer as mongo_writer
+from agent_pool import AgentPool
+from model_residency import ModelResidency
+from ollama_client import OllamaClient, OllamaModelClient
 
-# Import utilities (to be created)
-try:
-    from utils.code_file_generator import CodeFileGenerator
-    CODE_GEN_AVAILABLE = True
-except ImportError:
-    CODE_GEN_AVAILABLE = False
-    logger.warning("Code file generator not available")
-
-try:
-    from utils.llm_monitor import LLMMonitor
-    LLM_MONITOR_AVAILABLE = True
-except ImportError:
-    LLM_MONITOR_AVAILABLE = False
-    logger.warning("LLM monitor not available")
+# tools.py, the GitHub/Docker Hub integrations and websockets are imported on first use
+IMPORT_SECONDS = time.perf_counter() - _IMPORTS_STARTED
 
 
 class AriaCEO:
@@ -53,62 +55,171 @@ class AriaCEO:
     Memory Edition
     """
     
-  def __init__(self, slack_client=None):, slack_client=None):
+    def __init__(self, slack_client=None, config=None):
         self.version = "6.3-memory-edition"
-        self.slack_client = slack_client
-        self.current_channel = None
         logger.info(f"Initializing Aria CEO - Version {self.version}")
+        self.startup = StartupReport()
+        self.startup.add('imports', IMPORT_SECONDS)
         
-        # Slack client for status updates (HOTFIX)
+        # Slack client for status updates (HOTFIX); the channel is bound per project session
         self.slack_client = slack_client
-        self.current_channel = None
         
-        # Load config
-        self.config = self._load_config()
+        # Load config (an explicit dict replaces config.yaml, e.g. for benchmarks)
+        with self.startup.phase('config'):
+            self.config = config if config is not None else self._load_config()
         
-        # Initialize Database Configuration
+        # Initialize Database Configuration (shared, pooled clients for tools.py)
         self.db_config = self.config.get('database', {})
+        client_registry.configure(self.config)
+        
+        # GitHub and Docker Hub integrations are built on first use (see the properties below)
+        self._github = None
+        self._dockerhub = None
         
-        # Initialize GitHub integration
-        github_config = self.config.get('github', {})
-        self.github = GitHubIntegration(github_config)
+        # Thread/process pools for blocking tools and integrations
+        with self.startup.phase('executors'):
+            self.executor = ToolExecutor(self.config.get('executors', {}), client_config=self.config)
+            # Concurrent execution of the tool calls within one agent turn
+            self.tool_dispatcher = ToolDispatcher(self.config.get('executors', {}))
         
-        # Initialize Docker Hub integration
-        dockerhub_config = self.config.get('docker_hub', {})
-        self.dockerhub = DockerHubIntegration(dockerhub_config)
+        # Per-round latency/token metrics (Prometheus endpoint) and per-project JSON traces
+        metrics_config = self.config.get('metrics', {})
+        with self.startup.phase('instrumentation'):
+            self.instrumentation = Instrumentation(metrics_config) if metrics_config.get('enabled', True) else None
         
-        # Initialize LLM Monitor
-        if LLM_MONITOR_AVAILABLE:
-            self.llm_monitor = LLMMonitor(self.config.get('llm', {}))
-        else:
-            self.llm_monitor = None
+        # One progress message per project, edited in place in the background (coalesced, rate limited)
+        self.slack_status = SlackStatus(self.slack_client, self.config.get('slack', {}))
         
         # WebSocket connection for dashboard broadcasts
         self.ws_url = self.config.get('dashboard', {}).get('websocket_url', 'ws://192.168.178.150:8090/ws')
         self.ws_connection = None
         
-        # Initialize Memory Manager
-        self.memory_manager = MemoryManager()
+        # Initialize Memory Manager (append-only, segmented log per agent)
+        memory_config = self.config.get('memory', {})
+        self.memory_manager = MemoryManager(
+            cache_dir=memory_config.get('cache_dir', '/tmp/aria_agent_memory'),
+            segment_size=memory_config.get('segment_size', 50),
+        )
+        self.memory_compact_keep_last = memory_config.get('compact_keep_last')
+        
+        # Generated projects are written here while the chat runs
+        self.projects_dir = Path(self.config.get('projects', {}).get('base_dir', '/opt/aria-system/projects'))
+        
+        # Token-budgeted windowing of loaded memory (recent verbatim + rolling summary)
+        self.context_manager = ContextManager(self.memory_manager, self.config.get('context', {}))
+        
+        # Per-agent LLM routing across Ollama hosts (resolved once per agent)
+        ollama_config = self.config.get('ollama_client', {})
+        use_ollama_client = ollama_config.get('enabled', True)
+        self.llm_router = LLMRouter(self.config.get('llm', {}),
+                                    model_client_cls="OllamaModelClient" if use_ollama_client else None)
+        # Pooled streaming Ollama client, one connection pool and slot semaphore per host
+        self.ollama = OllamaClient(self.llm_router.hosts, ollama_config) if use_ollama_client else None
+        self._llm_configs = {}
+        
+        # Resident models per Ollama host: swap-aware call gating and speaker preference
+        self.residency_config = self.config.get('model_residency', {})
+        self.residency = None
+        if self.residency_config.get('enabled', True):
+            self.residency = ModelResidency(self.llm_router, self.residency_config,
+                                            on_swap=self._record_swap).start()
+        
+        # Optional response cache for replayed/resumed projects
+        cache_config = self.config.get('llm_cache', {})
+        self.llm_cache = None
+        self.llm_cache_agents = cache_config.get('agents', 'all')
+        if cache_config.get('enabled', False):
+            self.llm_cache = LLMResponseCache(
+                directory=cache_config.get('directory', '/tmp/aria_llm_cache'),
+                size_limit_mb=cache_config.get('size_limit_mb', 1024),
+                ttl_seconds=cache_config.get('ttl_seconds', 7 * 24 * 3600),
+            )
+        
+        # Per-round checkpoints so interrupted projects can be resumed
+        checkpoint_config = self.config.get('checkpoints', {})
+        self.checkpoints = None
+        if checkpoint_config.get('enabled', True):
+            self.checkpoints = CheckpointStore(
+                directory=checkpoint_config.get('directory', '/tmp/aria_checkpoints'),
+                segment_size=memory_config.get('segment_size', 50),
+                every_n_rounds=checkpoint_config.get('every_n_rounds', 1),
+            )
+        
+        # Completed projects' READMEs are added to Riley's knowledge base (see knowledge_base.py)
+        self.kb_ingest_on_complete = self.config.get('knowledge_base', {}).get('ingest_on_complete', True)
+        self._background_tasks = set()
+        
+        # Key events go to MongoDB through the buffered writer (batched, spills when offline)
+        self.log_events = self.config.get('mongo_logging', {}).get('events', True)
         
         # Load agent configurations
-        self.agent_configs = self._load_agent_configs()
+        with self.startup.phase('agent_configs'):
+            self.agent_configs = self._load_agent_configs()
+        
+        # Agent templates (prompt, LLM route, tool schemas) shared by all sessions,
+        # plus spare agents constructed ahead of time in the background
+        pool_config = self.config.get('agent_pool', {})
+        self.agent_pool = AgentPool(
+            self.agent_configs,
+            self._get_llm_config,
+            self.executor.wrap_tool,
+            spares=pool_config.get('spares', 1),
+        )
         
-        # Create agents
-        self._create_agents()
+        # Project sessions: each project gets its own agents, GroupChat and channel
+        session_config = self.config.get('sessions', {})
+        self.shared_memory = session_config.get('shared_memory', False)
+        host_limits = {
+            host_key: host.get('max_projects', 1)
+            for host_key, host in self.llm_router.hosts.items()
+        }
+        self.scheduler = ProjectScheduler(host_limits, session_config.get('max_projects'))
+        self.sessions = {}
         
-        # Create group chat with free communication
-        self._create_group_chat()
+        if pool_config.get('warm_on_start', True):
+            self.agent_pool.warm(background=True)
         
         logger.info(f"Aria CEO initialized - Version {self.version}")
+        logger.info(self.startup.report())
+        if self.instrumentation:
+            self.instrumentation.record_startup(self.startup)
         logger.info("✨ Features enabled:")
-        logger.info("  ✅ GitHub Integration" if self.github.enabled else "  ❌ GitHub Integration")
-        logger.info("  ✅ Docker Hub Integration" if self.dockerhub.enabled else "  ❌ Docker Hub Integration")
+        logger.info("  ✅ GitHub Integration (on first use)" if self.config.get('github', {}).get('enabled')
+                    else "  ❌ GitHub Integration")
+        logger.info("  ✅ Docker Hub Integration (on first use)" if self.config.get('docker_hub', {}).get('enabled')
+                    else "  ❌ Docker Hub Integration")
         logger.info("  ✅ Free Worker Communication")
-        logger.info("  ✅ LLM Monitoring" if self.llm_monitor else "  ❌ LLM Monitoring")
+        logger.info("  ✅ LLM Monitoring" if self.instrumentation else "  ❌ LLM Monitoring")
         logger.info("  ✅ Dashboard Broadcasts")
         logger.info("  ✅ Persistent Agent Memory")
+        logger.info("  ✅ Concurrent Project Sessions")
+        logger.info("  ✅ Checkpoint & Resume" if self.checkpoints else "  ❌ Checkpoint & Resume")
         logger.info("  ❌ Clarification Questions (DISABLED)")
     
+    @property
+    def github(self):
+        """GitHub integration, imported and built on first access"""
+        if self._github is None:
+            from integrations.github_integration import GitHubIntegration
+            self._github = GitHubIntegration(self.config.get('github', {}))
+        return self._github
+    
+    @github.setter
+    def github(self, integration):
+        self._github = integration
+    
+    @property
+    def dockerhub(self):
+        """Docker Hub integration, imported and built on first access"""
+        if self._dockerhub is None:
+            from integrations.dockerhub_integration import DockerHubIntegration
+            self._dockerhub = DockerHubIntegration(self.config.get('docker_hub', {}))
+        return self._dockerhub
+    
+    @dockerhub.setter
+    def dockerhub(self, integration):
+        self._dockerhub = integration
+    
     def _load_config(self):
         """Load configuration"""
         config_path = Path("/opt/aria-system/config/config.yaml")
@@ -127,38 +238,50 @@ class AriaCEO:
         logger.error("agents_config.yaml not found!")
         return {}
     
-    def _get_llm_config(self):
-        """Get LLM configuration for agents"""
-        llm_config = self.config.get('llm', {})
-        config_list = []
-        
-        # Mac Mini server
-        mac_mini = llm_config.get('mac_mini', {})
-        if mac_mini:
-            config_list.append({
-                "model": mac_mini.get('models', {}).get('aria', 'llama3.1:8b'),
-                "base_url": f"http://{mac_mini.get('host', '192.168.178.159')}:{mac_mini.get('port', 11434)}/v1",
-                "api_key": "ollama",
-            })
-        
-        # GMKTec server (if available)
-        gmktec = llm_config.get('gmktec', {})
-        if gmktec:
-            config_list.append({
-                "model": gmktec.get('models', {}).get('sam', 'qwen2.5-coder:32b'),
-                "base_url": f"http://{gmktec.get('host', '192.168.178.155')}:{gmktec.get('port', 11434)}/v1",
-                "api_key": "ollama",
-            })
-        
-        return {
-            "config_list": config_list,
-            "timeout": 600,
-            "temperature": 0.7,
-        }
+    def _get_llm_config(self, agent_name=None):
+        """
+        Get LLM configuration for an agent
+
+        Each agent is routed to its own host and model with an ordered
+        fallback chain (see llm_router.py). Without an agent name, the
+        GroupChatManager route is returned.
+        """
+        agent_name = agent_name or "GroupChatManager"
+        if agent_name not in self._llm_configs:
+            llm_config = self.llm_router.llm_config_for(agent_name)
+            # AutoGen's built-in cache is replaced by llm_cache.py (see _install_llm_cache)
+            llm_config["cache_seed"] = None
+            self._llm_configs[agent_name] = llm_config
+        return self._llm_configs[agent_name]
+    
+    def _record_swap(self, project_id, host, model):
+        if self.instrumentation:
+            self.instrumentation.record_swap(project_id, host, model)
+    
+    def _register_model_client(self, agent, project_id, on_delta=None):
+        """Back an agent's config_list entries with the pooled Ollama client (streaming to on_delta)"""
+        if self.ollama:
+            agent.register_model_client(OllamaModelClient, client=self.ollama, on_delta=on_delta,
+                                        residency=self.residency, project_id=project_id)
+    
+    def _install_residency(self, agent, project_id, llm_config):
+        """Gate AutoGen's own client through model residency; the Ollama client gates every route itself"""
+        if self.residency and not self.ollama:
+            self.residency.install(agent, project_id, llm_config)
+    
+    def _install_llm_cache(self, agent, agent_name):
+        """Put the response cache in front of an agent's LLM client if enabled for it"""
+        if not self.llm_cache:
+            return
+        if self.llm_cache_agents != 'all' and agent_name not in self.llm_cache_agents:
+            return
+        self.llm_cache.install(agent, self._get_llm_config(agent_name))
 
-    def _load_agent_memory(self, agent: ConversableAgent):
+    def _load_agent_memory(self, session, agent: ConversableAgent):
         """Loads conversation history from the MemoryManager and sets it to the agent."""
-        messages = self.memory_manager.get_memory(agent.name)
+        model = self.llm_router.assignments.get(agent.name, (None, None))[1]
+        key = session.memory_key(agent.name)
+        messages = self.context_manager.build(key, model)
         if messages:
             # AutoGen agents store messages in the _oai_messages attribute
             # We need to set the messages for the specific receiver (the agent itself)
@@ -166,117 +289,209 @@ class AriaCEO:
             # Note: For AssistantAgent, we use _oai_messages to inject prior history.
             if isinstance(agent, AssistantAgent):
                 agent._oai_messages[agent] = messages
+                session.memory_saved[key] = len(messages)
                 logger.info(f"Loaded {len(messages)} messages for agent {agent.name}")
+    
+    def _persist_new_messages(self, session, name, messages):
+        """Appends only the messages not yet persisted for `name` to its memory log."""
+        key = session.memory_key(name)
+        saved = session.memory_saved.get(key, 0)
+        if len(messages) < saved:
+            # The in-memory history was reset; everything in it is new
+            saved = 0
+        new_messages = messages[saved:]
+        self.memory_manager.append_messages(key, new_messages)
+        session.memory_saved[key] = len(messages)
+        if self.memory_compact_keep_last:
+            self.memory_manager.compact(key, self.memory_compact_keep_last)
+        return new_messages
             
-    def _save_agent_memory(self, agent: ConversableAgent):
+    def _save_agent_memory(self, session, agent: ConversableAgent):
         """Saves the conversation history of the agent to the MemoryManager."""
         if isinstance(agent, AssistantAgent):
             # The agent's own history is stored under the key (agent, None)
             messages = agent._oai_messages.get(agent, [])
             if messages:
-                self.memory_manager.save_memory(agent.name, messages)
-                logger.debug(f"Saved {len(messages)} messages for agent {agent.name}.")
+                new_messages = self._persist_new_messages(session, agent.name, messages)
+                logger.debug(f"Saved {len(new_messages)} new messages for agent {agent.name}.")
 
-    def _save_group_chat_memory(self):
+    def _save_group_chat_memory(self, session):
         """Saves the conversation history of the GroupChat to the MemoryManager."""
         # The GroupChat object holds the messages for the entire conversation
-        if self.group_chat.messages:
-            self.memory_manager.save_memory("GroupChat", self.group_chat.messages)
-            logger.info(f"Saved {len(self.group_chat.messages)} messages for GroupChat.")
+        if session.group_chat.messages:
+            new_messages = self._persist_new_messages(session, "GroupChat", session.group_chat.messages)
+            logger.info(f"Saved {len(new_messages)} new messages for GroupChat.")
             
-    def _load_group_chat_memory(self):
+    def _load_group_chat_memory(self, session):
         """Loads the conversation history for the GroupChat."""
-        messages = self.memory_manager.get_memory("GroupChat")
+        # Every agent sees the GroupChat history, so use the smallest budget among them
+        models = [model for _, model in self.llm_router.assignments.values()]
+        model = min(models, key=self.context_manager.budget_for) if models else None
+        key = session.memory_key("GroupChat")
+        messages = self.context_manager.build(key, model, summary_name="Aria")
         if messages:
-            self.group_chat.messages = messages
+            session.group_chat.messages = messages
+            session.memory_saved[key] = len(messages)
             logger.info(f"Loaded {len(messages)} messages into GroupChat.")
     
-    def _create_agents(self):
-        """Create all team agents with free communication instructions and load memory"""
-        llm_config = self._get_llm_config()
-        
-        self.agents = {}
-        for agent_name, config in self.agent_configs.items():
-            system_message = config['system_message']
-            
-            # Use AgentWithToolCalling to enable tool use
-            agent = AgentWithToolCalling(
-                name=agent_name,
-                system_message=system_message,
-                llm_config=llm_config,
-                is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
+    def _create_session(self, project_id, channel):
+        """Create an isolated project session with its own agents, GroupChat and channel"""
+        dashboard_config = self.config.get('dashboard', {})
+        session = ProjectSession(
+            project_id,
+            channel=channel,
+            memory_namespace=None if self.shared_memory else project_id,
+            # Live chat streaming to the dashboard (bounded, batched)
+            dashboard_stream=DashboardStreamer(
+                self._broadcast_to_dashboard,
+                max_queue=dashboard_config.get('stream_queue_size', 500),
+                batch_size=dashboard_config.get('stream_batch_size', 20),
+                flush_interval=dashboard_config.get('stream_flush_interval', 0.25),
+            ),
+        )
+        # Token deltas of replies being generated (needs the streaming Ollama client)
+        if self.ollama and dashboard_config.get('stream_tokens', True):
+            session.token_stream = TokenStreamer(
+                self._broadcast_to_dashboard,
+                slack=self.slack_status if dashboard_config.get('slack_live_edit', True) else None,
+                channel=channel,
+                flush_interval=dashboard_config.get('delta_flush_interval', 0.1),
+                slack_interval=dashboard_config.get('slack_edit_interval', 2.0),
+                max_buffer=dashboard_config.get('delta_buffer_chars', 8192),
+                slack_max_chars=dashboard_config.get('slack_max_chars', 3000),
             )
+        # Deliverables are extracted from each message as it is produced
+        session.project_dir = self.projects_dir / project_id
+        session.project_dir.mkdir(parents=True, exist_ok=True)
+        session.code_extractor = StreamingCodeExtractor(session.project_dir)
+        
+        self._create_agents(session)
+        self._create_group_chat(session)
+        return session
+    
+    def _create_agents(self, session):
+        """Create all team agents from the pool templates; memory is loaded before each agent's first reply"""
+        for agent_name in self.agent_configs:
+            template = self.agent_pool.template(agent_name)
+            agent = self.agent_pool.acquire(agent_name)
+            self._register_model_client(
+                agent, session.project_id,
+                session.token_stream.make_callback(agent_name) if session.token_stream else None)
             
-            # Register tools based on the YAML configuration
-            for tool_name in config.get('skills', []):
-                if hasattr(tools, tool_name):
-                    tool_func = getattr(tools, tool_name)
-                    
-                    # Special handling for tools that need DB config
-                    # We set environment variables here, which tools.py will read
-                    if tool_name == 'queue_task':
-                        redis_conf = self.db_config.get('redis', {})
-                        if redis_conf:
-                            os.environ['REDIS_HOST'] = redis_conf.get('host', '')
-                            os.environ['REDIS_PORT'] = str(redis_conf.get('port', 6379))
-                    
-                    if tool_name == 'log_test_result_to_mongo':
-                        mongo_conf = self.db_config.get('mongodb', {})
-                        if mongo_conf:
-                            os.environ['MONGO_URI'] = f"mongodb://{mongo_conf.get('host')}:{mongo_conf.get('port')}/"
-                            os.environ['MONGO_DB_NAME'] = mongo_conf.get('database', 'aria_logs')
-                            
-                    agent.register_for_llm(tool_func)
-                    agent.register_for_exec(tool_func)
-                    logger.info(f"Tool '{tool_name}' registered for agent '{agent_name}'")
-                else:
-                    logger.warning(f"Tool '{tool_name}' not found in tools.py for agent '{agent_name}'")
+            # Tool schemas come with the template's LLM config; bind the executables per session
+            if template.tools:
+                function_map = dict(template.tools)
+                if self.instrumentation:
+                    function_map = {
+                        name: self.instrumentation.wrap_tool(func, session.project_id, agent_name)
+                        for name, func in function_map.items()
+                    }
+                agent.register_function(function_map)
+                # Independent tool calls of one turn run concurrently, results in call order
+                agent.register_reply([Agent, None], self.tool_dispatcher.make_reply(), position=0,
+                                     ignore_async_in_sync_chat=True)
+            
+            # Innermost: cache hits never wait for a model swap
+            self._install_residency(agent, session.project_id, template.llm_config)
+            self._install_llm_cache(agent, agent_name)
+            if self.instrumentation:
+                self.instrumentation.install_llm(agent, session.project_id, template.llm_config)
             
-            # Load memory for the agent
-            self._load_agent_memory(agent)
+            # Stream every outgoing message to the dashboard as it is produced
+            agent.register_hook("process_message_before_send", session.dashboard_stream.make_hook())
+            if session.token_stream:
+                # The sent message completes the agent's streamed turn
+                agent.register_hook("process_message_before_send", session.token_stream.make_hook())
+            # Write "# File: ..." code blocks to the project directory as they appear
+            agent.register_hook("process_message_before_send", session.code_extractor.make_hook())
             
-            # Store agent in the instance
-            setattr(self, agent_name.lower(), agent)
-            self.agents[agent_name] = agent
+            # Registered last so it runs first: load memory when the agent is about to reply
+            agent.register_reply([Agent, None], self._make_memory_loader(session, agent), position=0)
             
-        # Assign agents to instance variables for backward compatibility
-        self.aria = self.agents['Aria']
-        self.sam = self.agents['Sam']
-        self.jordan = self.agents['Jordan']
-        self.taylor = self.agents['Taylor']
-          self.alex = self.agents['Alex']
-        self.riley = self.agents['Riley']
-        # self.casey = self.agents['Casey'] # Removed Casey for optimization
-        
-        logger.info(f"All {len(self.agents)} agents created successfully and memory loaded")
-    
-    def _create_group_chat(self):
+            session.agents[agent_name] = agent
+        
+        # Replace the spare agents this session used, off the request path
+        self.agent_pool.warm(background=True)
+        logger.info(f"All {len(session.agents)} agents created for {session.project_id} "
+                    f"(pool: {self.agent_pool.stats()})")
+    
+    def _make_memory_loader(self, session, agent):
+        """Reply function that loads an agent's memory once, before its first reply"""
+        def load_memory(recipient, messages=None, sender=None, config=None):
+            if agent.name not in session.memory_loaded:
+                session.memory_loaded.add(agent.name)
+                # A restored checkpoint already brought the agent's history back
+                if session.memory_key(agent.name) not in session.memory_saved and not agent._oai_messages.get(agent):
+                    self._load_agent_memory(session, agent)
+            return False, None
+        return load_memory
+    
+    def _create_group_chat(self, session):
         """Create group chat with free communication and load memory"""
         
         # All agents in the team (dynamically loaded)
-        agents = list(self.agents.values())
+        agents = list(session.agents.values())
+        
+        # Rule-based selection (direct addresses, hand-offs) falls back to the
+        # manager's LLM only when ambiguous; see speaker_selection.py
+        group_chat_config = self.config.get('group_chat', {})
+        session.speaker_selection = build_speaker_selection(
+            group_chat_config.get('speaker_selection', 'rule_based'),
+            self.agent_configs,
+            residency=self.residency if self.residency_config.get('prefer_resident', True) else None,
+            max_preferred_streak=self.residency_config.get('max_preferred_streak', 3),
+        )
         
         # Free communication: any agent can speak at any time
-        self.group_chat = GroupChat(
+        session.group_chat = GroupChat(
             agents=agents,
             messages=[],
-            max_round=250,  # Increased for complex projects
-            speaker_selection_method="auto",  # Let agents decide who speaks next
+            max_round=group_chat_config.get('max_round', 250),  # Increased for complex projects
+            speaker_selection_method=session.speaker_selection,
             allow_repeat_speaker=True,  # Allow multiple messages from same agent
         )
         
         # Load previous GroupChat history
-        self._load_group_chat_memory()
-        
-        self.manager = GroupChatManager(
-            groupchat=self.group_chat,
+        self._load_group_chat_memory(session)
+        
+        # End the chat early once deliverables exist or agents start repeating
+        convergence_config = self.config.get('convergence', {})
+        if convergence_config.get('enabled', True):
+            session.convergence = ConvergenceMonitor(session.code_extractor, convergence_config)
+        
+        # The manager checks every message once it has been appended and
+        # broadcast, which is where a round is checkpointed
+        def is_termination_msg(message):
+            if self.instrumentation:
+                self.instrumentation.end_round(session.project_id, message)
+            if self.checkpoints:
+                self.checkpoints.save_round(session)
+            if session.convergence:
+                return session.convergence.is_termination_msg(message)
+            return (message.get("content") or "").rstrip().endswith("TERMINATE")
+        
+        session.manager = GroupChatManager(
+            groupchat=session.group_chat,
             llm_config=self._get_llm_config(),
+            is_termination_msg=is_termination_msg,
         )
+        self._register_model_client(session.manager, session.project_id)
+        self._install_residency(session.manager, session.project_id, self._get_llm_config())
+        self._install_llm_cache(session.manager, "GroupChatManager")
+        if self.instrumentation:
+            self.instrumentation.install_llm(session.manager, session.project_id,
+                                             self._get_llm_config(), speaker=False)
         
         logger.info("GroupChat created with free communication support")
 
+    def _project_hosts(self):
+        """LLM hosts used by a project's agents and manager (primary routes)"""
+        names = list(self.agent_configs) + ["GroupChatManager"]
+        for name in names:
+            self._get_llm_config(name)
+        return {self.llm_router.assignments[name][0] for name in names if name in self.llm_router.assignments}
     
-    async def handle_project(self, description, user, channel):
+    async def handle_project(self, description, user, channel, project_id=None):
         """
         Handle a complete project request
         
@@ -284,28 +499,107 @@ class AriaCEO:
             description: Project description from user
             user: User who requested the project
             channel: Slack channel for communication
+            project_id: Optional fixed project ID (e.g. derived from a queue task)
         
         Returns:
             dict: Project results including GitHub/Docker Hub URLs
         """
-        project_id = f"project-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        # Random suffix keeps IDs unique when projects start in the same second
+        project_id = project_id or f"project-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(2).hex()}"
         logger.info(f"Starting project: {project_id}")
         logger.info(f"Description: {description}")
         
-        # Store channel for status updates
-        self.current_channel = channel
+        return await self._run_session(project_id, channel, description, user)
+    
+    async def resume(self, project_id):
+        """
+        Resume an interrupted project from its last checkpoint
+        
+        The chat continues from the last checkpointed round with the
+        restored GroupChat and agent histories; finished pipeline stages
+        (extraction, GitHub, Docker Hub) are not run again.
+        
+        Args:
+            project_id: ID of a project listed by pending_projects()
+        
+        Returns:
+            dict: Project results, as for handle_project
+        """
+        checkpoint = self.checkpoints.load(project_id) if self.checkpoints else None
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint found for project {project_id}")
+        logger.info(f"Resuming project {project_id} at stage '{checkpoint['stage']}'")
+        return await self._run_session(project_id, checkpoint.get('channel'), checkpoint['description'],
+                                       checkpoint.get('user'), resume=checkpoint)
+    
+    async def _run_session(self, project_id, channel, description, user, resume=None):
+        """Schedule a project, build its session and run (or resume) its pipeline"""
+        if self.instrumentation:
+            self.instrumentation.start_project(project_id)
+        status = 'failed'
+        waiting_since = time.monotonic()
+        try:
+            # Wait for free capacity on the LLM hosts this project uses
+            async with self.scheduler.slot(project_id, self._project_hosts()):
+                if self.instrumentation:
+                    self.instrumentation.record_stage(project_id, 'scheduling', time.monotonic() - waiting_since)
+                # Isolated session: own agents, GroupChat, memory namespace and channel binding
+                with self._stage(project_id, 'setup'):
+                    session = self._create_session(project_id, channel)
+                    if resume:
+                        self.checkpoints.restore(session, resume)
+                    elif self.checkpoints:
+                        self.checkpoints.start(session, description, user)
+                self.sessions[project_id] = session
+                try:
+                    result = await self._run_project(session, description, resume=resume)
+                    status = result.get('status', 'completed')
+                    return result
+                finally:
+                    self.sessions.pop(project_id, None)
+        finally:
+            if self.residency:
+                residency = self.residency.finish_project(project_id)
+                logger.info(f"Project {project_id}: {residency['swaps']} model swaps, "
+                            f"{residency['wait_seconds']:.1f}s waiting for resident models")
+            if self.instrumentation:
+                self.instrumentation.finish_project(project_id, status)
+            self.slack_status.finish(project_id)
+    
+    def _stage(self, project_id, name):
+        """Context manager timing a pipeline stage (no-op without instrumentation)"""
+        if self.instrumentation:
+            return self.instrumentation.stage(project_id, name)
+        return nullcontext()
+    
+    def pending_projects(self):
+        """Return {project_id: next stage} for projects that can be resumed"""
+        return self.checkpoints.pending() if self.checkpoints else {}
+    
+    def _checkpoint_stage(self, session, stage, **results):
+        if self.checkpoints:
+            self.checkpoints.set_stage(session, stage, **results)
+    
+    async def _run_project(self, session, description, resume=None):
+        """
+        Run the pipeline stages of a project inside its session
+        
+        With `resume` (a loaded checkpoint), stages before the checkpointed
+        one are skipped and their stored results are reused.
+        """
+        project_id = session.project_id
+        start = STAGES.index(resume['stage']) if resume else 0
+        results = dict(resume.get('results', {})) if resume else {}
         
         # BUGFIX #1: Clarification is now completely disabled
         # No more endless loops!
         
-        # Start LLM monitoring
-        if self.llm_monitor:
-            await self.llm_monitor.start_monitoring(project_id)
-        
         # Initial message to team
         initial_message = f"""
 🚀 **New Project: {project_id}**
 
+**Project directory:** {session.project_dir} (code blocks marked `# File: <path>` are saved here)
+
 **Description:**
 {description}
 
@@ -329,41 +623,65 @@ class AriaCEO:
         
         # Run group chat
         try:
-            # The loaded group chat messages are already in self.group_chat.messages
+            # The loaded group chat messages are already in session.group_chat.messages
             # We don't reset them here to maintain context from previous runs.
             
-            result = await self._run_group_chat(initial_message, project_id)
-            
-            # Save the full conversation history
-            self._save_group_chat_memory()
-            
-            # Save individual agent memories (optional, but good practice)
-            for agent in self.agents.values():
-                self._save_agent_memory(agent)
+            if start <= STAGES.index('chat'):
+                with self._stage(project_id, 'chat'):
+                    if resume:
+                        await self._run_group_chat(session, self._resume_message(session), resume=True)
+                    else:
+                        await self._run_group_chat(session, initial_message)
+                
+                with self._stage(project_id, 'save_memory'):
+                    # Save the full conversation history
+                    self._save_group_chat_memory(session)
+                    
+                    # Save individual agent memories (optional, but good practice)
+                    for agent in session.agents.values():
+                        self._save_agent_memory(session, agent)
+                
+                if self.checkpoints:
+                    self.checkpoints.save_round(session, force=True)
+                self._checkpoint_stage(session, 'extract')
             
-            # Extract code files from conversation
-            project_dir = await self._extract_and_save_code(result, project_id)
+            # Code files were extracted while the chat ran
+            with self._stage(project_id, 'extract'):
+                project_dir = await self._extract_and_save_code(session)
+            if start <= STAGES.index('extract'):
+                self._checkpoint_stage(session, 'github')
             
-            # Store in GitHub
-            github_info = None
-            if self.github.enabled and project_dir:
-                github_info = self.github.store_project(
-                    project_id,
-                    project_dir,
-                    description=description
-                )
+            # Store in GitHub (blocking API calls run on the I/O pool)
+            if start <= STAGES.index('github'):
+                if self.github.enabled and project_dir:
+                    with self._stage(project_id, 'github'):
+                        results['github'] = await self.executor.run_io(
+                            self.github.store_project,
+                            project_id,
+                            project_dir,
+                            description=description,
+                            timeout=self.executor.timeouts.get('github', self.executor.default_timeout)
+                        )
+                self._checkpoint_stage(session, 'dockerhub', github=results.get('github'))
+            github_info = results.get('github')
             
             # Build and push to Docker Hub
-            dockerhub_info = None
-            if self.dockerhub.enabled and project_dir:
-                dockerhub_info = self.dockerhub.build_and_push(
-                    project_dir,
-                    project_id
-                )
+            if start <= STAGES.index('dockerhub'):
+                if self.dockerhub.enabled and project_dir:
+                    with self._stage(project_id, 'dockerhub'):
+                        results['dockerhub'] = await self.executor.run_io(
+                            self.dockerhub.build_and_push,
+                            project_dir,
+                            project_id,
+                            timeout=self.executor.timeouts.get('dockerhub', self.executor.default_timeout)
+                        )
+                self._checkpoint_stage(session, 'done', dockerhub=results.get('dockerhub'))
+            dockerhub_info = results.get('dockerhub')
             
-            # Stop LLM monitoring
-            if self.llm_monitor:
-                await self.llm_monitor.stop_monitoring(project_id)
+            if self.llm_cache:
+                stats = self.llm_cache.stats()
+                logger.info(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+                            f"({stats['hit_rate']:.0%} hit rate)")
             
             # Send final completion message to Slack
             completion_msg = f":tada: **Project {project_id} Complete!**\n\n"
@@ -377,7 +695,16 @@ class AriaCEO:
             
             completion_msg += f"\n:sparkles: All deliverables are ready!"
             
-            await self._send_slack_update(completion_msg)
+            # A new message, so the completion notifies the channel
+            self.slack_status.post(session.channel, completion_msg)
+            
+            # Nothing left to resume
+            if self.checkpoints:
+                self.checkpoints.finish(project_id)
+            
+            # Make this project's README searchable for Riley in later projects
+            if self.kb_ingest_on_complete and project_dir and (Path(project_dir) / "README.md").exists():
+                self._start_background(self._refresh_knowledge_base())
             
             return {
                 'project_id': project_id,
@@ -385,14 +712,42 @@ class AriaCEO:
                 'github': github_info,
                 'dockerhub': dockerhub_info,
                 'local_path': str(project_dir) if project_dir else None,
+                'stop_reason': session.convergence.reason if session.convergence else None,
             }
         
         except Exception as e:
             logger.error(f"Error handling project: {e}")
-            if self.llm_monitor:
-                await self.llm_monitor.stop_monitoring(project_id)
             raise
     
+    def _start_background(self, coroutine):
+        """Run a coroutine without awaiting it, keeping a reference until it is done"""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _refresh_knowledge_base(self):
+        """Rebuild the search_best_practices index on the I/O pool"""
+        # numpy and diskcache are only needed once a project completes
+        from knowledge_base import get_knowledge_base
+        try:
+            await self.executor.run_io(get_knowledge_base(self.config).ingest)
+        except Exception as e:
+            logger.warning(f"Knowledge base refresh failed: {e}")
+    
+    def shutdown(self):
+        """Stop executor pools and close pooled service clients"""
+        self.executor.shutdown()
+        mongo_writer.close()
+        if self.residency:
+            self.residency.shutdown()
+        if self.ollama:
+            self.ollama.close()
+        self.slack_status.close()
+        if self.instrumentation:
+            self.instrumentation.shutdown()
+        client_registry.close()
+        logger.info("Aria CEO shut down")
+    
     def _needs_clarification(self, description):
         """
         BUGFIX #1: Completely disabled clarification questions
@@ -410,7 +765,9 @@ class AriaCEO:
         
         This enables real-time chat updates in the web interface.
         """
+        self._log_event(event_type, data)
         try:
+            import websockets
             # Try to connect if not connected or if the connection is closed
             if not self.ws_connection or self.ws_connection.closed:
                 try:
@@ -446,119 +803,163 @@ class AriaCEO:
             # Reset connection on error
             self.ws_connection = None
     
-    async def _send_slack_update(self, message):
+    def _log_event(self, event_type, data):
+        """Queue a dashboard event for MongoDB; chat batches become one document per message"""
+        if not self.log_events:
+            return
+        # Token deltas are not logged; the complete message arrives in a chat_batch
+        if event_type == 'chat_delta':
+            return
+        try:
+            project_name = data.get('project_id')
+            timestamp = datetime.now()
+            if event_type == 'chat_batch':
+                for message in data.get('messages', []):
+                    mongo_writer.write('events', {
+                        'project_name': project_name,
+                        'event': 'chat_message',
+                        'timestamp': timestamp,
+                        'data': message,
+                    })
+            else:
+                mongo_writer.write('events', {
+                    'project_name': project_name,
+                    'event': event_type,
+                    'timestamp': timestamp,
+                    'data': data,
+                })
+        except Exception as e:
+            logger.warning(f"Could not queue {event_type} event for MongoDB: {e}")
+    
+    def _send_slack_update(self, session, message):
         """
-        Send status update to Slack channel
+        Set the project's Slack progress message
         
         BUGFIX #3: Send progress updates to Slack during project execution
+        The message is posted once and edited in place by slack_status.py;
+        this never waits on Slack.
         """
-        if not self.slack_client or not self.current_channel:
+        if not self.slack_client or not session.channel:
             logger.debug("Slack client or channel not available for updates")
             return
-        
-        try:
-            await self.slack_client.chat_postMessage(
-                channel=self.current_channel,
-                text=message
-            )
-            logger.debug(f"Slack update sent: {message[:50]}...")
-        except Exception as e:
-            logger.warning(f"Error sending Slack update: {e}")
+        self.slack_status.update(session.project_id, session.channel, message)
+    
+    def _resume_message(self, session):
+        """Build Aria's message that continues a restored chat"""
+        checkpoint = session.checkpoint
+        missing = session.convergence.missing_deliverables() if session.convergence else []
+        message = (f"🔄 **Resuming project {session.project_id}** after an interruption "
+                   f"(round {checkpoint['round']}).\n"
+                   f"Continue exactly where you left off; do not repeat finished work.")
+        if missing:
+            message += f"\nStill missing: {', '.join(missing)}"
+        return message
     
-    async def _run_group_chat(self, initial_message, project_id):
+    async def _run_group_chat(self, session, initial_message, resume=False):
         """
         Run the group chat with free communication
         
-        BUGFIX #2: Now broadcasts all chat messages to the dashboard
+        Chat messages are streamed to the dashboard while the chat runs
+        (see dashboard_stream.py) instead of being replayed afterwards.
+        With `resume`, the restored GroupChat and agent histories are kept
+        and only the remaining rounds are run.
         """
-        logger.info(f"Starting group chat for project {project_id}")
+        project_id = session.project_id
+        logger.info(f"{'Resuming' if resume else 'Starting'} group chat for project {project_id}")
+        
+        if resume and session.checkpoint:
+            session.group_chat.max_round = max(1, session.group_chat.max_round - session.checkpoint['round'])
         
         # Broadcast project start
         await self._broadcast_to_dashboard('project_start', {
             'project_id': project_id,
-            'message': initial_message
+            'message': initial_message,
+            'resumed': resume,
         })
         
         # Send Slack update: Team is working
-        await self._send_slack_update(
+        self._send_slack_update(
+            session,
             f":construction_worker: **Team is working on {project_id}**\n"
             f"The agents are collaborating on your request..."
         )
         
-        # Start chat
-        await self.aria.a_initiate_chat(
-            self.manager,
-            message=initial_message,
-        )
+        # Start chat, streaming messages live
+        session.dashboard_stream.start(project_id)
+        if session.token_stream:
+            session.token_stream.start(project_id)
+        if self.instrumentation:
+            self.instrumentation.restart_round(project_id)
+        try:
+            await session.aria.a_initiate_chat(
+                session.manager,
+                message=initial_message,
+                clear_history=not resume,
+            )
+        finally:
+            if session.token_stream:
+                await session.token_stream.stop()
+            await session.dashboard_stream.stop()
         
         # Get all messages
-        messages = self.group_chat.messages
+        messages = session.group_chat.messages
+        message_count = len(messages)
         
         # Send periodic Slack updates
-        message_count = len(messages)
         if message_count > 0:
-            await self._send_slack_update(
+            self._send_slack_update(
+                session,
                 f":speech_balloon: **Progress Update**\n"
                 f"Team has exchanged {message_count} messages so far...\n"
                 f"Working on: Architecture, Implementation, Testing, Documentation"
             )
         
-        # Broadcast each message to dashboard
-        for i, message in enumerate(messages):
-            agent_name = message.get('name', 'Unknown')
-            content = message.get('content', '')
-            
-            await self._broadcast_to_dashboard('chat_message', {
-                'project_id': project_id,
-                'message_number': i + 1,
-                'total_messages': len(messages),
-                'agent': agent_name,
-                'content': content
-            })
-            
-            # Small delay to avoid overwhelming the dashboard
-            await asyncio.sleep(0.1)
-        
         # Broadcast project end
         await self._broadcast_to_dashboard('project_end', {
             'project_id': project_id,
-            'total_messages': len(messages)
+            'total_messages': message_count,
+            'streamed_messages': session.dashboard_stream.sent,
+            'dropped_messages': session.dashboard_stream.dropped,
+            'stop_reason': session.convergence.reason if session.convergence else None,
         })
         
         # Send final Slack update
-        await self._send_slack_update(
+        self._send_slack_update(
+            session,
             f":white_check_mark: **Team Discussion Complete!**\n"
             f"Total messages: {message_count}\n"
             f"Now processing deliverables..."
         )
         
-        logger.info(f"Group chat completed with {len(messages)} messages")
-        logger.info(f"All messages broadcasted to dashboard")
+        logger.info(f"Group chat completed with {message_count} messages")
+        if session.convergence and session.convergence.reason:
+            logger.info(f"Chat ended early: {session.convergence.reason}")
+        if hasattr(session.speaker_selection, 'stats'):
+            logger.info(f"Speaker selection paths: {session.speaker_selection.stats()}")
         
         return messages
     
-    async def _extract_and_save_code(self, messages, project_id):
-        """Extract code from messages and save to files"""
-        if not CODE_GEN_AVAILABLE:
-            logger.warning("Code file generator not available")
-            return None
-        
-        project_dir = Path(f"/opt/aria-system/projects/{project_id}")
-        project_dir.mkdir(parents=True, exist_ok=True)
-        
-        code_gen = CodeFileGenerator()
+    async def _extract_and_save_code(self, session):
+        """
+        Return the project directory with the code extracted during the chat
         
-        # Extract all code blocks from messages
-        for message in messages:
-            content = message.get('content', '')
-            code_gen.extract_and_save(content, project_dir)
+        Files are written incrementally by the session's StreamingCodeExtractor
+        as messages arrive, so no extra pass over the conversation is needed.
+        """
+        extractor = session.code_extractor
+        if not extractor.files:
+            logger.warning(f"No code files were extracted for {session.project_id}")
+            return None
         
-        logger.info(f"Code saved to: {project_dir}")
+        logger.info(f"Code saved to: {session.project_dir} ({len(extractor.files)} files, "
+                    f"{extractor.written} writes, {extractor.skipped} unchanged blocks skipped)")
         
-        return project_dir
+        return session.project_dir
 
 
 # Main entry point
 if __name__ == "__main__":
     aria = AriaCEO()
     logger.info("Aria CEO v6.3 (Memory Edition) ready!")
+    for project_id, stage in aria.pending_projects().items():
+        logger.info(f"Interrupted project {project_id} can be resumed at stage '{stage}'")
@@ -0,0 +1,331 @@
+"""
+In-memory stand-ins for the external services used by AriaCEO and tools.py:
+Redis, MongoDB, Docker, the GitHub/Docker Hub integrations, Slack and the
+dashboard WebSocket. Each fake can add a fixed latency per call.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+
+class FakeRedis:
+    """Thread-safe subset of redis.Redis (decode_responses=True) used by task_queue.py."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.lists: Dict[str, List[str]] = defaultdict(list)
+        self.zsets: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.calls = 0
+        self._cond = threading.Condition()
+
+    def _tick(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def ping(self):
+        return True
+
+    def lpush(self, key, *values):
+        self._tick()
+        with self._cond:
+            for value in values:
+                self.lists[key].insert(0, value)
+            self._cond.notify_all()
+            return len(self.lists[key])
+
+    def rpoplpush(self, source, destination):
+        self._tick()
+        with self._cond:
+            if not self.lists[source]:
+                return None
+            value = self.lists[source].pop()
+            self.lists[destination].insert(0, value)
+            return value
+
+    def brpop(self, keys, timeout=0):
+        self._tick()
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        deadline = time.monotonic() + (timeout or 1e9)
+        with self._cond:
+            while True:
+                for key in keys:
+                    if self.lists[key]:
+                        return key, self.lists[key].pop()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def lrem(self, key, count, value):
+        self._tick()
+        with self._cond:
+            items = self.lists[key]
+            removed = 0
+            while value in items and (count == 0 or removed < abs(count)):
+                items.remove(value)
+                removed += 1
+            return removed
+
+    def ltrim(self, key, start, end):
+        self._tick()
+        with self._cond:
+            self.lists[key] = self.lists[key][start:None if end == -1 else end + 1]
+            return True
+
+    def lrange(self, key, start, end):
+        with self._cond:
+            items = list(self.lists[key])
+        return items[start:None if end == -1 else end + 1]
+
+    def llen(self, key):
+        with self._cond:
+            return len(self.lists[key])
+
+    def zadd(self, key, mapping):
+        self._tick()
+        with self._cond:
+            self.zsets[key].update(mapping)
+            return len(mapping)
+
+    def zrem(self, key, *members):
+        with self._cond:
+            return sum(self.zsets[key].pop(member, None) is not None for member in members)
+
+    def zscore(self, key, member):
+        with self._cond:
+            return self.zsets[key].get(member)
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def close(self):
+        pass
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+class _InsertResult:
+    def __init__(self, ids):
+        self.inserted_ids = ids
+        self.inserted_id = ids[0] if ids else None
+
+
+class FakeCollection:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.documents: List[Dict[str, Any]] = []
+        self.indexes: List[Any] = []
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def _tick(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+        return str(keys)
+
+    def insert_many(self, documents, ordered=True):
+        self._tick()
+        with self._lock:
+            self.documents.extend(documents)
+        return _InsertResult([document.get("_id") for document in documents])
+
+    def insert_one(self, document):
+        return self.insert_many([document])
+
+    def count_documents(self, query):
+        return len(self.documents)
+
+
+class FakeMongoClient:
+    """Subset of pymongo.MongoClient: client[db][collection] with insert_many/create_index."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.databases: Dict[str, Dict[str, FakeCollection]] = defaultdict(dict)
+        self.admin = self
+
+    def command(self, name):
+        return {"ok": 1}
+
+    def __getitem__(self, name):
+        latency = self.latency
+        database = self.databases[name]
+
+        class _Database:
+            def __getitem__(self, collection):
+                if collection not in database:
+                    database[collection] = FakeCollection(latency)
+                return database[collection]
+        return _Database()
+
+    def close(self):
+        pass
+
+
+class FakeDockerClient:
+    """Subset of docker.DockerClient used by tools.build_docker_image."""
+
+    class _Image:
+        def __init__(self, tag):
+            self.id = f"sha256:{abs(hash(tag)):016x}"
+            self.tags = [tag]
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.builds = 0
+        fake = self
+
+        class _Images:
+            def build(self, path, tag, **kwargs):
+                fake.builds += 1
+                time.sleep(fake.latency)
+                return FakeDockerClient._Image(tag), [{"stream": f"Successfully built {tag}\n"}]
+
+            def push(self, repository, tag=None, **kwargs):
+                time.sleep(fake.latency)
+                return ""
+        self.images = _Images()
+
+    def ping(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class FakeGitHubIntegration:
+    """Replaces integrations.github_integration.GitHubIntegration."""
+
+    def __init__(self, latency: float = 0.0):
+        self.enabled = True
+        self.latency = latency
+        self.stored: List[str] = []
+
+    def store_project(self, project_id, project_dir, description=None):
+        time.sleep(self.latency)
+        self.stored.append(project_id)
+        return {"url": f"https://github.invalid/aria/{project_id}"}
+
+
+class FakeDockerHubIntegration:
+    """Replaces integrations.dockerhub_integration.DockerHubIntegration."""
+
+    def __init__(self, latency: float = 0.0):
+        self.enabled = True
+        self.latency = latency
+        self.pushed: List[str] = []
+
+    def build_and_push(self, project_dir, project_id):
+        time.sleep(self.latency)
+        self.pushed.append(project_id)
+        return {"url": f"https://hub.invalid/aria/{project_id}"}
+
+
+class FakeSlackApiError(Exception):
+    """Mimics slack_sdk's SlackApiError: the HTTP response is in `response`."""
+
+    class Response:
+        def __init__(self, status_code: int, headers: Dict[str, str]):
+            self.status_code = status_code
+            self.headers = headers
+
+    def __init__(self, message: str, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.response = self.Response(status_code, headers or {})
+
+
+class FakeSlackClient:
+    """
+    Async Slack WebClient subset: chat_postMessage and chat_update.
+
+    With `rate_limit`, more than that many calls per channel within one
+    second fail with HTTP 429 and a Retry-After of one second.
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit: Optional[int] = None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.posted = 0
+        self.updated = 0
+        self.rate_limited = 0
+        # Current text of every message, by ts
+        self.messages: Dict[str, str] = {}
+        self._calls: Dict[str, List[float]] = defaultdict(list)
+        self._ts = itertools.count(1)
+
+    def _check_rate(self, channel):
+        if self.rate_limit is None:
+            return
+        now = time.monotonic()
+        calls = self._calls[channel] = [t for t in self._calls[channel] if now - t < 1.0]
+        if len(calls) >= self.rate_limit:
+            self.rate_limited += 1
+            raise FakeSlackApiError("ratelimited", 429, {"Retry-After": "1"})
+        calls.append(now)
+
+    async def chat_postMessage(self, channel, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._check_rate(channel)
+        self.posted += 1
+        ts = f"{time.time():.0f}.{next(self._ts):06d}"
+        self.messages[ts] = text
+        return {"ok": True, "channel": channel, "ts": ts}
+
+    async def chat_update(self, channel, ts, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._check_rate(channel)
+        self.updated += 1
+        self.messages[ts] = text
+        return {"ok": True, "channel": channel, "ts": ts}
+
+
+class DashboardSink:
+    """Local WebSocket server that accepts and counts dashboard events."""
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self.port: Optional[int] = None
+        self.events = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self):
+        import websockets
+
+        async def handler(connection, *args):
+            async for _ in connection:
+                self.events += 1
+
+        self._server = await websockets.serve(handler, self.host, 0)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
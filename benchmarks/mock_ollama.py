@@ -0,0 +1,243 @@
+"""
+OpenAI-compatible stand-in for the Ollama hosts.
+Serves /v1/chat/completions (plain and streaming) with scripted replies and
+configurable latency, plus the Ollama /api/tags, /api/ps and /api/generate
+endpoints, so the orchestration can be benchmarked without real models.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+
+# Default scenario: every deliverable is produced once, and each reply
+# addresses the next agent so rule-based speaker selection is exercised.
+DEFAULT_SCRIPT: Dict[str, List[Union[str, Dict[str, Any]]]] = {
+    "Sam": [
+        "Here is the backend.\n\n# File: backend/main.py\n```python\nfrom fastapi import FastAPI\n\n"
+        "app = FastAPI()\n\n\n@app.get('/health')\ndef health():\n    return {'status': 'ok'}\n```\n\n"
+        "# File: requirements.txt\n```\nfastapi\nuvicorn\n```\n\nTaylor, please write the tests.",
+    ],
+    "Taylor": [
+        {"tool": "log_test_result_to_mongo",
+         "arguments": {"project_name": "benchmark", "test_summary": "1 passed", "status": "PASS"}},
+        "Tests are in place.\n\n# File: tests/test_main.py\n```python\nfrom fastapi.testclient import TestClient\n"
+        "from backend.main import app\n\n\ndef test_health():\n    assert TestClient(app).get('/health').status_code == 200\n```\n\n"
+        "Morgan, please containerize it.",
+    ],
+    "Morgan": [
+        "# File: Dockerfile\n```dockerfile\nFROM python:3.11-slim\nCOPY . /app\nWORKDIR /app\n"
+        "RUN pip install -r requirements.txt\nCMD [\"uvicorn\", \"backend.main:app\", \"--host\", \"0.0.0.0\"]\n```\n\n"
+        "# File: docker-compose.yml\n```yaml\nservices:\n  api:\n    build: .\n    ports:\n      - '8000:8000'\n```\n\n"
+        "Alex, please write the README.",
+    ],
+    "Alex": [
+        "# File: README.md\n```markdown\n# Benchmark Project\n\nRun with `docker compose up`.\n```\n\n"
+        "Aria, all deliverables are ready.",
+    ],
+    "Aria": ["Great work, team. Sam, please double-check the health endpoint."],
+    "*": ["Agreed, nothing to add from my side. Sam, over to you."],
+}
+
+AGENT_PATTERN = re.compile(r"You are (\w+)\b")
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockOllama:
+    """
+    Scripted OpenAI-compatible server running in a background thread.
+
+    Each agent (recognised from "You are <Name>" in its system message)
+    gets the next entry of its script; the last entry repeats. An entry is
+    reply text or {"tool": name, "arguments": {...}} for a tool call.
+    Speaker-selection requests from the GroupChatManager are answered with
+    agent names in turn.
+
+    Latency per reply: `ttft` seconds before the first token, then
+    completion tokens / `tokens_per_second`, each scaled by +-`jitter`.
+    """
+
+    def __init__(self, script: Optional[Dict[str, List[Any]]] = None, ttft: float = 0.2,
+                 tokens_per_second: float = 50.0, jitter: float = 0.0, host: str = "127.0.0.1",
+                 port: int = 0, seed: int = 0):
+        self.script = script or DEFAULT_SCRIPT
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.positions: Dict[str, int] = {}
+        self.loaded_models: Dict[str, float] = {}
+        self.requests = 0
+        self.busy_seconds = 0.0
+        self._selection = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Replies ---
+
+    def _scale(self, seconds: float) -> float:
+        if self.jitter:
+            seconds *= 1 + self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, seconds)
+
+    def _next_step(self, body: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+        messages = body.get("messages", [])
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        with self._lock:
+            if "select the next role" in system.lower() or "role play game" in system.lower():
+                names = [name for name in self.script if name != "*"]
+                self._selection += 1
+                return names[self._selection % len(names)]
+            match = AGENT_PATTERN.search(system)
+            agent = match.group(1) if match and match.group(1) in self.script else "*"
+            steps = self.script[agent]
+            position = self.positions.get(agent, 0)
+            self.positions[agent] = position + 1
+            return steps[min(position, len(steps) - 1)]
+
+    def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Builds a chat completion for a request body and sleeps for its simulated latency."""
+        step = self._next_step(body)
+        model = body.get("model", "mock")
+        prompt = json.dumps(body.get("messages", []))
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        if isinstance(step, dict) and "tool" in step:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": step["tool"], "arguments": json.dumps(step.get("arguments", {}))},
+            }]
+            completion = json.dumps(step)
+            finish_reason = "tool_calls"
+        else:
+            message["content"] = str(step)
+            completion = message["content"]
+            finish_reason = "stop"
+
+        completion_tokens = _estimate_tokens(completion)
+        ttft = self._scale(self.ttft)
+        generation = self._scale(completion_tokens / self.tokens_per_second) if self.tokens_per_second else 0.0
+        with self._lock:
+            self.requests += 1
+            self.busy_seconds += ttft + generation
+            self.loaded_models[model] = time.time()
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": _estimate_tokens(prompt),
+                "completion_tokens": completion_tokens,
+                "total_tokens": _estimate_tokens(prompt) + completion_tokens,
+            },
+            "_latency": (ttft, generation),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "busy_seconds": self.busy_seconds}
+
+    # --- HTTP ---
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _json(self, payload: Dict[str, Any], status: int = 200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if self.path.startswith("/v1/models") or self.path.startswith("/api/tags"):
+                    models = sorted(mock.loaded_models) or ["mock"]
+                    self._json({"object": "list", "data": [{"id": m, "object": "model"} for m in models],
+                                "models": [{"name": m, "model": m} for m in models]})
+                elif self.path.startswith("/api/ps"):
+                    self._json({"models": [{"name": m, "model": m} for m in sorted(mock.loaded_models)]})
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = self._body()
+                if self.path.startswith("/api/generate") or self.path.startswith("/api/chat"):
+                    # Warm-up / keep_alive requests only load the model
+                    with mock._lock:
+                        mock.loaded_models[body.get("model", "mock")] = time.time()
+                    self._json({"model": body.get("model"), "done": True, "response": ""})
+                    return
+                if not self.path.startswith("/v1/chat/completions"):
+                    self._json({"error": "not found"}, 404)
+                    return
+                completion = mock.complete(body)
+                ttft, generation = completion.pop("_latency")
+                if body.get("stream"):
+                    self._stream(completion, ttft, generation)
+                else:
+                    time.sleep(ttft + generation)
+                    self._json(completion)
+
+            def _stream(self, completion: Dict[str, Any], ttft: float, generation: float):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                choice = completion["choices"][0]
+                content = choice["message"].get("content") or ""
+                words = re.findall(r"\S+\s*", content) or [""]
+                time.sleep(ttft)
+                base = {key: completion[key] for key in ("id", "created", "model")}
+                base["object"] = "chat.completion.chunk"
+                for i, word in enumerate(words):
+                    delta: Dict[str, Any] = {"content": word}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                        if choice["message"].get("tool_calls"):
+                            delta["tool_calls"] = [dict(call, index=n) for n, call
+                                                   in enumerate(choice["message"]["tool_calls"])]
+                    chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(generation / len(words))
+                final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}],
+                             usage=completion["usage"])
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+                self.wfile.flush()
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
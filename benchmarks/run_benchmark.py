@@ -0,0 +1,245 @@
+"""
+Offline end-to-end benchmark of the AriaCEO orchestration.
+
+Starts a scripted OpenAI-compatible mock of the Ollama hosts, replaces
+GitHub, Docker, Redis, MongoDB, Slack and the dashboard with in-memory
+fakes, runs AriaCEO.handle_project and reports rounds/sec, per-stage
+latency, orchestration overhead (chat time not spent in the model),
+memory growth and event-loop lag.
+
+Usage:
+    python benchmarks/run_benchmark.py --projects 2 --ttft 0.1 --tps 200
+    python benchmarks/run_benchmark.py --output new.json --baseline old.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import yaml
+from loguru import logger
+
+from mock_ollama import MockOllama
+from fakes import (DashboardSink, FakeDockerClient, FakeDockerHubIntegration, FakeGitHubIntegration,
+                   FakeMongoClient, FakeRedis, FakeSlackClient)
+
+# Report metrics compared against a baseline: name -> True if higher is better
+COMPARED = {
+    "rounds_per_sec": True,
+    "orchestration_overhead_p95": False,
+    "loop_lag_p95": False,
+    "memory_growth_mb": False,
+}
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class LoopProbe:
+    """Measures event-loop lag (sleep overshoot) and samples RSS while the benchmark runs."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lags: List[float] = []
+        self.rss: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        samples = 0
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - start - self.interval))
+            samples += 1
+            if samples % 10 == 0:
+                self.rss.append(_rss_mb())
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+def build_config(base: Dict[str, Any], mock: MockOllama, workdir: Path, dashboard_url: str,
+                 max_round: int) -> Dict[str, Any]:
+    """Points a config.yaml dict at the mock and the temporary directory."""
+    config = copy.deepcopy(base)
+    llm = config.setdefault('llm', {})
+    for key, host in llm.items():
+        if isinstance(host, dict) and 'host' in host:
+            host['host'], host['port'] = mock.host, mock.port
+    config.setdefault('dashboard', {})['websocket_url'] = dashboard_url
+    config.setdefault('memory', {})['cache_dir'] = str(workdir / "memory")
+    config.setdefault('projects', {})['base_dir'] = str(workdir / "projects")
+    config.setdefault('checkpoints', {})['directory'] = str(workdir / "checkpoints")
+    config.setdefault('llm_cache', {})['enabled'] = False
+    config.setdefault('metrics', {}).update({'http_enabled': False, 'traces_dir': str(workdir / "traces")})
+    config.setdefault('mongo_logging', {})['spill_path'] = str(workdir / "mongo_spill.jsonl")
+    config.setdefault('group_chat', {})['max_round'] = max_round
+    # Fakes only exist in this process, so no tool may run in the process pool
+    config.setdefault('executors', {})['process_tools'] = []
+    return config
+
+
+async def run(args) -> Dict[str, Any]:
+    from aria_ceo import AriaCEO
+    from clients import registry as client_registry
+
+    script = json.loads(Path(args.script).read_text()) if args.script else None
+    mock = MockOllama(script=script, ttft=args.ttft, tokens_per_second=args.tps,
+                      jitter=args.jitter).start()
+    sink = await DashboardSink().start()
+    workdir = Path(tempfile.mkdtemp(prefix="aria-bench-"))
+    base = yaml.safe_load(Path(args.config).read_text()) or {}
+    config = build_config(base, mock, workdir, sink.url, args.max_round)
+
+    slack = FakeSlackClient(args.service_latency)
+    aria = AriaCEO(slack_client=slack, config=config)
+    aria.github = FakeGitHubIntegration(args.service_latency)
+    aria.dockerhub = FakeDockerHubIntegration(args.service_latency)
+    mongo = FakeMongoClient(args.service_latency)
+    client_registry.override('redis', FakeRedis(args.service_latency))
+    client_registry.override('mongo', mongo)
+    client_registry.override('docker', FakeDockerClient(args.service_latency))
+
+    probe = LoopProbe()
+    rss_start = _rss_mb()
+    probe.start()
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        aria.handle_project(f"Benchmark project {i}: a FastAPI health-check service",
+                            "benchmark", f"C-BENCH-{i}")
+        for i in range(args.projects)
+    ], return_exceptions=True)
+    wall = time.perf_counter() - started
+    await probe.stop()
+    rss_end = _rss_mb()
+
+    await aria.slack_status.drain()
+    slack_stats = aria.slack_status.stats()
+    aria.shutdown()
+    mock.stop()
+    await sink.stop()
+
+    failures = [str(result) for result in results if isinstance(result, BaseException)]
+    traces = [json.loads(path.read_text()) for path in sorted((workdir / "traces").glob("*.json"))]
+    stages: Dict[str, List[float]] = {}
+    overheads = []
+    rounds = 0
+    for trace in traces:
+        rounds += len(trace["rounds"])
+        for name, seconds in trace["stages"].items():
+            stages.setdefault(name, []).append(seconds)
+        llm_seconds = sum(record["llm_seconds"] for record in trace["rounds"])
+        overheads.append(max(0.0, trace["stages"].get("chat", 0.0) - llm_seconds))
+
+    mongo_docs = sum(len(c.documents) for db in mongo.databases.values() for c in db.values())
+    mongo_round_trips = sum(c.round_trips for db in mongo.databases.values() for c in db.values())
+    return {
+        "projects": args.projects,
+        "failures": failures,
+        "wall_seconds": wall,
+        "rounds": rounds,
+        "rounds_per_sec": rounds / wall if wall else 0.0,
+        "stages": {
+            name: {"mean": statistics.mean(values), "p95": _percentile(values, 0.95)}
+            for name, values in stages.items()
+        },
+        "orchestration_overhead_mean": statistics.mean(overheads) if overheads else 0.0,
+        "orchestration_overhead_p95": _percentile(overheads, 0.95),
+        "llm": mock.stats(),
+        "loop_lag_mean": statistics.mean(probe.lags) if probe.lags else 0.0,
+        "loop_lag_p95": _percentile(probe.lags, 0.95),
+        "loop_lag_max": max(probe.lags, default=0.0),
+        "memory_start_mb": rss_start,
+        "memory_peak_mb": max(probe.rss + [rss_end]),
+        "memory_growth_mb": rss_end - rss_start,
+        "dashboard_events": sink.events,
+        "slack_messages": slack.posted + slack.updated,
+        "slack_coalesced": slack_stats["coalesced"],
+        "mongo_documents": mongo_docs,
+        "mongo_round_trips": mongo_round_trips,
+        "workdir": str(workdir),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Returns a description of every compared metric that regressed beyond `tolerance`."""
+    regressions = []
+    for name, higher_is_better in COMPARED.items():
+        old, new = baseline.get(name), report.get(name)
+        if old is None or new is None or old == 0:
+            continue
+        change = (new - old) / abs(old)
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}: {old:.4f} -> {new:.4f} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline AriaCEO orchestration benchmark")
+    parser.add_argument("--projects", type=int, default=1, help="Concurrent projects")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Mock time to first token (s)")
+    parser.add_argument("--tps", type=float, default=50.0, help="Mock generation speed (tokens/s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative latency jitter (0-1)")
+    parser.add_argument("--service-latency", type=float, default=0.0,
+                        help="Latency per fake GitHub/Docker/Redis/Mongo/Slack call (s)")
+    parser.add_argument("--max-round", type=int, default=40, help="GroupChat max_round")
+    parser.add_argument("--script", help="JSON file with scripted replies per agent")
+    parser.add_argument("--config", default=str(ROOT / "config" / "config.yaml"), help="Base config.yaml")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep AriaCEO's INFO logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+    if report["failures"]:
+        return 1
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Checkpoints of running projects.
+Persists each project's GroupChat messages, per-agent conversation
+histories, extracted file index and pipeline stage after every round, so a
+crashed or restarted project can be resumed where it stopped instead of
+being re-run from scratch.
+"""
+import time
+import diskcache as dc
+from loguru import logger
+from typing import Any, Dict, List, Optional
+
+from memory_manager import MemoryManager
+
+# Pipeline stages in order; a checkpoint records the next stage to run
+STAGES = ("chat", "extract", "github", "dockerhub", "done")
+
+INDEX_KEY = "checkpoint_index"
+
+
+class CheckpointStore:
+    """
+    diskcache-backed checkpoint store for project sessions.
+
+    Messages are kept in append-only MemoryManager logs, so a round only
+    writes the messages produced since the previous checkpoint:
+
+        {project_id}/GroupChat              -> GroupChat messages
+        {project_id}/{agent}->{counterpart} -> an agent's _oai_messages thread
+
+    Small metadata (stage, round, stage results, file index) lives in a
+    per-project record, and an index lists all unfinished projects.
+    """
+
+    def __init__(self, directory: str = "/tmp/aria_checkpoints", segment_size: int = 50,
+                 every_n_rounds: int = 1):
+        self.cache = dc.Cache(directory)
+        self.logs = MemoryManager(cache_dir=directory, segment_size=segment_size)
+        self.every_n_rounds = max(1, every_n_rounds)
+        logger.info(f"Initialized CheckpointStore at {directory}")
+
+    @staticmethod
+    def _meta_key(project_id: str) -> str:
+        return f"checkpoint:{project_id}"
+
+    @staticmethod
+    def _log_name(project_id: str, thread: str) -> str:
+        return f"{project_id}/{thread}"
+
+    def _update_index(self, project_id: str, stage: Optional[str]):
+        with self.cache.transact():
+            index = self.cache.get(INDEX_KEY, {})
+            if stage is None:
+                index.pop(project_id, None)
+            else:
+                index[project_id] = stage
+            self.cache.set(INDEX_KEY, index)
+
+    def _write_meta(self, session, **changes):
+        meta = session.checkpoint
+        meta.update(changes)
+        meta["updated_at"] = time.time()
+        self.cache.set(self._meta_key(session.project_id), meta)
+
+    def start(self, session, description: str, user: Optional[str] = None):
+        """
+        Creates the checkpoint for a new project.
+
+        Args:
+            session: The ProjectSession, with agents and GroupChat built.
+            description: The project description (needed to resume later stages).
+            user: The requesting user.
+        """
+        session.checkpoint = {
+            "project_id": session.project_id,
+            "description": description,
+            "user": user,
+            "channel": session.channel,
+            "stage": STAGES[0],
+            "round": 0,
+            "results": {},
+            "threads": [],
+            "files": {},
+            "memory_saved": {},
+            "created_at": time.time(),
+        }
+        self._write_meta(session)
+        self._update_index(session.project_id, STAGES[0])
+
+    def _participants(self, session) -> List[Any]:
+        return list(session.agents.values()) + ([session.manager] if session.manager else [])
+
+    def _append(self, session, thread: str, messages: List[Dict[str, Any]]):
+        """Writes the part of a message list not yet checkpointed."""
+        name = self._log_name(session.project_id, thread)
+        saved = session.checkpointed.get(thread, 0)
+        if len(messages) > saved:
+            self.logs.append_messages(name, messages[saved:])
+        elif len(messages) < saved:
+            # History was cleared or rewritten: replace the log
+            self.logs.clear_memory(name)
+            self.logs.append_messages(name, messages)
+        session.checkpointed[thread] = len(messages)
+
+    def save_round(self, session, force: bool = False):
+        """
+        Checkpoints the chat state after a GroupChat round.
+
+        Only every `every_n_rounds`-th round is written unless `force` is set.
+
+        Args:
+            session: The running ProjectSession.
+            force: Write even if this round would be skipped.
+        """
+        if session.checkpoint is None:
+            return
+        session.checkpoint["round"] += 1
+        if not force and session.checkpoint["round"] % self.every_n_rounds:
+            return
+        try:
+            self._append(session, "GroupChat", session.group_chat.messages)
+            threads = []
+            for agent in self._participants(session):
+                for counterpart, messages in getattr(agent, "_oai_messages", {}).items():
+                    thread = f"{agent.name}->{counterpart.name}"
+                    self._append(session, thread, messages)
+                    threads.append([agent.name, counterpart.name])
+            self._write_meta(
+                session,
+                threads=threads,
+                files=dict(session.code_extractor.index) if session.code_extractor else {},
+                memory_saved=dict(session.memory_saved),
+            )
+        except Exception as e:
+            logger.warning(f"Checkpoint of {session.project_id} failed at round "
+                           f"{session.checkpoint['round']}: {e}")
+
+    def set_stage(self, session, stage: str, **results):
+        """
+        Records that the pipeline has reached `stage`.
+
+        Args:
+            session: The running ProjectSession.
+            stage: One of STAGES.
+            **results: Results of the stage just finished (e.g. github=...).
+        """
+        if session.checkpoint is None:
+            return
+        session.checkpoint["results"].update(results)
+        self._write_meta(session, stage=stage)
+        self._update_index(session.project_id, stage)
+        logger.debug(f"Checkpoint {session.project_id}: stage '{stage}'")
+
+    def load(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a project's checkpoint, or None if there is none.
+
+        The returned dict is the metadata record plus 'messages' (GroupChat)
+        and 'histories' ({(agent, counterpart): messages}).
+
+        Args:
+            project_id: The project to load.
+        """
+        meta = self.cache.get(self._meta_key(project_id))
+        if meta is None:
+            return None
+        checkpoint = dict(meta)
+        checkpoint["messages"] = self.logs.get_memory(self._log_name(project_id, "GroupChat"))
+        checkpoint["histories"] = {
+            (agent, counterpart): self.logs.get_memory(
+                self._log_name(project_id, f"{agent}->{counterpart}"))
+            for agent, counterpart in meta.get("threads", [])
+        }
+        return checkpoint
+
+    def restore(self, session, checkpoint: Dict[str, Any]):
+        """
+        Puts a loaded checkpoint back into a freshly built session.
+
+        Args:
+            session: A new ProjectSession for the same project_id.
+            checkpoint: The result of load().
+        """
+        session.checkpoint = {key: value for key, value in checkpoint.items()
+                              if key not in ("messages", "histories")}
+        session.group_chat.messages = list(checkpoint["messages"])
+        session.checkpointed["GroupChat"] = len(checkpoint["messages"])
+
+        participants = {agent.name: agent for agent in self._participants(session)}
+        for (agent_name, counterpart_name), messages in checkpoint["histories"].items():
+            agent = participants.get(agent_name)
+            counterpart = participants.get(counterpart_name)
+            if agent is None or counterpart is None:
+                logger.warning(f"Skipping checkpointed history {agent_name}->{counterpart_name}: "
+                               f"agent no longer exists")
+                continue
+            agent._oai_messages[counterpart] = list(messages)
+            session.checkpointed[f"{agent_name}->{counterpart_name}"] = len(messages)
+
+        if session.code_extractor:
+            session.code_extractor.index = dict(checkpoint.get("files", {}))
+        session.memory_saved.update(checkpoint.get("memory_saved", {}))
+        logger.info(f"Restored {session.project_id} at stage '{checkpoint['stage']}', "
+                    f"round {checkpoint['round']} ({len(checkpoint['messages'])} messages)")
+
+    def finish(self, project_id: str):
+        """
+        Deletes a project's checkpoint once the pipeline has completed.
+
+        Args:
+            project_id: The finished project.
+        """
+        meta = self.cache.get(self._meta_key(project_id)) or {}
+        self.logs.clear_memory(self._log_name(project_id, "GroupChat"))
+        for agent, counterpart in meta.get("threads", []):
+            self.logs.clear_memory(self._log_name(project_id, f"{agent}->{counterpart}"))
+        self.cache.delete(self._meta_key(project_id))
+        self._update_index(project_id, None)
+
+    def pending(self) -> Dict[str, str]:
+        """Returns {project_id: next stage} for every unfinished project."""
+        return dict(self.cache.get(INDEX_KEY, {}))
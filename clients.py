@@ -0,0 +1,194 @@
+"""
+Shared client registry for tools.py.
+Lazily creates one pooled Redis, MongoDB, GitHub and Docker client per
+process from the 'database'/'github' sections of config.yaml, checks their
+health before reuse and closes them cleanly on shutdown.
+"""
+import atexit
+import os
+import threading
+import time
+import yaml
+from pathlib import Path
+from loguru import logger
+from typing import Any, Callable, Dict, Optional
+
+CONFIG_PATH = Path("/opt/aria-system/config/config.yaml")
+HEALTH_CHECK_INTERVAL = 30
+
+
+class ClientRegistry:
+    """
+    Process-wide cache of external service clients.
+
+    Clients are built on first use and shared by all tool calls (including
+    those running on the executor thread pool). A client that fails its
+    health check is closed and rebuilt on the next request.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self._config = config
+        self._clients: Dict[str, Any] = {}
+        self._checked_at: Dict[str, float] = {}
+        # Guards the dicts only; health checks and connects hold the per-service lock
+        self._lock = threading.RLock()
+        self._service_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """The loaded config.yaml (read from disk on first access if not configured)."""
+        if self._config is None:
+            self._config = {}
+            if CONFIG_PATH.exists():
+                with open(CONFIG_PATH) as f:
+                    self._config = yaml.safe_load(f) or {}
+        return self._config
+
+    def configure(self, config: Dict[str, Any]):
+        """
+        Sets the configuration and drops clients built from an older one.
+
+        Args:
+            config: The full config.yaml dict (as loaded by AriaCEO).
+        """
+        with self._lock:
+            self.close()
+            self._config = config or {}
+
+    def _db(self, name: str) -> Dict[str, Any]:
+        return (self.config.get('database', {}) or {}).get(name, {}) or {}
+
+    def _service_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            lock = self._service_locks.get(name)
+            if lock is None:
+                lock = self._service_locks[name] = threading.Lock()
+            return lock
+
+    def _get(self, name: str, factory: Callable[[], Any], ping: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            client = self._clients.get(name)
+            if client is not None and time.monotonic() - self._checked_at.get(name, 0) <= HEALTH_CHECK_INTERVAL:
+                return client
+        # A slow ping or connect only blocks callers of the same service
+        with self._service_lock(name):
+            with self._lock:
+                client = self._clients.get(name)
+                checked_at = self._checked_at.get(name, 0)
+            now = time.monotonic()
+            if client is not None and now - checked_at > HEALTH_CHECK_INTERVAL:
+                try:
+                    ping(client)
+                    with self._lock:
+                        self._checked_at[name] = now
+                except Exception as e:
+                    logger.warning(f"{name} client failed health check, reconnecting: {e}")
+                    with self._lock:
+                        if self._clients.get(name) is client:
+                            self._close_one(name)
+                    client = None
+            if client is None:
+                client = factory()
+                with self._lock:
+                    self._clients[name] = client
+                    self._checked_at[name] = time.monotonic()
+                logger.info(f"Created pooled {name} client")
+            return client
+
+    def override(self, name: str, client: Any):
+        """
+        Installs a ready-made client (e.g. an in-memory fake) under `name`.
+
+        Overridden clients are never health-checked; configure() and close()
+        drop them like any other client.
+
+        Args:
+            name: 'redis', 'mongo', 'github' or 'docker'.
+            client: The client object to return.
+        """
+        with self._lock:
+            self._close_one(name)
+            self._clients[name] = client
+            self._checked_at[name] = float('inf')
+
+    # --- Factories ---
+
+    def redis(self):
+        """Returns a Redis client backed by a shared connection pool."""
+        def factory():
+            from redis import ConnectionPool, Redis
+            conf = self._db('redis')
+            pool = ConnectionPool(
+                host=conf.get('host') or os.environ.get("REDIS_HOST", "localhost"),
+                port=int(conf.get('port') or os.environ.get("REDIS_PORT", 6379)),
+                db=conf.get('db', 0),
+                password=conf.get('password'),
+                max_connections=conf.get('max_connections', 20),
+                health_check_interval=HEALTH_CHECK_INTERVAL,
+                decode_responses=True,
+            )
+            return Redis(connection_pool=pool)
+        return self._get('redis', factory, lambda client: client.ping())
+
+    def mongo_db(self):
+        """Returns the configured MongoDB database from a pooled MongoClient."""
+        conf = self._db('mongodb')
+        name = conf.get('database') or os.environ.get("MONGO_DB_NAME", "aria_logs")
+        return self.mongo()[name]
+
+    def mongo(self):
+        """Returns a shared MongoClient (pymongo pools connections internally)."""
+        def factory():
+            from pymongo import MongoClient
+            conf = self._db('mongodb')
+            if conf.get('host'):
+                uri = f"mongodb://{conf['host']}:{conf.get('port', 27017)}/"
+            else:
+                uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+            return MongoClient(
+                uri,
+                maxPoolSize=conf.get('max_pool_size', 20),
+                serverSelectionTimeoutMS=conf.get('timeout_ms', 5000),
+            )
+        return self._get('mongo', factory, lambda client: client.admin.command('ping'))
+
+    def github(self):
+        """Returns a shared PyGithub client."""
+        def factory():
+            from github import Github
+            token = (self.config.get('github', {}) or {}).get('token') or os.environ.get("GITHUB_TOKEN", "YOUR_GITHUB_TOKEN")
+            return Github(token, pool_size=(self.config.get('github', {}) or {}).get('pool_size', 10))
+        # GitHub is stateless HTTP; the session pool recovers by itself
+        return self._get('github', factory, lambda client: None)
+
+    def docker(self):
+        """Returns a shared docker-py client."""
+        def factory():
+            import docker
+            return docker.from_env()
+        return self._get('docker', factory, lambda client: client.ping())
+
+    # --- Shutdown ---
+
+    def _close_one(self, name: str):
+        client = self._clients.pop(name, None)
+        self._checked_at.pop(name, None)
+        if client is None:
+            return
+        try:
+            if name == 'redis':
+                client.connection_pool.disconnect()
+            elif hasattr(client, 'close'):
+                client.close()
+        except Exception as e:
+            logger.warning(f"Error closing {name} client: {e}")
+
+    def close(self):
+        """Closes every client that has been created."""
+        with self._lock:
+            for name in list(self._clients):
+                self._close_one(name)
+
+
+registry = ClientRegistry()
+atexit.register(registry.close)
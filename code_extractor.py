@@ -0,0 +1,133 @@
+"""
+Streaming extraction of code deliverables from chat messages.
+Parses '# File: path' headers and fenced code blocks as each message is
+produced and writes the latest version of every file to the project
+directory, skipping files whose content has not changed.
+"""
+import hashlib
+import re
+from pathlib import Path
+from loguru import logger
+from typing import Dict, List, Optional, Tuple
+
+# '# File: backend/main.py', '// File: src/App.tsx', '**File: README.md**'
+FILE_HEADER = re.compile(r"^\s*(?:#+|//|\*\*)?\s*File:\s*`?([^\s`*]+)`?\**\s*$", re.IGNORECASE)
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def parse_code_blocks(content: str) -> List[Tuple[str, str]]:
+    """
+    Returns (path, code) pairs for every fenced block tagged with a file header.
+
+    The header may precede the fence or be the first line inside it.
+    """
+    blocks = []
+    pending_path: Optional[str] = None
+    fence: Optional[str] = None
+    block_path: Optional[str] = None
+    lines: List[str] = []
+
+    for line in content.splitlines():
+        if fence is None:
+            header = FILE_HEADER.match(line)
+            if header:
+                pending_path = header.group(1)
+                continue
+            opening = FENCE.match(line)
+            if opening:
+                fence = opening.group(1)
+                block_path = pending_path
+                pending_path = None
+                lines = []
+            elif line.strip():
+                # Prose between header and fence cancels the header
+                pending_path = None
+            continue
+
+        if line.strip().startswith(fence):
+            if block_path is None and lines:
+                header = FILE_HEADER.match(lines[0])
+                if header:
+                    block_path = header.group(1)
+                    lines = lines[1:]
+            if block_path:
+                blocks.append((block_path, "\n".join(lines) + "\n"))
+            fence = None
+            block_path = None
+            continue
+        lines.append(line)
+
+    return blocks
+
+
+class StreamingCodeExtractor:
+    """
+    Incrementally writes code files for one project as messages arrive.
+
+    Keeps a path -> content-hash index so unchanged files are never
+    rewritten; the last version of a path wins.
+    """
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = Path(project_dir)
+        self.index: Dict[str, str] = {}
+        self.written = 0
+        self.skipped = 0
+
+    def _target(self, path: str) -> Optional[Path]:
+        target = (self.project_dir / path.lstrip("/")).resolve()
+        if self.project_dir.resolve() not in target.parents:
+            logger.warning(f"Ignoring file outside the project directory: {path}")
+            return None
+        return target
+
+    def feed(self, content) -> List[str]:
+        """
+        Extracts and writes the files contained in one message.
+
+        Args:
+            content: Message content.
+
+        Returns:
+            The paths written (new or changed).
+        """
+        if not isinstance(content, str) or "```" not in content and "~~~" not in content:
+            return []
+
+        changed = []
+        for path, code in parse_code_blocks(content):
+            digest = hashlib.sha256(code.encode()).hexdigest()
+            if self.index.get(path) == digest:
+                self.skipped += 1
+                continue
+            target = self._target(path)
+            if target is None:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(code)
+            self.index[path] = digest
+            self.written += 1
+            changed.append(path)
+
+        if changed:
+            logger.debug(f"Extracted {', '.join(changed)} into {self.project_dir}")
+        return changed
+
+    @property
+    def files(self) -> List[str]:
+        """Paths of all files extracted so far."""
+        return sorted(self.index)
+
+    def make_hook(self):
+        """
+        Returns an AutoGen 'process_message_before_send' hook that extracts
+        files from every outgoing message and passes it through unchanged.
+        """
+        def hook(sender, message, recipient, silent):
+            content = message.get('content') if isinstance(message, dict) else message
+            try:
+                self.feed(content)
+            except Exception as e:
+                logger.warning(f"Code extraction failed for message from {getattr(sender, 'name', '?')}: {e}")
+            return message
+        return hook
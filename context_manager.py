@@ -0,0 +1,178 @@
+"""
+Token-budgeted context windowing for agent memory.
+Keeps the most recent turns verbatim and folds older turns into a cached
+rolling summary, so the prompt loaded into each agent stays within the
+token budget of its model no matter how large the stored history grows.
+"""
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional
+
+from memory_manager import MemoryManager
+
+DEFAULT_BUDGET = 8192
+_UNSET = object()
+_encoding = _UNSET
+
+
+def _get_encoding():
+    """tiktoken's cl100k_base, loaded on the first token count (None if unavailable)."""
+    global _encoding
+    if _encoding is _UNSET:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of a text (tiktoken if installed, else ~4 characters per token)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Approximate tokens used by one chat message, including role/name overhead."""
+    content = message.get('content') or ''
+    if not isinstance(content, str):
+        content = str(content)
+    return estimate_tokens(content) + 4
+
+
+def extractive_summary(previous: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+    """
+    Default summarizer: folds messages into the previous summary as one line
+    per message (speaker and first line), trimming the oldest lines to fit.
+
+    Cheap and deterministic, so it never costs an LLM round trip.
+    """
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        content = message.get('content') or ''
+        if not isinstance(content, str):
+            content = str(content)
+        first_line = next((line.strip() for line in content.splitlines() if line.strip()), '')
+        if not first_line:
+            continue
+        speaker = message.get('name') or message.get('role', 'unknown')
+        lines.append(f"- {speaker}: {first_line[:160]}")
+
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ContextManager:
+    """
+    Builds the history injected into an agent from its stored memory log.
+
+    The budget for a model comes from the 'context' section of config.yaml.
+    A share of it ('recent_share') is filled with the newest messages
+    verbatim; everything older is folded into a rolling summary that is
+    cached in the memory store and only extended with the messages that
+    became stale since the last load.
+    """
+
+    def __init__(self, memory_manager: MemoryManager, context_config: Dict[str, Any],
+                 summarizer: Optional[Callable[[str, List[Dict[str, Any]], int], str]] = None):
+        self.memory_manager = memory_manager
+        self.config = context_config or {}
+        self.default_budget = self.config.get('default_budget', DEFAULT_BUDGET)
+        self.budgets = self.config.get('budgets', {}) or {}
+        self.recent_share = self.config.get('recent_share', 0.75)
+        self.fold_chunk = max(1, self.config.get('fold_chunk', 50))
+        self.summarizer = summarizer or extractive_summary
+
+    def budget_for(self, model: Optional[str]) -> int:
+        """
+        Returns the token budget for a model.
+
+        Args:
+            model: The model name (e.g. 'qwen2.5-coder:32b-instruct-q6_K').
+        """
+        return self.budgets.get(model, self.default_budget) if model else self.default_budget
+
+    def _recent(self, name: str, start: int, end: int, budget: int) -> int:
+        """Returns the absolute index where the verbatim window begins."""
+        first = end
+        used = 0
+        while first > start:
+            chunk_start = max(start, first - self.fold_chunk)
+            chunk = self.memory_manager.get_range(name, chunk_start, first)
+            for message in reversed(chunk):
+                cost = message_tokens(message)
+                if used + cost > budget:
+                    return first
+                used += cost
+                first -= 1
+        return first
+
+    def _fold(self, name: str, start: int, upto: int, summary_budget: int) -> Dict[str, Any]:
+        """Extends the cached rolling summary so that it covers records before `upto`."""
+        state = self.memory_manager.get_state(name) or {"upto": start, "summary": ""}
+        # Records before the log start were compacted away; summarize from there
+        position = max(state["upto"], start)
+        summary = state["summary"]
+        folded = 0
+        while position < upto:
+            chunk_end = min(upto, position + self.fold_chunk)
+            chunk = self.memory_manager.get_range(name, position, chunk_end)
+            summary = self.summarizer(summary, chunk, summary_budget)
+            folded += len(chunk)
+            position = chunk_end
+            # Persist after every chunk so an interrupted fold is not redone
+            state = {"upto": position, "summary": summary}
+            self.memory_manager.set_state(name, state)
+        if folded:
+            logger.debug(f"Folded {folded} stale messages into the summary for {name}")
+        return state
+
+    def build(self, name: str, model: Optional[str] = None,
+              summary_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the windowed history for an agent or the GroupChat.
+
+        Args:
+            name: Memory log name (agent name or 'GroupChat').
+            model: Model the history is sent to; selects the token budget.
+            summary_name: Optional 'name' field for the summary message.
+
+        Returns:
+            A list of messages: an optional summary message followed by the
+            most recent messages verbatim.
+        """
+        start, end = self.memory_manager.bounds(name)
+        if start >= end:
+            return []
+
+        budget = self.budget_for(model)
+        recent_budget = int(budget * self.recent_share)
+        summary_budget = max(0, budget - recent_budget)
+
+        window_start = self._recent(name, start, end, recent_budget)
+        state = self.memory_manager.get_state(name)
+        if window_start > start:
+            state = self._fold(name, start, window_start, summary_budget)
+        # A summary that already covers part of the window wins over the verbatim copy
+        if state and state["upto"] > window_start:
+            window_start = min(state["upto"], end)
+
+        messages = []
+        if state and state["summary"] and state["upto"] > start:
+            summary = {
+                "role": "system",
+                "content": f"Summary of earlier conversation:\n{state['summary']}",
+            }
+            if summary_name:
+                summary["name"] = summary_name
+            messages.append(summary)
+        messages.extend(self.memory_manager.get_range(name, window_start, end))
+
+        logger.info(f"Context for {name}: {end - window_start} recent messages verbatim, "
+                    f"{window_start - start} summarized (budget {budget} tokens)")
+        return messages
@@ -0,0 +1,130 @@
+"""
+Early termination for GroupChat rounds.
+Ends the chat once every required deliverable has been extracted, or when
+agents keep repeating near-identical messages (MinHash over word shingles).
+"""
+import fnmatch
+import hashlib
+import re
+from collections import deque
+from loguru import logger
+from typing import Any, Dict, List, Optional, Sequence
+
+# Required deliverables (from Aria's system message) -> accepted file patterns
+DEFAULT_DELIVERABLES = {
+    "backend": ["backend/*", "app/*", "src/*", "main.py", "app.py", "server.js", "index.js"],
+    "tests": ["tests/*", "test_*.py", "*_test.py", "*.test.js", "*.spec.js", "*.test.ts"],
+    "Dockerfile": ["Dockerfile", "*/Dockerfile"],
+    "docker-compose.yml": ["docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml"],
+    "README.md": ["README.md"],
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"\w+")
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """Fixed-seed MinHash over word shingles."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5):
+        self.shingle_size = shingle_size
+        self.permutations = [
+            (_hash64(f"a{i}") % _MERSENNE_PRIME | 1, _hash64(f"b{i}") % _MERSENNE_PRIME)
+            for i in range(num_perm)
+        ]
+
+    def signature(self, text: str) -> Optional[List[int]]:
+        """Returns the MinHash signature, or None if the text is too short to compare."""
+        words = _WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return None
+        shingles = {
+            _hash64(" ".join(words[i:i + self.shingle_size]))
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+        return [min((a * h + b) % _MERSENNE_PRIME for h in shingles) for a, b in self.permutations]
+
+    @staticmethod
+    def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class ConvergenceMonitor:
+    """
+    Decides when a project chat has converged or stalled.
+
+    Use `is_termination_msg` as the GroupChatManager's termination check;
+    it sees every message appended to the GroupChat. After it returns True,
+    `reason` says why.
+    """
+
+    def __init__(self, code_extractor, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.code_extractor = code_extractor
+        self.deliverables = config.get('deliverables', DEFAULT_DELIVERABLES)
+        self.grace_rounds = config.get('grace_rounds', 3)
+        self.similarity_threshold = config.get('similarity_threshold', 0.85)
+        self.max_repeats = config.get('max_repeats', 3)
+        self.hasher = MinHasher(config.get('num_perm', 64), config.get('shingle_size', 5))
+        self.recent = deque(maxlen=config.get('window', 10))
+        self.repeats = 0
+        self.rounds_since_complete: Optional[int] = None
+        self.reason: Optional[str] = None
+
+    def missing_deliverables(self) -> List[str]:
+        """Deliverables with no matching extracted file yet."""
+        files = self.code_extractor.files if self.code_extractor else []
+        return [
+            name for name, patterns in self.deliverables.items()
+            if not any(fnmatch.fnmatch(path, pattern) for path in files for pattern in patterns)
+        ]
+
+    def _is_repeat(self, content: str) -> bool:
+        signature = self.hasher.signature(content)
+        if signature is None:
+            return False
+        repeat = any(
+            MinHasher.similarity(signature, previous) >= self.similarity_threshold
+            for previous in self.recent
+        )
+        self.recent.append(signature)
+        return repeat
+
+    def is_termination_msg(self, message: Dict[str, Any]) -> bool:
+        """
+        Observes one GroupChat message and returns True if the chat should end.
+
+        Args:
+            message: The message just appended to the GroupChat.
+        """
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+
+        if content.rstrip().endswith("TERMINATE"):
+            self.reason = "terminated by agent"
+            return True
+
+        # Stall: consecutive messages that closely repeat recent ones
+        if not message.get("tool_calls") and not message.get("tool_responses"):
+            self.repeats = self.repeats + 1 if self._is_repeat(content) else 0
+            if self.repeats >= self.max_repeats:
+                self.reason = f"stalled: {self.repeats} consecutive near-duplicate messages"
+                return True
+
+        # Converged: every deliverable exists; allow a few rounds to wrap up
+        if self.rounds_since_complete is None:
+            if not self.missing_deliverables():
+                self.rounds_since_complete = 0
+                logger.info("All required deliverables extracted")
+        else:
+            self.rounds_since_complete += 1
+        if self.rounds_since_complete is not None and self.rounds_since_complete >= self.grace_rounds:
+            self.reason = "all required deliverables present"
+            return True
+        return False
@@ -0,0 +1,136 @@
+"""
+Live streaming of GroupChat messages to the dashboard.
+Messages are pushed onto a bounded queue as agents produce them and sent
+in batches by a background task, so a slow dashboard socket never blocks
+the agents.
+"""
+import asyncio
+from loguru import logger
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class DashboardStreamer:
+    """
+    Bounded, batching publisher in front of a dashboard send coroutine.
+
+    publish() never blocks: when the queue is full the oldest pending
+    message is dropped (and counted) so the producer keeps going.
+    """
+
+    def __init__(self, send: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                 max_queue: int = 500, batch_size: int = 20, flush_interval: float = 0.25):
+        """
+        Args:
+            send: Coroutine taking (event_type, data), e.g. AriaCEO._broadcast_to_dashboard.
+            max_queue: Maximum number of pending messages before dropping the oldest.
+            batch_size: Maximum number of messages per 'chat_batch' event.
+            flush_interval: Seconds to wait for more messages before sending a partial batch.
+        """
+        self.send = send
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.queue: Optional[asyncio.Queue] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.project_id = None
+        self.message_count = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def start(self, project_id: str):
+        """Starts the background sender for a project. Must be called from the event loop."""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.project_id = project_id
+        self.message_count = 0
+        self.sent = 0
+        self.dropped = 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flushes pending messages and stops the background sender."""
+        if not self._task:
+            return
+        await self.queue.put(None)
+        try:
+            await self._task
+        finally:
+            self._task = None
+        logger.info(f"Dashboard stream for {self.project_id} closed: "
+                    f"{self.sent} sent, {self.dropped} dropped")
+
+    def publish(self, agent_name: str, content: Any):
+        """
+        Queues a chat message for the dashboard. Safe to call from any thread.
+
+        Args:
+            agent_name: Name of the agent that produced the message.
+            content: Message content.
+        """
+        if not self._task or not self.loop or self.loop.is_closed():
+            return
+        self.message_count += 1
+        item = {
+            'project_id': self.project_id,
+            'message_number': self.message_count,
+            'agent': agent_name,
+            'content': content,
+        }
+        self.loop.call_soon_threadsafe(self._enqueue, item)
+
+    def _enqueue(self, item: Dict[str, Any]):
+        # Runs on the event loop; drop the oldest message instead of waiting
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except asyncio.QueueFull:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+
+    async def _run(self):
+        done = False
+        while not done:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch: List[Dict[str, Any]] = [item]
+            deadline = self.loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            await self.send('chat_batch', {
+                'project_id': self.project_id,
+                'messages': batch,
+            })
+            self.sent += len(batch)
+        except Exception as e:
+            logger.warning(f"Error streaming batch to dashboard: {e}")
+
+    def make_hook(self):
+        """
+        Returns an AutoGen 'process_message_before_send' hook that publishes
+        every outgoing message and passes it through unchanged.
+        """
+        def hook(sender, message, recipient, silent):
+            content = message.get('content') if isinstance(message, dict) else message
+            self.publish(getattr(sender, 'name', 'Unknown'), content)
+            return message
+        return hook
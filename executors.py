@@ -0,0 +1,317 @@
+"""
+Executor layer for blocking work.
+Runs I/O-bound calls (GitHub, Redis, MongoDB) on a thread pool and
+CPU/subprocess-bound calls (builds, docker, git CLI) in child processes,
+so the event loop, dashboard and Slack updates stay responsive.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import multiprocessing
+import os
+import signal
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional
+
+# Tools that spend their time in subprocesses or docker builds
+PROCESS_TOOLS = {
+    'build_frontend',
+    'build_docker_image',
+    'run_docker_compose',
+    'git_clone',
+    'git_push',
+}
+
+DEFAULT_TIMEOUT = 900
+# Seconds a timed-out child gets between SIGTERM and SIGKILL
+KILL_GRACE = 5
+
+
+def _run_in_child(conn, client_config: Optional[Dict[str, Any]], func: Callable, args, kwargs):
+    """Entry point of a process tool call: own process group and the parent's client config."""
+    # Subprocesses the tool starts (docker, npm, git) share the group and are killed with it
+    os.setsid()
+    try:
+        if client_config is not None:
+            from clients import registry
+            registry.configure(client_config)
+        result = (True, func(*args, **kwargs))
+    except BaseException as e:
+        result = (False, e)
+    try:
+        conn.send(result)
+    except Exception as e:
+        # Unpicklable result or exception
+        conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+    finally:
+        conn.close()
+
+
+class ToolExecutor:
+    """
+    Thread pool and killable child processes with async wrappers and timeouts.
+
+    Timeouts are enforced with asyncio.wait_for. Thread pool work that
+    times out keeps its thread until it returns; a process call that times
+    out has its whole process group terminated, so a hung build does not
+    keep running or hold one of the process_workers slots.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 client_config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: The 'executors' section of config.yaml.
+            client_config: Full config passed to clients.registry in child processes.
+        """
+        config = config or {}
+        self.client_config = client_config
+        self.default_timeout = config.get('default_timeout', DEFAULT_TIMEOUT)
+        self.timeouts = config.get('timeouts', {}) or {}
+        self.process_tools = set(config.get('process_tools', PROCESS_TOOLS))
+        self.io_pool = ThreadPoolExecutor(
+            max_workers=config.get('io_workers', 8),
+            thread_name_prefix="aria-io",
+        )
+        # 'spawn' avoids forking a process that has an event loop and threads running
+        self._mp = multiprocessing.get_context("spawn")
+        self.process_workers = max(1, config.get('process_workers', 2))
+        self._process_slots = asyncio.Semaphore(self.process_workers)
+        self._children = set()
+        logger.info(f"Initialized ToolExecutor (io={self.io_pool._max_workers}, "
+                    f"process={self.process_workers})")
+
+    async def _run(self, pool, func: Callable, args, kwargs, timeout: Optional[float]):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        future = loop.run_in_executor(pool, call)
+        return await asyncio.wait_for(future, timeout or self.default_timeout)
+
+    async def run_io(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Runs a blocking I/O-bound call on the thread pool.
+
+        Args:
+            func: The callable to run.
+            timeout: Seconds before asyncio.TimeoutError (default: default_timeout).
+
+        Returns:
+            The callable's return value.
+        """
+        return await self._run(self.io_pool, func, args, kwargs, timeout)
+
+    async def run_process(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Runs a CPU/subprocess-bound call on the process pool.
+
+        Each call runs in its own spawned process (at most process_workers
+        at a time) whose process group is killed on timeout or cancellation.
+        The callable and its arguments must be picklable (module-level functions).
+
+        Args:
+            func: The callable to run.
+            timeout: Seconds before asyncio.TimeoutError (default: default_timeout).
+
+        Returns:
+            The callable's return value.
+        """
+        async with self._process_slots:
+            return await self._run_child(func, args, kwargs, timeout or self.default_timeout)
+
+    async def _run_child(self, func: Callable, args, kwargs, timeout: float):
+        loop = asyncio.get_running_loop()
+        receiver, sender = self._mp.Pipe(duplex=False)
+        process = self._mp.Process(target=_run_in_child, args=(sender, self.client_config, func, args, kwargs),
+                                   name=f"aria-tool-{getattr(func, '__name__', 'call')}", daemon=True)
+        process.start()
+        sender.close()
+        self._children.add(process)
+        ready = loop.create_future()
+        loop.add_reader(receiver.fileno(), lambda: ready.done() or ready.set_result(None))
+        killing = False
+        try:
+            await asyncio.wait_for(ready, timeout)
+            try:
+                ok, value = receiver.recv()
+            except EOFError:
+                process.join(1)
+                raise RuntimeError(f"Process {process.name} exited with code {process.exitcode}") from None
+            await loop.run_in_executor(self.io_pool, process.join)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Stop the child and everything it started, without blocking the loop
+            killing = True
+            try:
+                self.io_pool.submit(self._kill, process)
+            except RuntimeError:
+                self._kill(process, grace=1)
+            raise
+        finally:
+            loop.remove_reader(receiver.fileno())
+            receiver.close()
+            # _kill forgets the child once it is gone; until then shutdown() can still reach it
+            if not killing:
+                self._children.discard(process)
+        if ok:
+            return value
+        raise value
+
+    def _kill(self, process, grace: float = KILL_GRACE):
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                # Not yet in its own group (or already gone)
+                process.terminate() if sig == signal.SIGTERM else process.kill()
+            except PermissionError:
+                process.kill()
+            process.join(grace)
+            if not process.is_alive():
+                break
+        self._children.discard(process)
+        logger.warning(f"Killed {process.name} (pid {process.pid})")
+
+    def wrap_tool(self, tool_func: Callable) -> Callable:
+        """
+        Returns an async version of a tools.py function for AutoGen registration.
+
+        The wrapper keeps the tool's name, docstring and signature, picks the
+        pool from PROCESS_TOOLS, and turns timeouts into the usual
+        "Error: ..." tool result instead of raising into the chat.
+        """
+        name = tool_func.__name__
+        in_process = name in self.process_tools
+        timeout = self.timeouts.get(name, self.default_timeout)
+
+        @functools.wraps(tool_func)
+        async def wrapper(*args, **kwargs):
+            try:
+                if in_process:
+                    return await self.run_process(tool_func, *args, timeout=timeout, **kwargs)
+                return await self.run_io(tool_func, *args, timeout=timeout, **kwargs)
+            except asyncio.TimeoutError:
+                logger.error(f"Tool '{name}' timed out after {timeout}s")
+                return f"Error: Tool '{name}' timed out after {timeout} seconds."
+
+        return wrapper
+
+    def shutdown(self, wait: bool = False):
+        """Stops the thread pool, cancels queued work and kills running child processes."""
+        for process in list(self._children):
+            self._kill(process, grace=1)
+        self.io_pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info("ToolExecutor shut down")
+
+
+class ToolDispatcher:
+    """
+    Runs the tool calls of one agent turn concurrently.
+
+    All calls in a turn are issued by one LLM response, so none can depend
+    on another's result; they are started together and their results are
+    returned in call order. Limits that still apply:
+
+    - `tool_concurrency`: maximum concurrent calls per tool, shared by all
+      sessions of this process (e.g. {'run_pytest': 2}).
+    - `serial_groups`: tools that touch the same resource (e.g. a docker
+      build and a compose run on the same project) run one at a time, in
+      the order they were called.
+
+    Timeouts are enforced per call by ToolExecutor.wrap_tool.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.concurrency = config.get('tool_concurrency', {}) or {}
+        self.groups: Dict[str, str] = {}
+        for group, names in (config.get('serial_groups', {}) or {}).items():
+            for name in names:
+                self.groups[name] = group
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._group_locks: "weakref.WeakKeyDictionary[Any, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+        self.parallel_turns = 0
+
+    def _limit(self, name: str) -> Optional[asyncio.Semaphore]:
+        if name not in self.concurrency:
+            return None
+        if name not in self._limits:
+            self._limits[name] = asyncio.Semaphore(max(1, int(self.concurrency[name])))
+        return self._limits[name]
+
+    def _group_lock(self, agent, name: str) -> Optional[asyncio.Lock]:
+        group = self.groups.get(name)
+        if group is None:
+            return None
+        # Per agent: different sessions work on different project directories
+        locks = self._group_locks.setdefault(agent, {})
+        if group not in locks:
+            locks[group] = asyncio.Lock()
+        return locks[group]
+
+    async def _call(self, agent, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        function = tool_call.get("function", {})
+        name = function.get("name", "")
+        response = {"tool_call_id": tool_call.get("id"), "role": "tool"}
+        func = agent.function_map.get(name)
+        if func is None:
+            response["content"] = f"Error: Function {name} not found."
+            return response
+        try:
+            arguments = json.loads(function.get("arguments") or "{}")
+        except json.JSONDecodeError as e:
+            response["content"] = f"Error: Function {name} arguments are not valid JSON: {e}"
+            return response
+
+        limit = self._limit(name)
+        lock = self._group_lock(agent, name)
+        try:
+            async with AsyncExitStack() as held:
+                if lock:
+                    await held.enter_async_context(lock)
+                if limit:
+                    await held.enter_async_context(limit)
+                result = func(**arguments)
+                if inspect.isawaitable(result):
+                    result = await result
+        except Exception as e:
+            logger.error(f"Tool '{name}' of {agent.name} failed: {e}")
+            result = f"Error: {e}"
+        response["content"] = result if isinstance(result, str) else str(result)
+        return response
+
+    async def run_calls(self, agent, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Executes tool calls concurrently and returns the tool responses in call order.
+
+        Args:
+            agent: The agent whose function_map holds the registered tools.
+            tool_calls: The 'tool_calls' of an assistant message.
+        """
+        if len(tool_calls) > 1:
+            self.parallel_turns += 1
+            logger.debug(f"{agent.name}: running {len(tool_calls)} tool calls concurrently")
+        return list(await asyncio.gather(*(self._call(agent, call) for call in tool_calls)))
+
+    def make_reply(self):
+        """
+        Returns an async AutoGen reply function that answers a message with
+        tool calls; register it with position=0 so it replaces AutoGen's
+        one-by-one tool execution.
+        """
+        async def reply(recipient, messages=None, sender=None, config=None):
+            if messages is None:
+                messages = recipient._oai_messages[sender]
+            message = messages[-1] if messages else {}
+            tool_calls = message.get("tool_calls")
+            if not tool_calls:
+                return False, None
+            responses = await self.run_calls(recipient, tool_calls)
+            return True, {
+                "role": "tool",
+                "tool_responses": responses,
+                "content": "\n\n".join(response["content"] for response in responses),
+            }
+        return reply
@@ -127,6 +127,98 @@ cp tools.py /opt/aria-system/agents/tools.py
 chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/tools.py
 chmod 644 /opt/aria-system/agents/tools.py
 
+cp llm_router.py /opt/aria-system/agents/llm_router.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/llm_router.py
+chmod 644 /opt/aria-system/agents/llm_router.py
+
+cp dashboard_stream.py /opt/aria-system/agents/dashboard_stream.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/dashboard_stream.py
+chmod 644 /opt/aria-system/agents/dashboard_stream.py
+
+cp context_manager.py /opt/aria-system/agents/context_manager.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/context_manager.py
+chmod 644 /opt/aria-system/agents/context_manager.py
+
+cp project_session.py /opt/aria-system/agents/project_session.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/project_session.py
+chmod 644 /opt/aria-system/agents/project_session.py
+
+cp executors.py /opt/aria-system/agents/executors.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/executors.py
+chmod 644 /opt/aria-system/agents/executors.py
+
+cp clients.py /opt/aria-system/agents/clients.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/clients.py
+chmod 644 /opt/aria-system/agents/clients.py
+
+cp git_batch.py /opt/aria-system/agents/git_batch.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/git_batch.py
+chmod 644 /opt/aria-system/agents/git_batch.py
+
+cp code_extractor.py /opt/aria-system/agents/code_extractor.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/code_extractor.py
+chmod 644 /opt/aria-system/agents/code_extractor.py
+
+cp llm_cache.py /opt/aria-system/agents/llm_cache.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/llm_cache.py
+chmod 644 /opt/aria-system/agents/llm_cache.py
+
+cp speaker_selection.py /opt/aria-system/agents/speaker_selection.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/speaker_selection.py
+chmod 644 /opt/aria-system/agents/speaker_selection.py
+
+cp convergence.py /opt/aria-system/agents/convergence.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/convergence.py
+chmod 644 /opt/aria-system/agents/convergence.py
+
+cp checkpoint.py /opt/aria-system/agents/checkpoint.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/checkpoint.py
+chmod 644 /opt/aria-system/agents/checkpoint.py
+
+cp task_queue.py /opt/aria-system/agents/task_queue.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/task_queue.py
+chmod 644 /opt/aria-system/agents/task_queue.py
+
+cp worker.py /opt/aria-system/agents/worker.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/worker.py
+chmod 644 /opt/aria-system/agents/worker.py
+
+cp mongo_writer.py /opt/aria-system/agents/mongo_writer.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/mongo_writer.py
+chmod 644 /opt/aria-system/agents/mongo_writer.py
+
+cp instrumentation.py /opt/aria-system/agents/instrumentation.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/instrumentation.py
+chmod 644 /opt/aria-system/agents/instrumentation.py
+
+cp qa_runner.py /opt/aria-system/agents/qa_runner.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/qa_runner.py
+chmod 644 /opt/aria-system/agents/qa_runner.py
+
+cp agent_pool.py /opt/aria-system/agents/agent_pool.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/agent_pool.py
+chmod 644 /opt/aria-system/agents/agent_pool.py
+
+cp knowledge_base.py /opt/aria-system/agents/knowledge_base.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/knowledge_base.py
+chmod 644 /opt/aria-system/agents/knowledge_base.py
+
+cp model_residency.py /opt/aria-system/agents/model_residency.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/model_residency.py
+chmod 644 /opt/aria-system/agents/model_residency.py
+
+cp ollama_client.py /opt/aria-system/agents/ollama_client.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/ollama_client.py
+chmod 644 /opt/aria-system/agents/ollama_client.py
+
+cp token_stream.py /opt/aria-system/agents/token_stream.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/token_stream.py
+chmod 644 /opt/aria-system/agents/token_stream.py
+
+cp slack_status.py /opt/aria-system/agents/slack_status.py
+chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/agents/slack_status.py
+chmod 644 /opt/aria-system/agents/slack_status.py
+
 cp requirements.txt /opt/aria-system/requirements.txt
 chown $SYSTEM_USER:$SYSTEM_USER /opt/aria-system/requirements.txt
 chmod 644 /opt/aria-system/requirements.txt
@@ -176,12 +268,21 @@ echo ""
 echo "Installing websockets dependency..."
 if [ -f "/opt/aria-system/venv/bin/pip" ]; then
     /opt/aria-system/venv/bin/pip install -q websockets>=12.0
-    /opt/aria-system/venv/bin/pip install -q PyGithub notion-client docker pylint pytest redis pymongo
+    /opt/aria-system/venv/bin/pip install -q PyGithub notion-client docker pylint pytest pytest-xdist redis pymongo numpy
     echo -e "${GREEN}✓${NC} Dependencies installed"
 else
     echo -e "${YELLOW}Warning: Virtual environment not found${NC}"
 fi
 
+# Build Riley's knowledge base (search_best_practices)
+echo ""
+echo "Building knowledge base index..."
+if [ -f "/opt/aria-system/venv/bin/python" ]; then
+    (cd /opt/aria-system/agents && sudo -u $SYSTEM_USER /opt/aria-system/venv/bin/python knowledge_base.py ingest > /dev/null) \
+        && echo -e "${GREEN}✓${NC} Knowledge base indexed" \
+        || echo -e "${YELLOW}Warning: Knowledge base indexing failed (run knowledge_base.py ingest later)${NC}"
+fi
+
 # Update config.yaml
 echo ""
 echo "Updating configuration..."
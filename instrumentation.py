@@ -0,0 +1,490 @@
+"""
+Per-project latency and token instrumentation.
+Records per-agent, per-round timings (queue wait, LLM call,
+generation, time to first token, tool execution), token counts and
+pipeline stage timings. Exposes them as Prometheus text metrics on a local
+HTTP port and writes one JSON trace per project.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from loguru import logger
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _label_key(label_names: Sequence[str], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _escape_label(value: str) -> str:
+    """Escapes a label value for the Prometheus text format (backslash, quote, newline)."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(label_names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self.values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[_label_key(self.label_names, labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            # [bucket counts..., +Inf count, sum]
+            series = self.series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self.series.items()]
+        lines = self._header()
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a MetricsRegistry on http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9109):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> bool:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {self.host}:{self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Prometheus metrics on http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class StartupReport:
+    """
+    Wall-clock time of the phases of a service start (imports, config, pools...).
+
+    Phases are recorded in order; report() formats them for the log.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times one startup phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def report(self) -> str:
+        width = max((len(name) for name in self.phases), default=0)
+        lines = [f"Startup took {self.total:.3f}s:"]
+        for name, seconds in sorted(self.phases.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name.ljust(width)}  {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"total_seconds": self.total, "phases": dict(self.phases)}
+
+
+class ProjectTrace:
+    """
+    Timings of one project, written as JSON when the project ends.
+
+    A round starts when the previous GroupChat message was appended and
+    ends when the next one is; LLM and tool calls in between are charged
+    to it. Queue wait is the time from round start to the first LLM call
+    (speaker selection, hooks and waiting for the host).
+    """
+
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.rounds: List[Dict[str, Any]] = []
+        self.agents: Dict[str, Dict[str, float]] = {}
+        # "host/model" -> number of times the model had to be loaded for this project
+        self.model_swaps: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._round_start = time.monotonic()
+        self._current = self._new_round()
+
+    @staticmethod
+    def _new_round() -> Dict[str, Any]:
+        return {"queue_wait": None, "llm_calls": 0, "llm_seconds": 0.0, "generation_seconds": None, "ttft": None, "tool_calls": 0, "tool_seconds": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _agent(self, name: str) -> Dict[str, float]:
+        return self.agents.setdefault(name, {"rounds": 0, "llm_calls": 0, "llm_seconds": 0.0,
+                                             "tool_calls": 0, "tool_seconds": 0.0,
+                                             "prompt_tokens": 0, "completion_tokens": 0})
+
+    def restart_round(self):
+        with self._lock:
+            self._round_start = time.monotonic()
+            self._current = self._new_round()
+
+    def llm_started(self, at: float) -> float:
+        """Returns the queue wait if this is the round's first LLM call, else 0."""
+        with self._lock:
+            if self._current["queue_wait"] is None:
+                self._current["queue_wait"] = max(0.0, at - self._round_start)
+                return self._current["queue_wait"]
+        return 0.0
+
+    def add_llm(self, agent: str, seconds: float, prompt_tokens: int, completion_tokens: int,
+                timings: Dict[str, float]):
+        with self._lock:
+            current, totals = self._current, self._agent(agent)
+            for record in (current, totals):
+                record["llm_calls"] += 1
+                record["llm_seconds"] += seconds
+                record["prompt_tokens"] += prompt_tokens
+                record["completion_tokens"] += completion_tokens
+            for field, key in (("generation_seconds", "generation"), ("ttft", "ttft")):
+                if key in timings:
+                    current[field] = (current[field] or 0.0) + timings[key]
+
+    def add_tool(self, agent: str, seconds: float):
+        with self._lock:
+            for record in (self._current, self._agent(agent)):
+                record["tool_calls"] += 1
+                record["tool_seconds"] += seconds
+
+    def end_round(self, speaker: str) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            record = dict(self._current, round=len(self.rounds) + 1, speaker=speaker,
+                          seconds=now - self._round_start)
+            self.rounds.append(record)
+            self._agent(speaker)["rounds"] += 1
+            self._round_start = now
+            self._current = self._new_round()
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "project_id": self.project_id,
+                "started_at": self.started_at,
+                "duration": time.time() - self.started_at,
+                "stages": dict(self.stages),
+                "agents": {name: dict(values) for name, values in self.agents.items()},
+                "rounds": list(self.rounds),
+                "model_swaps": dict(self.model_swaps),
+            }
+
+
+class Instrumentation:
+    """
+    Collects project metrics and traces for AriaCEO.
+
+    LLM calls are timed by wrapping each agent's client.create; tool calls
+    by wrapping the registered tool functions. Generation time and
+    time-to-first-token are recorded when the response carries them
+    (a `timings` dict with 'generation', 'ttft' in seconds);
+    end-to-end latency and token usage are always recorded.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.traces_dir = Path(config.get('traces_dir', '/tmp/aria_traces'))
+        self.traces: Dict[str, ProjectTrace] = {}
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.llm_seconds = r.histogram("aria_llm_call_seconds", "LLM call latency", ("agent", "model"))
+        self.llm_tokens = r.counter("aria_llm_tokens_total", "LLM tokens", ("agent", "kind"))
+        self.ttft = r.histogram("aria_llm_ttft_seconds", "Time to first token", ("agent",))
+        self.generation = r.histogram("aria_llm_generation_seconds", "Token generation time", ("agent",))
+        self.queue_wait = r.histogram("aria_round_queue_wait_seconds",
+                                      "Round start to first LLM call", ("agent",))
+        self.round_seconds = r.histogram("aria_round_seconds", "GroupChat round duration", ("agent",))
+        self.tool_seconds = r.histogram("aria_tool_seconds", "Tool execution time", ("agent", "tool"))
+        self.stage_seconds = r.histogram("aria_stage_seconds", "Pipeline stage duration", ("stage",))
+        self.projects = r.gauge("aria_projects_running", "Projects currently running")
+        self.rounds_total = r.counter("aria_rounds_total", "GroupChat rounds", ("agent",))
+        self.model_swaps = r.counter("aria_model_swaps_total", "Model loads caused by a call", ("host", "model"))
+        self.startup_seconds = r.gauge("aria_startup_seconds", "Service startup time per phase", ("phase",))
+
+        self.server = None
+        port = int(os.environ.get("ARIA_METRICS_PORT", config.get('port', 9109)))
+        if config.get('http_enabled', True) and port:
+            self.server = MetricsServer(self.registry, config.get('host', '127.0.0.1'), port)
+            self.server.start()
+
+    # --- Projects and stages ---
+
+    def start_project(self, project_id: str) -> ProjectTrace:
+        trace = self.traces.get(project_id)
+        if trace is None:
+            trace = self.traces[project_id] = ProjectTrace(project_id)
+            self.projects.set(len(self.traces))
+        return trace
+
+    def finish_project(self, project_id: str, status: str = "completed") -> Optional[Path]:
+        """Writes and forgets the project's JSON trace; returns its path."""
+        trace = self.traces.pop(project_id, None)
+        self.projects.set(len(self.traces))
+        if trace is None:
+            return None
+        data = dict(trace.to_dict(), status=status)
+        try:
+            self.traces_dir.mkdir(parents=True, exist_ok=True)
+            path = self.traces_dir / f"{project_id}.json"
+            path.write_text(json.dumps(data, indent=2))
+        except OSError as e:
+            logger.warning(f"Could not write trace for {project_id}: {e}")
+            return None
+        summary = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in data["stages"].items())
+        logger.info(f"Trace for {project_id}: {len(data['rounds'])} rounds, "
+                    f"{sum(data['model_swaps'].values())} model swaps, {summary} -> {path}")
+        return path
+
+    @contextmanager
+    def stage(self, project_id: str, name: str):
+        """Times a pipeline stage of a project."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record_stage(project_id, name, time.monotonic() - start)
+
+    def record_stage(self, project_id: str, name: str, seconds: float):
+        """Adds a measured stage duration to the metrics and the project's trace."""
+        self.stage_seconds.observe(seconds, stage=name)
+        trace = self.traces.get(project_id)
+        if trace is not None:
+            trace.stages[name] = trace.stages.get(name, 0.0) + seconds
+
+    # --- Rounds, LLM and tool calls ---
+
+    def restart_round(self, project_id: str):
+        """Marks the start of the first round (when the chat starts or resumes)."""
+        trace = self.traces.get(project_id)
+        if trace is not None:
+            trace.restart_round()
+
+    def end_round(self, project_id: str, message: Dict[str, Any]):
+        """Closes the current round; call once per GroupChat message."""
+        trace = self.traces.get(project_id)
+        if trace is None:
+            return
+        speaker = message.get("name") or "unknown"
+        record = trace.end_round(speaker)
+        self.round_seconds.observe(record["seconds"], agent=speaker)
+        self.rounds_total.inc(agent=speaker)
+        if record["queue_wait"] is not None:
+            self.queue_wait.observe(record["queue_wait"], agent=speaker)
+
+    def install_llm(self, agent, project_id: str, llm_config: Dict[str, Any], speaker: bool = True):
+        """
+        Times every LLM call of an agent and charges it to the project's round.
+
+        Args:
+            agent: A ConversableAgent with an LLM client.
+            project_id: The project the agent belongs to.
+            llm_config: The llm_config the agent was created with.
+            speaker: False for the GroupChatManager, whose speaker-selection
+                calls count towards the next speaker's queue wait.
+        """
+        client = getattr(agent, "client", None)
+        if client is None:
+            return
+        models = [entry.get("model") for entry in llm_config.get("config_list", [])]
+        create = client.create
+
+        def timed_create(**params):
+            start = time.monotonic()
+            trace = self.traces.get(project_id)
+            if trace is not None and speaker:
+                trace.llm_started(start)
+            response = create(**params)
+            seconds = time.monotonic() - start
+            self.record_llm(agent.name, project_id, seconds, response,
+                            getattr(response, "model", None) or (models[0] if models else ""))
+            return response
+
+        client.create = timed_create
+
+    def record_llm(self, agent_name: str, project_id: str, seconds: float, response, model: str):
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        timings = getattr(response, "timings", None) or {}
+
+        self.llm_seconds.observe(seconds, agent=agent_name, model=model)
+        self.llm_tokens.inc(prompt_tokens, agent=agent_name, kind="prompt")
+        self.llm_tokens.inc(completion_tokens, agent=agent_name, kind="completion")
+        for key, histogram in (("ttft", self.ttft), ("generation", self.generation)):
+            if key in timings:
+                histogram.observe(timings[key], agent=agent_name)
+        trace = self.traces.get(project_id)
+        if trace is not None:
+            trace.add_llm(agent_name, seconds, prompt_tokens, completion_tokens, timings)
+
+    def wrap_tool(self, func, project_id: str, agent_name: str):
+        """Returns an async tool wrapper that records execution time."""
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.monotonic()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                seconds = time.monotonic() - start
+                self.tool_seconds.observe(seconds, agent=agent_name, tool=func.__name__)
+                trace = self.traces.get(project_id)
+                if trace is not None:
+                    trace.add_tool(agent_name, seconds)
+        return timed
+
+    def record_swap(self, project_id: str, host: str, model: str):
+        """Counts a model load on a host, charged to the project whose call caused it."""
+        self.model_swaps.inc(host=host, model=model)
+        trace = self.traces.get(project_id)
+        if trace is not None:
+            with trace._lock:
+                key = f"{host}/{model}"
+                trace.model_swaps[key] = trace.model_swaps.get(key, 0) + 1
+
+    def record_startup(self, report: StartupReport):
+        """Exposes a StartupReport as the aria_startup_seconds gauge."""
+        for name, seconds in report.phases.items():
+            self.startup_seconds.set(seconds, phase=name)
+        self.startup_seconds.set(report.total, phase="total")
+
+    def shutdown(self):
+        if self.server:
+            self.server.stop()
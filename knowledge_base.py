@@ -0,0 +1,446 @@
+"""
+Local knowledge base for Riley's search_best_practices tool.
+Ingests Markdown/text documents and the READMEs of past projects, splits
+them into heading-aware chunks, embeds them on the CPU and stores the
+vectors as a memory-mapped NumPy matrix. Queries are answered with an exact
+top-k dot-product search, or an IVF (k-means partitioned) search for large
+indexes, behind an LRU query cache - no LLM call involved.
+
+Usage:
+    python knowledge_base.py ingest
+    python knowledge_base.py search "FastAPI error handling"
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from loguru import logger
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import diskcache as dc
+import numpy as np
+
+# sentence-transformers (and torch) is only imported when a model is actually loaded
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+TEXT_SUFFIXES = {".md", ".markdown", ".txt", ".rst"}
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+TOKEN = re.compile(r"[a-z0-9]+")
+HASHING_MODEL = "hashing"
+
+
+# --- Chunking ---
+
+def chunk_markdown(text: str, max_chars: int = 1200, overlap: int = 150) -> List[Tuple[str, str]]:
+    """
+    Splits a Markdown document into chunks that stay within one section.
+
+    Paragraphs are packed up to `max_chars`; longer paragraphs are cut with
+    `overlap` characters repeated between the pieces.
+
+    Args:
+        text: Document text.
+        max_chars: Maximum characters per chunk.
+        overlap: Characters shared by consecutive pieces of a long paragraph.
+
+    Returns:
+        List of (heading path, chunk text).
+    """
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    headings: List[str] = []
+    in_code = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING.match(line)
+        if match:
+            level = len(match.group(1))
+            headings = headings[:level - 1] + [match.group(2)]
+            sections.append((" > ".join(headings), []))
+        else:
+            sections[-1][1].append(line)
+
+    chunks = []
+    for heading, lines in sections:
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", "\n".join(lines)) if p.strip()]
+        current = ""
+        for paragraph in paragraphs:
+            pieces = [paragraph]
+            if len(paragraph) > max_chars:
+                step = max(1, max_chars - overlap)
+                pieces = [paragraph[i:i + max_chars] for i in range(0, len(paragraph) - overlap, step)]
+            for piece in pieces:
+                if current and len(current) + len(piece) + 2 > max_chars:
+                    chunks.append((heading, current))
+                    current = ""
+                current = f"{current}\n\n{piece}" if current else piece
+        if current:
+            chunks.append((heading, current))
+    return chunks
+
+
+# --- Embedding ---
+
+class HashingEmbedder:
+    """
+    Dependency-free fallback: signed feature hashing of word unigrams and
+    bigrams with sublinear term frequency, L2-normalized.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"{HASHING_MODEL}-{dim}"
+
+    def _features(self, text: str) -> Dict[int, float]:
+        words = TOKEN.findall(text.lower())
+        counts: Dict[int, float] = {}
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(feature.encode())
+            index = h % self.dim
+            counts[index] = counts.get(index, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        return counts
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, value in self._features(text).items():
+                vectors[row, index] = math.copysign(1 + math.log(abs(value)), value) if value else 0.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers model on the CPU (normalized embeddings)."""
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                 convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+
+def make_embedder(model_name: str, hashing_dim: int = 1024):
+    """Returns the configured embedder, falling back to feature hashing without sentence-transformers."""
+    if model_name.startswith(HASHING_MODEL):
+        return HashingEmbedder(hashing_dim)
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        logger.warning(f"sentence-transformers not installed, using feature hashing instead of {model_name}")
+        return HashingEmbedder(hashing_dim)
+    return SentenceTransformerEmbedder(model_name)
+
+
+# --- Index ---
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, sample: int = 20000, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the vectors; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(k):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results."""
+
+    def __init__(self, size: int = 512):
+        self.size = size
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class KnowledgeBase:
+    """
+    Builds and queries the on-disk index in `directory`.
+
+    Layout: vectors.npy (float32, one normalized row per chunk, ordered by
+    IVF list when partitioned), chunks.jsonl (source, heading, text per
+    row), ivf.npz (centroids and list offsets) and manifest.json. A rebuild
+    writes a new directory and swaps it in; readers reload when the
+    manifest changes.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, projects_dir: Optional[str] = None):
+        config = config or {}
+        self.directory = Path(config.get('directory', '/opt/aria-system/knowledge_index'))
+        self.sources = [Path(source) for source in config.get('sources', ['/opt/aria-system/docs'])]
+        self.projects_dir = Path(projects_dir) if projects_dir and config.get('include_project_readmes', True) else None
+        self.model_name = config.get('embedding_model', 'all-MiniLM-L6-v2')
+        self.hashing_dim = config.get('hashing_dim', 1024)
+        self.chunk_chars = config.get('chunk_chars', 1200)
+        self.chunk_overlap = config.get('chunk_overlap', 150)
+        self.ivf_lists = config.get('ivf_lists', 'auto')
+        self.ivf_min_vectors = config.get('ivf_min_vectors', 5000)
+        self.nprobe = config.get('nprobe', 8)
+        self.top_k = config.get('top_k', 3)
+        self.embedding_cache_dir = config.get('embedding_cache_dir', '/tmp/aria_embedding_cache')
+        self.cache = QueryCache(config.get('query_cache_size', 512))
+        self._embedder = None
+        self._loaded_version = None
+        self._vectors: Optional[np.ndarray] = None
+        self._chunks: List[Dict[str, str]] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+        self._ingest_lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = make_embedder(self.model_name, self.hashing_dim)
+        return self._embedder
+
+    # --- Ingestion ---
+
+    def _documents(self) -> Iterable[Path]:
+        for source in self.sources:
+            if source.is_file():
+                yield source
+            elif source.is_dir():
+                yield from sorted(p for p in source.rglob("*") if p.suffix.lower() in TEXT_SUFFIXES and p.is_file())
+        if self.projects_dir and self.projects_dir.is_dir():
+            yield from sorted(self.projects_dir.glob("*/README.md"))
+
+    def _embed_cached(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts, reusing vectors of chunks seen in earlier ingestions."""
+        embedder = self.embedder
+        vectors = np.zeros((len(texts), embedder.dim), dtype=np.float32)
+        with dc.Cache(self.embedding_cache_dir) as cache:
+            keys = [f"{embedder.name}:{hashlib.sha1(text.encode()).hexdigest()}" for text in texts]
+            missing = []
+            for row, key in enumerate(keys):
+                cached = cache.get(key)
+                if cached is None:
+                    missing.append(row)
+                else:
+                    vectors[row] = np.frombuffer(cached, dtype=np.float32)
+            for start in range(0, len(missing), 256):
+                rows = missing[start:start + 256]
+                embedded = embedder.embed([texts[row] for row in rows])
+                for row, vector in zip(rows, embedded):
+                    vectors[row] = vector
+                    cache.set(keys[row], vector.astype(np.float32).tobytes())
+        return vectors
+
+    def ingest(self) -> Dict[str, Any]:
+        """
+        Rebuilds the index from all sources.
+
+        Returns:
+            Statistics: documents, chunks, lists (IVF partitions, 0 = flat) and seconds.
+        """
+        with self._ingest_lock:
+            return self._ingest()
+
+    def _ingest(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        chunks = []
+        documents = 0
+        for path in self._documents():
+            try:
+                text = path.read_text(errors="replace")
+            except OSError as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            documents += 1
+            for heading, chunk in chunk_markdown(text, self.chunk_chars, self.chunk_overlap):
+                chunks.append({"source": str(path), "heading": heading, "text": chunk})
+
+        vectors = self._embed_cached([f"{c['heading']}\n{c['text']}" for c in chunks]) if chunks else \
+            np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+        lists = 0
+        if self.ivf_lists == 'auto':
+            lists = int(math.sqrt(len(chunks))) if len(chunks) >= self.ivf_min_vectors else 0
+        elif self.ivf_lists:
+            lists = min(int(self.ivf_lists), len(chunks))
+        centroids = offsets = None
+        if lists > 1:
+            # Reorder rows by list so each partition is one contiguous slice of the memmap
+            centroids = kmeans(vectors, lists)
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            vectors = vectors[order]
+            chunks = [chunks[i] for i in order]
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=lists))])
+        else:
+            lists = 0
+
+        staging = self.directory.with_name(self.directory.name + f".staging-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        np.save(staging / "vectors.npy", vectors)
+        with open(staging / "chunks.jsonl", "w") as f:
+            for chunk in chunks:
+                f.write(json.dumps(chunk) + "\n")
+        if lists:
+            np.savez(staging / "ivf.npz", centroids=centroids, offsets=offsets)
+        manifest = {"model": self.embedder.name, "dim": int(vectors.shape[1]), "chunks": len(chunks),
+                    "documents": documents, "lists": lists, "built_at": time.time()}
+        (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        old = self.directory.with_name(self.directory.name + f".old-{os.getpid()}")
+        if self.directory.exists():
+            self.directory.rename(old)
+        staging.rename(self.directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+        stats = {"documents": documents, "chunks": len(chunks), "lists": lists,
+                 "seconds": time.perf_counter() - started}
+        logger.info(f"Knowledge base rebuilt: {stats}")
+        return stats
+
+    # --- Search ---
+
+    def _load(self) -> bool:
+        """(Re)loads the index if it changed on disk; False if none exists."""
+        manifest_path = self.directory / "manifest.json"
+        try:
+            version = manifest_path.stat().st_mtime_ns
+        except OSError:
+            return False
+        with self._lock:
+            if version == self._loaded_version:
+                return True
+            manifest = json.loads(manifest_path.read_text())
+            if manifest["model"] != self.embedder.name:
+                logger.error(f"Knowledge base was built with {manifest['model']}, "
+                             f"but queries use {self.embedder.name}; run `python knowledge_base.py ingest`")
+                return False
+            self._vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+            with open(self.directory / "chunks.jsonl") as f:
+                self._chunks = [json.loads(line) for line in f]
+            self._centroids = self._offsets = None
+            if manifest.get("lists"):
+                ivf = np.load(self.directory / "ivf.npz")
+                self._centroids, self._offsets = ivf["centroids"], ivf["offsets"]
+            self._loaded_version = version
+            self.cache.clear()
+            logger.info(f"Loaded knowledge base: {manifest['chunks']} chunks from "
+                        f"{manifest['documents']} documents ({manifest.get('lists') or 'flat'} lists)")
+            return True
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the k chunks most similar to the query.
+
+        Args:
+            query: Free-text query.
+            k: Number of results (default: top_k from the config).
+
+        Returns:
+            List of {'source', 'heading', 'text', 'score'}, best first.
+        """
+        k = k or self.top_k
+        if not self._load():
+            return []
+        key = (" ".join(query.lower().split()), k, self._loaded_version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            vectors, chunks, centroids, offsets = self._vectors, self._chunks, self._centroids, self._offsets
+        if vectors is None or not len(vectors):
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        if centroids is not None:
+            probe = _top_k(centroids @ query_vector, self.nprobe)
+            # Lists are contiguous row ranges, so each probe reads one slice of the memmap
+            rows = np.concatenate([np.arange(offsets[c], offsets[c + 1]) for c in probe])
+            scores = np.concatenate([np.asarray(vectors[offsets[c]:offsets[c + 1]] @ query_vector)
+                                     for c in probe])
+            top = _top_k(scores, k)
+            best, best_scores = rows[top], scores[top]
+        else:
+            scores = np.asarray(vectors @ query_vector)
+            best = _top_k(scores, k)
+            best_scores = scores[best]
+        results = [dict(chunks[int(row)], score=float(score)) for row, score in zip(best, best_scores)]
+        self.cache.put(key, results)
+        return results
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+
+
+def get_knowledge_base(config: Dict[str, Any]) -> KnowledgeBase:
+    """Returns the process-wide KnowledgeBase built from the full config.yaml dict."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        _knowledge_base = KnowledgeBase(config.get('knowledge_base', {}),
+                                        config.get('projects', {}).get('base_dir'))
+    return _knowledge_base
+
+
+if __name__ == "__main__":
+    from clients import registry
+
+    parser = argparse.ArgumentParser(description="Aria knowledge base for search_best_practices")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("ingest", help="Rebuild the index from the configured sources")
+    search_parser = subcommands.add_parser("search", help="Query the index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=None)
+    args = parser.parse_args()
+
+    kb = get_knowledge_base(registry.config)
+    if args.command == "ingest":
+        print(json.dumps(kb.ingest(), indent=2))
+    else:
+        started = time.perf_counter()
+        for result in kb.search(args.query, args.k):
+            print(f"{result['score']:.3f}  {result['source']} > {result['heading']}\n    {result['text'][:200]}")
+        print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
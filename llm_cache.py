@@ -0,0 +1,117 @@
+"""
+Response cache for LLM calls.
+Wraps an agent's OpenAIWrapper.create so byte-identical requests (same
+models, messages and sampling parameters) are answered from a diskcache
+store instead of the Ollama hosts. Used for resumed and replayed projects.
+"""
+import hashlib
+import json
+import threading
+import diskcache as dc
+from loguru import logger
+from typing import Any, Dict, Iterable, Optional
+
+# Request parameters that change the output and therefore belong in the key
+KEY_PARAMS = ("messages", "tools", "functions", "tool_choice", "temperature",
+              "top_p", "max_tokens", "seed", "stop", "response_format")
+
+
+class LLMResponseCache:
+    """
+    diskcache-backed LLM response cache with size and TTL eviction.
+
+    Enabled per agent via install(); keeps hit/miss counters per agent.
+    """
+
+    def __init__(self, directory: str = "/tmp/aria_llm_cache", size_limit_mb: int = 1024,
+                 ttl_seconds: Optional[int] = 7 * 24 * 3600):
+        self.cache = dc.Cache(directory, size_limit=size_limit_mb * 1024 * 1024,
+                              eviction_policy="least-recently-used")
+        self.ttl = ttl_seconds
+        self.metrics: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        logger.info(f"Initialized LLMResponseCache at {directory} "
+                    f"(limit {size_limit_mb} MB, ttl {ttl_seconds}s)")
+
+    def make_key(self, models: Iterable[str], params: Dict[str, Any]) -> str:
+        """
+        Builds the cache key for a request.
+
+        Args:
+            models: The model names of the agent's config_list, in order.
+            params: The request parameters (messages, sampling parameters...).
+        """
+        payload = {"models": list(models)}
+        payload.update({name: params[name] for name in KEY_PARAMS if name in params})
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _count(self, agent_name: str, outcome: str):
+        with self._lock:
+            counters = self.metrics.setdefault(agent_name, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def install(self, agent, llm_config: Dict[str, Any]):
+        """
+        Puts the cache in front of an agent's LLM client.
+
+        Args:
+            agent: A ConversableAgent with an LLM client.
+            llm_config: The llm_config the agent was created with.
+        """
+        client = getattr(agent, "client", None)
+        if client is None:
+            return
+        models = [entry.get("model") for entry in llm_config.get("config_list", [])]
+        defaults = {name: llm_config[name] for name in KEY_PARAMS if name in llm_config}
+        create = client.create
+
+        # AutoGen attaches a bound (unpicklable) retrieval function to each
+        # response; it is stripped before storing and re-attached on hits.
+        clients = getattr(client, "_clients", None) or []
+        retrieval = {"function": getattr(clients[0], "message_retrieval", None) if clients else None}
+
+        def cached_create(**params):
+            key = self.make_key(models, {**defaults, **params})
+            response = self.cache.get(key)
+            if response is not None:
+                self._count(agent.name, "hits")
+                logger.debug(f"LLM cache hit for {agent.name}")
+                if retrieval["function"] is not None:
+                    setattr(response, "message_retrieval_function", retrieval["function"])
+                return response
+            self._count(agent.name, "misses")
+            response = create(**params)
+            function = getattr(response, "message_retrieval_function", None)
+            try:
+                if function is not None:
+                    retrieval["function"] = function
+                    delattr(response, "message_retrieval_function")
+                self.cache.set(key, response, expire=self.ttl)
+            except Exception as e:
+                logger.warning(f"Could not cache LLM response for {agent.name}: {e}")
+            finally:
+                if function is not None:
+                    setattr(response, "message_retrieval_function", function)
+            return response
+
+        client.create = cached_create
+        logger.info(f"LLM response cache enabled for agent '{agent.name}'")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters per agent plus totals and cache size."""
+        with self._lock:
+            per_agent = {name: dict(counters) for name, counters in self.metrics.items()}
+        hits = sum(c["hits"] for c in per_agent.values())
+        misses = sum(c["misses"] for c in per_agent.values())
+        return {
+            "agents": per_agent,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size_bytes": self.cache.volume(),
+        }
+
+    def clear(self):
+        """Drops all cached responses."""
+        self.cache.clear()
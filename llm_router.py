@@ -0,0 +1,161 @@
+"""
+LLM routing for Aria CEO agents.
+Resolves every agent to its own Ollama host and model, with an ordered
+fallback chain and capacity-weighted load spreading across hosts.
+"""
+from loguru import logger
+from typing import List, Dict, Any, Optional
+
+# Keys in the 'llm' config section that are not Ollama hosts
+RESERVED_KEYS = {"routing", "timeout", "temperature"}
+
+DEFAULT_TIMEOUT = 600
+DEFAULT_TEMPERATURE = 0.7
+
+
+class LLMRouter:
+    """
+    Maps agents to Ollama endpoints based on the 'llm' section of config.yaml.
+
+    Each host entry lists the models it serves keyed by lowercase agent name.
+    An agent is routed to the host that serves its model first; the remaining
+    hosts form the fallback chain, ordered by remaining capacity. Agents
+    without a dedicated model are placed on the least-loaded host relative
+    to its 'capacity' weight.
+    """
+
+    def __init__(self, llm_config: Dict[str, Any], model_client_cls: Optional[str] = None):
+        self.llm_config = llm_config or {}
+        # Custom AutoGen model client for every entry (see ollama_client.py)
+        self.model_client_cls = model_client_cls
+        self.routing = self.llm_config.get('routing', {}) or {}
+        self.timeout = self.llm_config.get('timeout', DEFAULT_TIMEOUT)
+        self.temperature = self.llm_config.get('temperature', DEFAULT_TEMPERATURE)
+
+        self.hosts = {}
+        for key, host in self.llm_config.items():
+            if key in RESERVED_KEYS or not isinstance(host, dict):
+                continue
+            self.hosts[key] = host
+
+        # Number of agents assigned to each host (primary routes only)
+        self.load = {key: 0 for key in self.hosts}
+        self.assignments = {}
+        logger.info(f"Initialized LLMRouter with hosts: {', '.join(self.hosts) or 'none'}")
+
+    def _capacity(self, host_key: str) -> float:
+        """Relative capacity weight of a host (defaults to 1)."""
+        return float(self.hosts[host_key].get('capacity', 1)) or 1.0
+
+    def _base_url(self, host_key: str) -> str:
+        host = self.hosts[host_key]
+        return f"http://{host.get('host', 'localhost')}:{host.get('port', 11434)}/v1"
+
+    def _entry(self, host_key: str, model: str) -> Dict[str, Any]:
+        entry = {
+            "model": model,
+            "base_url": self._base_url(host_key),
+            "api_key": "ollama",
+        }
+        if self.model_client_cls:
+            entry["model_client_cls"] = self.model_client_cls
+        return entry
+
+    def _default_model(self, host_key: str) -> Optional[str]:
+        """Model used on a host when it serves an agent without a dedicated model."""
+        host = self.hosts[host_key]
+        models = host.get('models', {}) or {}
+        return host.get('default_model') or next(iter(models.values()), None)
+
+    def _resolve_model(self, host_key: str, alias: str) -> Optional[str]:
+        """Resolve an agent alias or literal model name on a given host."""
+        models = self.hosts[host_key].get('models', {}) or {}
+        if alias in models:
+            return models[alias]
+        if alias in models.values():
+            return alias
+        return None
+
+    def _home_host(self, alias: str) -> Optional[str]:
+        """Return the host that serves a dedicated model for the agent alias."""
+        for host_key, host in self.hosts.items():
+            if alias in (host.get('models', {}) or {}):
+                return host_key
+        return None
+
+    def _by_free_capacity(self, host_keys: List[str]) -> List[str]:
+        """Order hosts by current load relative to their capacity weight."""
+        return sorted(host_keys, key=lambda k: (self.load[k] / self._capacity(k), -self._capacity(k)))
+
+    def route(self, agent_name: str) -> List[Dict[str, Any]]:
+        """
+        Builds the ordered config_list for an agent.
+
+        Args:
+            agent_name: The agent name as used in agents_config.yaml (e.g. 'Sam').
+
+        Returns:
+            A list of AutoGen config entries; the first is the primary route,
+            the rest are fallbacks tried in order.
+        """
+        if not self.hosts:
+            return []
+
+        alias = self.routing.get('aliases', {}).get(agent_name, agent_name.lower())
+        assigned = self.assignments.get(agent_name)
+        if assigned is not None:
+            # Repeat lookups keep the agent where it was counted
+            primary_host = assigned[0]
+        else:
+            primary_host = self._home_host(alias)
+            if primary_host is None:
+                primary_host = self._by_free_capacity(list(self.hosts))[0]
+        primary_model = self._resolve_model(primary_host, alias) or self._default_model(primary_host)
+
+        chain = [(primary_host, primary_model)]
+
+        # Explicit fallbacks: 'host' or 'host:model-alias-or-name'
+        fallbacks = self.routing.get('fallbacks', {}).get(agent_name)
+        if fallbacks:
+            for spec in fallbacks:
+                host_key, _, model_ref = str(spec).partition(':')
+                if host_key not in self.hosts:
+                    logger.warning(f"Unknown fallback host '{host_key}' for agent '{agent_name}'")
+                    continue
+                model = (self._resolve_model(host_key, model_ref or alias)
+                         or (model_ref if model_ref else None)
+                         or self._default_model(host_key))
+                chain.append((host_key, model))
+        else:
+            others = [k for k in self.hosts if k != primary_host]
+            for host_key in self._by_free_capacity(others):
+                chain.append((host_key, self._resolve_model(host_key, alias) or self._default_model(host_key)))
+
+        if assigned is None:
+            self.load[primary_host] += 1
+        self.assignments[agent_name] = (primary_host, primary_model)
+
+        config_list = []
+        seen = set()
+        for host_key, model in chain:
+            if not model or (host_key, model) in seen:
+                continue
+            seen.add((host_key, model))
+            config_list.append(self._entry(host_key, model))
+
+        logger.info(f"Routed agent '{agent_name}' to {primary_host} ({primary_model}), "
+                    f"{len(config_list) - 1} fallback(s)")
+        return config_list
+
+    def llm_config_for(self, agent_name: str) -> Dict[str, Any]:
+        """
+        Returns a complete AutoGen llm_config dict for an agent.
+
+        Args:
+            agent_name: The agent name as used in agents_config.yaml.
+        """
+        return {
+            "config_list": self.route(agent_name),
+            "timeout": self.timeout,
+            "temperature": self.temperature,
+        }
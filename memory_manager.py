@@ -1,68 +1,256 @@
 import diskcache as dc
 import json
 from loguru import logger
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 class MemoryManager:
     """
     Manages persistent memory (conversation history) for AutoGen agents using diskcache.
-    Each agent's memory is stored under a unique key.
+
+    Each agent's memory is an append-only log split into numbered segments of
+    at most `segment_size` messages. Appending only rewrites the last (partial)
+    segment plus any new ones, and range reads only load the segments they
+    need, so cost depends on the new/requested messages, not total history.
+
+    Keys per agent:
+        agent_memory_{agent}:meta     -> {"start": first index, "count": next index}
+        agent_memory_{agent}:seg:{n}  -> JSON list of messages [n*size, (n+1)*size)
+        agent_memory_{agent}:state    -> auxiliary state (e.g. rolling summary)
     """
-    
-    def __init__(self, cache_dir: str = "/tmp/aria_agent_memory"):
+
+    def __init__(self, cache_dir: str = "/tmp/aria_agent_memory", segment_size: int = 50):
         self.cache = dc.Cache(cache_dir)
+        self.segment_size = max(1, segment_size)
         logger.info(f"Initialized MemoryManager with cache directory: {cache_dir}")
 
-    def get_memory(self, agent_name: str) -> List[Dict[str, Any]]:
+    def _key(self, agent_name: str) -> str:
+        return f"agent_memory_{agent_name}"
+
+    def _segment_key(self, agent_name: str, segment: int) -> str:
+        return f"{self._key(agent_name)}:seg:{segment}"
+
+    def _get_meta(self, agent_name: str) -> Dict[str, int]:
+        """Returns the log metadata, migrating a legacy single-blob entry if present."""
+        meta = self.cache.get(f"{self._key(agent_name)}:meta")
+        if meta is not None:
+            return meta
+
+        legacy = self.cache.get(self._key(agent_name))
+        meta = {"start": 0, "count": 0}
+        if legacy:
+            messages = json.loads(legacy)
+            with self.cache.transact():
+                meta = self._write_records(agent_name, meta, messages)
+                del self.cache[self._key(agent_name)]
+            logger.info(f"Migrated {len(messages)} legacy messages for {agent_name} to segmented log")
+        return meta
+
+    def _write_records(self, agent_name: str, meta: Dict[str, int],
+                       messages: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Appends records to the log, touching only the affected segments."""
+        size = self.segment_size
+        index = meta["count"]
+        pos = 0
+        while pos < len(messages):
+            segment = index // size
+            offset = index % size
+            take = min(size - offset, len(messages) - pos)
+            if offset:
+                records = json.loads(self.cache.get(self._segment_key(agent_name, segment), "[]"))
+                records = records[:offset]
+            else:
+                records = []
+            records.extend(messages[pos:pos + take])
+            self.cache.set(self._segment_key(agent_name, segment), json.dumps(records))
+            pos += take
+            index += take
+        meta = {"start": meta["start"], "count": index}
+        self.cache.set(f"{self._key(agent_name)}:meta", meta)
+        return meta
+
+    def count(self, agent_name: str) -> int:
         """
-        Retrieves the conversation history for a given agent.
-        
+        Returns the number of messages currently stored for an agent.
+
         Args:
             agent_name: The name of the agent.
-            
+        """
+        try:
+            meta = self._get_meta(agent_name)
+            return meta["count"] - meta["start"]
+        except Exception as e:
+            logger.error(f"Error reading memory size for {agent_name}: {e}")
+            return 0
+
+    def bounds(self, agent_name: str) -> Tuple[int, int]:
+        """
+        Returns the absolute (start, end) record indices stored for an agent.
+
+        Args:
+            agent_name: The name of the agent.
+        """
+        try:
+            meta = self._get_meta(agent_name)
+            return meta["start"], meta["count"]
+        except Exception as e:
+            logger.error(f"Error reading memory bounds for {agent_name}: {e}")
+            return 0, 0
+
+    def get_range(self, agent_name: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """
+        Reads records [start, end) by absolute index, loading only the needed segments.
+
+        Args:
+            agent_name: The name of the agent.
+            start: First absolute record index (clamped to the stored range).
+            end: Absolute index after the last record (clamped to the stored range).
+
         Returns:
-            A list of messages (conversation history).
+            A list of messages.
         """
-        key = f"agent_memory_{agent_name}"
         try:
-            # diskcache stores data as bytes, json.loads is needed
-            data = self.cache.get(key)
-            if data:
-                return json.loads(data)
-            return []
+            meta = self._get_meta(agent_name)
+            start = max(start, meta["start"])
+            end = min(end, meta["count"])
+            if start >= end:
+                return []
+
+            size = self.segment_size
+            messages = []
+            for segment in range(start // size, (end - 1) // size + 1):
+                data = self.cache.get(self._segment_key(agent_name, segment))
+                if data:
+                    messages.extend(json.loads(data))
+            # Segments are aligned on multiples of segment_size
+            offset = start - (start // size) * size
+            return messages[offset:offset + end - start]
         except Exception as e:
             logger.error(f"Error retrieving memory for {agent_name}: {e}")
             return []
 
+    def get_memory(self, agent_name: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieves the conversation history for a given agent.
+
+        Args:
+            agent_name: The name of the agent.
+            last_n: If set, only the most recent `last_n` messages are read.
+
+        Returns:
+            A list of messages (conversation history).
+        """
+        start, end = self.bounds(agent_name)
+        if last_n is not None:
+            start = max(start, end - max(0, last_n))
+        return self.get_range(agent_name, start, end)
+
+    def append_messages(self, agent_name: str, messages: List[Dict[str, Any]]):
+        """
+        Appends new messages to an agent's conversation log.
+
+        Args:
+            agent_name: The name of the agent.
+            messages: The new messages only (not the full history).
+        """
+        if not messages:
+            return
+        try:
+            with self.cache.transact():
+                meta = self._get_meta(agent_name)
+                self._write_records(agent_name, meta, messages)
+            logger.debug(f"Appended {len(messages)} messages for {agent_name}")
+        except Exception as e:
+            logger.error(f"Error appending memory for {agent_name}: {e}")
+
     def save_memory(self, agent_name: str, messages: List[Dict[str, Any]]):
         """
         Saves the current conversation history for a given agent.
-        
+
+        Kept for compatibility: the stored log is treated as a prefix of
+        `messages` and only the tail beyond it is appended. If `messages` is
+        shorter than the stored log, the log is replaced.
+
         Args:
             agent_name: The name of the agent.
             messages: The list of messages to save.
         """
-        key = f"agent_memory_{agent_name}"
         try:
-            # diskcache stores data as bytes, json.dumps is needed
-            self.cache.set(key, json.dumps(messages))
+            stored = self.count(agent_name)
+            if len(messages) >= stored:
+                self.append_messages(agent_name, messages[stored:])
+            else:
+                self.clear_memory(agent_name)
+                self.append_messages(agent_name, messages)
             logger.debug(f"Saved {len(messages)} messages for {agent_name}")
         except Exception as e:
             logger.error(f"Error saving memory for {agent_name}: {e}")
-            
+
+    def compact(self, agent_name: str, keep_last: int):
+        """
+        Drops all but the most recent `keep_last` messages of an agent's log.
+
+        Whole segments before the cutoff are deleted; record indices are
+        kept stable so later appends and range reads are unaffected.
+
+        Args:
+            agent_name: The name of the agent.
+            keep_last: Number of most recent messages to keep.
+        """
+        try:
+            with self.cache.transact():
+                meta = self._get_meta(agent_name)
+                new_start = max(meta["start"], meta["count"] - max(0, keep_last))
+                if new_start == meta["start"]:
+                    return
+                size = self.segment_size
+                for segment in range(meta["start"] // size, new_start // size):
+                    self.cache.delete(self._segment_key(agent_name, segment))
+                self.cache.set(f"{self._key(agent_name)}:meta", {"start": new_start, "count": meta["count"]})
+            logger.info(f"Compacted memory for {agent_name}: dropped {new_start - meta['start']} messages")
+        except Exception as e:
+            logger.error(f"Error compacting memory for {agent_name}: {e}")
+
+    def get_state(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns auxiliary state stored alongside an agent's log (e.g. a rolling summary).
+
+        Args:
+            agent_name: The name of the agent.
+        """
+        return self.cache.get(f"{self._key(agent_name)}:state")
+
+    def set_state(self, agent_name: str, state: Dict[str, Any]):
+        """
+        Stores auxiliary state alongside an agent's log; cleared with the log.
+
+        Args:
+            agent_name: The name of the agent.
+            state: A picklable dict.
+        """
+        self.cache.set(f"{self._key(agent_name)}:state", state)
+
     def clear_memory(self, agent_name: str):
         """
         Clears the conversation history for a given agent.
-        
+
         Args:
             agent_name: The name of the agent.
         """
-        key = f"agent_memory_{agent_name}"
         try:
-            del self.cache[key]
-            logger.info(f"Cleared memory for {agent_name}")
-        except KeyError:
-            logger.warning(f"Memory for {agent_name} not found, nothing to clear.")
+            meta = self.cache.get(f"{self._key(agent_name)}:meta")
+            found = self.cache.delete(self._key(agent_name))
+            if meta is not None:
+                with self.cache.transact():
+                    size = self.segment_size
+                    for segment in range(meta["start"] // size, (meta["count"] + size - 1) // size):
+                        self.cache.delete(self._segment_key(agent_name, segment))
+                    self.cache.delete(f"{self._key(agent_name)}:meta")
+                    self.cache.delete(f"{self._key(agent_name)}:state")
+                found = True
+            if found:
+                logger.info(f"Cleared memory for {agent_name}")
+            else:
+                logger.warning(f"Memory for {agent_name} not found, nothing to clear.")
         except Exception as e:
             logger.error(f"Error clearing memory for {agent_name}: {e}")
 
@@ -79,32 +267,35 @@ class MemoryManager:
 # Example usage (for testing)
 if __name__ == "__main__":
     manager = MemoryManager()
-    
+
     # 1. Clear all memory for a fresh start
     manager.clear_all_memory()
-    
+
     # 2. Test saving and retrieving
     agent_name = "TestAgent"
     initial_messages = [
         {"role": "user", "content": "Hello, I am the user."},
         {"role": "assistant", "content": "Hello, I am TestAgent."}
     ]
-    
+
     manager.save_memory(agent_name, initial_messages)
     retrieved_messages = manager.get_memory(agent_name)
-    
+
     print(f"Retrieved messages for {agent_name}: {retrieved_messages}")
-    
-    # 3. Test appending (in a real scenario, AutoGen handles appending,
-    # but here we simulate it by retrieving, modifying, and saving)
+
+    # 3. Test appending: only the new message is written
     new_message = {"role": "user", "content": "How are you?"}
-    retrieved_messages.append(new_message)
-    manager.save_memory(agent_name, retrieved_messages)
-    
+    manager.append_messages(agent_name, [new_message])
+
     final_messages = manager.get_memory(agent_name)
     print(f"Final messages for {agent_name}: {final_messages}")
-    
-    # 4. Test clearing
+    print(f"Last message for {agent_name}: {manager.get_memory(agent_name, last_n=1)}")
+
+    # 4. Test compaction
+    manager.compact(agent_name, keep_last=2)
+    print(f"Messages after compaction: {manager.get_memory(agent_name)}")
+
+    # 5. Test clearing
     manager.clear_memory(agent_name)
     empty_messages = manager.get_memory(agent_name)
     print(f"Messages after clearing: {empty_messages}")
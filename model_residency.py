@@ -0,0 +1,283 @@
+"""
+Model-swap-aware scheduling for shared Ollama hosts.
+Tracks which models are resident on each host (Ollama /api/ps plus the
+calls made through it), holds an LLM call for a non-resident model while
+the host is busy with the resident one (bounded wait), lets speaker
+selection prefer agents whose model is loaded, warms the next likely
+model where that does not evict the current one, loads the model of a
+gated call before it runs (for the Ollama client), refreshes keep_alive,
+and counts model swaps per project.
+"""
+import json
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from loguru import logger
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class HostState:
+    """Resident models (least recently used first) and in-flight calls of one host."""
+
+    def __init__(self, key: str, url: str, max_loaded: int):
+        self.key = key
+        self.url = url
+        self.max_loaded = max(1, max_loaded)
+        self.resident: "OrderedDict[str, float]" = OrderedDict()
+        self.active: Dict[str, int] = defaultdict(int)
+        self.waiting: Dict[str, int] = defaultdict(int)
+        self.keep_alive_sent: Dict[str, float] = {}
+        self.cond = threading.Condition()
+
+    def is_resident(self, model: str) -> bool:
+        return model in self.resident
+
+    def touch(self, model: str):
+        """Marks a model as just used; evicts the least recently used beyond max_loaded."""
+        self.resident[model] = time.monotonic()
+        self.resident.move_to_end(model)
+        while len(self.resident) > self.max_loaded:
+            self.resident.popitem(last=False)
+
+    def has_room(self) -> bool:
+        return len(self.resident) < self.max_loaded
+
+
+class ModelResidency:
+    """
+    Process-wide view of the models loaded on the Ollama hosts of an LLMRouter.
+
+    The resident set is updated from every gated call and re-synchronised
+    from /api/ps by a background poller, so speaker selection never waits
+    on HTTP.
+    """
+
+    def __init__(self, router, config: Optional[Dict[str, Any]] = None,
+                 on_swap: Optional[Callable[[str, str, str], None]] = None):
+        config = config or {}
+        self.router = router
+        self.poll_interval = config.get('poll_interval', 5)
+        self.keep_alive = config.get('keep_alive', '30m')
+        self.keep_alive_refresh = config.get('keep_alive_refresh', 300)
+        self.load_timeout = config.get('load_timeout', 300)
+        self.max_wait = config.get('max_wait', 20)
+        self.warm_next = config.get('warm_next', True)
+        self.on_swap = on_swap
+        self.hosts: Dict[str, HostState] = {}
+        self._by_base_url: Dict[str, str] = {}
+        for key, host in router.hosts.items():
+            url = f"http://{host.get('host', 'localhost')}:{host.get('port', 11434)}"
+            self.hosts[key] = HostState(key, url, host.get('max_loaded_models', 1))
+            self._by_base_url[router._base_url(key)] = key
+        self.swaps: Dict[str, int] = defaultdict(int)
+        self.waits: Dict[str, float] = defaultdict(float)
+        self._requests = ThreadPoolExecutor(max_workers=2, thread_name_prefix="aria-ollama-ps")
+        self._stopping = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    # --- Ollama API ---
+
+    def _request(self, host: HostState, path: str, body: Optional[Dict[str, Any]] = None, timeout: float = 5):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(host.url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read() or b"{}")
+
+    def poll(self, host: HostState):
+        """Replaces a host's resident set with what /api/ps reports."""
+        try:
+            models = [m.get("name") or m.get("model") for m in self._request(host, "/api/ps").get("models", [])]
+        except Exception as e:
+            logger.debug(f"/api/ps on {host.key} failed: {e}")
+            return
+        with host.cond:
+            known = [model for model in host.resident if model in models]
+            host.resident = OrderedDict((model, host.resident[model]) for model in known)
+            for model in models:
+                if model not in host.resident:
+                    host.resident[model] = time.monotonic()
+                    host.resident.move_to_end(model, last=False)
+            host.cond.notify_all()
+
+    def _poll_loop(self):
+        while not self._stopping.wait(self.poll_interval):
+            for host in self.hosts.values():
+                self.poll(host)
+
+    def start(self):
+        """Polls every host once, then keeps polling in a daemon thread."""
+        for host in self.hosts.values():
+            self._requests.submit(self.poll, host)
+        if self._poller is None and self.poll_interval:
+            self._poller = threading.Thread(target=self._poll_loop, name="aria-ollama-ps", daemon=True)
+            self._poller.start()
+        return self
+
+    def _load(self, host: HostState, model: str, reason: str):
+        """Loads a model (or refreshes its keep_alive) with an empty /api/generate request."""
+        try:
+            self._request(host, "/api/generate", {"model": model, "keep_alive": self.keep_alive},
+                          timeout=self.load_timeout)
+            logger.debug(f"{reason} {model} on {host.key} (keep_alive {self.keep_alive})")
+        except Exception as e:
+            logger.debug(f"{reason} {model} on {host.key} failed: {e}")
+
+    def _load_now(self, host: HostState, model: str):
+        """Loads a model before a call; raises on failure so the caller can fall back."""
+        started = time.monotonic()
+        try:
+            self._request(host, "/api/generate", {"model": model, "keep_alive": self.keep_alive},
+                          timeout=self.load_timeout)
+        except Exception:
+            with host.cond:
+                host.resident.pop(model, None)
+                host.keep_alive_sent.pop(model, None)
+            raise
+        logger.info(f"Loaded {model} on {host.key} in {time.monotonic() - started:.1f}s")
+
+    # --- Routes ---
+
+    def host_of(self, base_url: str) -> Optional[str]:
+        """Host key of a config_list base_url."""
+        return self._by_base_url.get(base_url)
+
+    def route_of(self, llm_config: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(host key, model) of the primary route of an llm_config."""
+        entries = llm_config.get("config_list") or []
+        if not entries:
+            return None
+        host = self._by_base_url.get(entries[0].get("base_url"))
+        return (host, entries[0].get("model")) if host else None
+
+    def agent_route(self, agent_name: str) -> Optional[Tuple[str, str]]:
+        return self.router.assignments.get(agent_name)
+
+    def is_resident(self, agent_name: str) -> bool:
+        """True if the agent's primary model is loaded on its host."""
+        route = self.agent_route(agent_name)
+        if not route or route[0] not in self.hosts:
+            return False
+        host = self.hosts[route[0]]
+        with host.cond:
+            return host.is_resident(route[1])
+
+    def warm(self, agent_name: str, current: Optional[str] = None):
+        """
+        Preloads an agent's model in the background if that cannot evict the current speaker's model.
+
+        Args:
+            agent_name: The likely next speaker.
+            current: The speaker about to run, whose model must stay loaded.
+        """
+        route = self.agent_route(agent_name)
+        if not self.warm_next or not route or route[0] not in self.hosts:
+            return
+        host = self.hosts[route[0]]
+        current_route = self.agent_route(current) if current else None
+        with host.cond:
+            if host.is_resident(route[1]):
+                return
+            same_host = current_route is not None and current_route[0] == host.key
+            if same_host and not host.has_room():
+                return
+            host.touch(route[1])
+        self._requests.submit(self._load, host, route[1], "Warmed")
+
+    # --- Call gating ---
+
+    @contextmanager
+    def turn(self, host_key: str, model: str, project_id: str, load: bool = False):
+        """
+        Holds an LLM call for a non-resident model while the host serves another one.
+
+        Calls for a model that is already loaded go first; a call for
+        another model waits until the host is idle, at most max_wait seconds.
+
+        Args:
+            host_key: Router host the call goes to.
+            model: Model of the call.
+            project_id: The project the call belongs to (for swap counts).
+            load: Load a non-resident model (load_timeout) before yielding,
+                so the call's own timeouts exclude the swap; errors propagate.
+
+        Yields:
+            True if the call swaps the model in.
+        """
+        host = self.hosts.get(host_key)
+        if host is None:
+            yield False
+            return
+        started = time.monotonic()
+        with host.cond:
+            deadline = started + self.max_wait
+            host.waiting[model] += 1
+            try:
+                while True:
+                    busy = any(count for other, count in host.active.items() if other != model)
+                    resident_first = not host.is_resident(model) and any(
+                        count for other, count in host.waiting.items()
+                        if other != model and host.is_resident(other)
+                    )
+                    remaining = deadline - time.monotonic()
+                    if not (busy or resident_first) or remaining <= 0:
+                        break
+                    host.cond.wait(remaining)
+            finally:
+                host.waiting[model] -= 1
+            swapped = not host.is_resident(model)
+            host.active[model] += 1
+            host.touch(model)
+            refresh = time.monotonic() - host.keep_alive_sent.get(model, 0) > self.keep_alive_refresh
+            if refresh:
+                host.keep_alive_sent[model] = time.monotonic()
+        self.waits[project_id] += time.monotonic() - started
+        if swapped:
+            self.swaps[project_id] += 1
+            logger.info(f"Model swap on {host_key}: loading {model} for {project_id}")
+            if self.on_swap:
+                self.on_swap(project_id, host_key, model)
+        try:
+            if load and swapped:
+                self._load_now(host, model)
+            elif refresh and self.keep_alive is not None:
+                self._requests.submit(self._load, host, model, "Refreshed keep_alive of")
+            yield swapped
+        finally:
+            with host.cond:
+                host.active[model] -= 1
+                host.cond.notify_all()
+
+    def install(self, agent, project_id: str, llm_config: Dict[str, Any]):
+        """
+        Gates every LLM call of an agent on its primary route through turn().
+
+        Only for AutoGen's own client; OllamaModelClient gates each route itself.
+
+        Args:
+            agent: A ConversableAgent with an LLM client.
+            project_id: The project the agent belongs to (for swap counts).
+            llm_config: The llm_config the agent was created with.
+        """
+        client = getattr(agent, "client", None)
+        route = self.route_of(llm_config)
+        if client is None or route is None:
+            return
+        create = client.create
+
+        def gated_create(**params):
+            with self.turn(route[0], route[1], project_id):
+                return create(**params)
+
+        client.create = gated_create
+
+    def finish_project(self, project_id: str) -> Dict[str, float]:
+        """Returns and forgets a project's swap count and gate wait."""
+        return {"swaps": self.swaps.pop(project_id, 0), "wait_seconds": self.waits.pop(project_id, 0.0)}
+
+    def shutdown(self):
+        self._stopping.set()
+        self._requests.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,260 @@
+"""
+Buffered MongoDB writer for test results and events.
+Callers enqueue documents without blocking; a background thread writes
+them with unordered insert_many batches, flushed by size or time. While
+MongoDB is unreachable, batches are spilled to a local JSON-lines file and
+replayed once it is back.
+
+The writer is a thread rather than an asyncio task: pymongo only has a
+blocking API, and write() is called from tool threads (run_io) and AutoGen
+hooks as well as the event loop. An asyncio writer would still need a
+thread for every insert_many and a thread-safe hand-off from its callers.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from loguru import logger
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from clients import registry
+
+# bson/pymongo are imported when the first writer is built, not at service start
+if TYPE_CHECKING:
+    from bson import ObjectId
+
+# Fields every logged collection is indexed on
+INDEXED_FIELDS = ("project_name", "timestamp")
+
+
+class BufferedMongoWriter:
+    """
+    Thread-safe, batching writer for one MongoDB database.
+
+    write() only appends to an in-memory buffer, so it is safe to call from
+    the event loop, tool threads and hooks alike. Documents get their _id
+    on write(), which makes replays of spilled batches idempotent.
+    """
+
+    def __init__(self, db_factory: Callable[[], Any], batch_size: int = 200,
+                 flush_interval: float = 1.0, max_buffer: int = 20000,
+                 spill_path: str = "/tmp/aria_mongo_spill.jsonl", retry_interval: float = 30):
+        """
+        Args:
+            db_factory: Returns the pymongo Database to write to.
+            batch_size: Buffered documents that trigger an immediate flush.
+            flush_interval: Maximum seconds a document waits in the buffer.
+            max_buffer: Buffered documents beyond this are spilled to disk.
+            spill_path: JSON-lines file used while MongoDB is unreachable.
+            retry_interval: Seconds to spill without retrying after a connection failure.
+        """
+        self.db_factory = db_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spill_path = Path(spill_path)
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._indexed = set()
+        self.written = 0
+        self.spilled = 0
+        self.failed = 0
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="mongo-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, collection: str, document: Dict[str, Any]) -> "ObjectId":
+        """
+        Queues a document for insertion.
+
+        Args:
+            collection: Target collection name.
+            document: The document; an _id is added if missing.
+
+        Returns:
+            The document's _id.
+        """
+        from bson import ObjectId
+        document.setdefault("_id", ObjectId())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BufferedMongoWriter is closed")
+            overflow = len(self._buffer) >= self.max_buffer
+            if not overflow:
+                self._buffer.append((collection, document))
+                size = len(self._buffer)
+            self._ensure_thread()
+        if overflow:
+            self._spill([(collection, document)])
+        elif size >= self.batch_size:
+            self._wakeup.set()
+        return document["_id"]
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            with self._lock:
+                if self._closed and not self._buffer:
+                    return
+
+    def _take(self) -> List[tuple]:
+        with self._lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+        return batch
+
+    def _ensure_indexes(self, db, collection: str):
+        if collection in self._indexed:
+            return
+        for field in INDEXED_FIELDS:
+            db[collection].create_index(field)
+        self._indexed.add(collection)
+
+    def _insert(self, db, batch: List[tuple]):
+        """Writes a batch grouped by collection; raises on connection errors."""
+        from pymongo.errors import BulkWriteError
+        grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for collection, document in batch:
+            grouped[collection].append(document)
+        for collection, documents in grouped.items():
+            self._ensure_indexes(db, collection)
+            for start in range(0, len(documents), self.batch_size):
+                chunk = documents[start:start + self.batch_size]
+                try:
+                    db[collection].insert_many(chunk, ordered=False)
+                    self.written += len(chunk)
+                except BulkWriteError as e:
+                    # Unordered: everything but the failed documents was written.
+                    # Duplicate keys come from replayed spills and are expected.
+                    errors = e.details.get("writeErrors", [])
+                    real = [error for error in errors if error.get("code") != 11000]
+                    self.written += e.details.get("nInserted", 0)
+                    if real:
+                        self.failed += len(real)
+                        logger.error(f"{len(real)} documents rejected by {collection}: {real[0].get('errmsg')}")
+
+    def flush(self):
+        """Writes everything buffered now; spills to disk if MongoDB is unreachable."""
+        from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+        batch = self._take()
+        if not batch and not self.spill_path.exists():
+            return
+        if time.monotonic() < self._retry_at:
+            self._spill(batch)
+            return
+        try:
+            db = self.db_factory()
+            self._replay_spill(db)
+            if batch:
+                self._insert(db, batch)
+        except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+            logger.warning(f"MongoDB unreachable, spilling {len(batch)} documents to {self.spill_path}: {e}")
+            self._retry_at = time.monotonic() + self.retry_interval
+            self._spill(batch)
+        except Exception as e:
+            logger.error(f"MongoDB batch write failed, spilling {len(batch)} documents: {e}")
+            self._spill(batch)
+
+    def _spill(self, batch: List[tuple]):
+        from bson import json_util
+        if not batch:
+            return
+        with self._spill_lock:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a") as f:
+                for collection, document in batch:
+                    f.write(json_util.dumps({"collection": collection, "document": document}) + "\n")
+        self.spilled += len(batch)
+
+    def _replay_spill(self, db):
+        """Writes spilled documents back once MongoDB is reachable again."""
+        with self._spill_lock:
+            if not self.spill_path.exists():
+                return
+            replaying = self.spill_path.with_suffix(f".replay-{os.getpid()}")
+            self.spill_path.rename(replaying)
+        from bson import json_util
+        batch = []
+        with open(replaying) as f:
+            for line in f:
+                if line.strip():
+                    entry = json_util.loads(line)
+                    batch.append((entry["collection"], entry["document"]))
+        try:
+            self._insert(db, batch)
+        except Exception:
+            # Keep the documents for the next attempt
+            self._spill(batch)
+            self.spilled -= len(batch)
+            raise
+        finally:
+            replaying.unlink(missing_ok=True)
+        logger.info(f"Replayed {len(batch)} spilled documents to MongoDB")
+
+    def close(self, timeout: float = 10):
+        """Flushes the buffer and stops the background thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None:
+            thread.join(timeout)
+        else:
+            self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns buffered, written, spilled and failed document counts."""
+        with self._lock:
+            buffered = len(self._buffer)
+        return {"buffered": buffered, "written": self.written,
+                "spilled": self.spilled, "failed": self.failed}
+
+
+def _from_config() -> BufferedMongoWriter:
+    conf = registry.config.get('mongo_logging', {}) or {}
+    return BufferedMongoWriter(
+        registry.mongo_db,
+        batch_size=conf.get('batch_size', 200),
+        flush_interval=conf.get('flush_interval', 1.0),
+        max_buffer=conf.get('max_buffer', 20000),
+        spill_path=conf.get('spill_path', '/tmp/aria_mongo_spill.jsonl'),
+        retry_interval=conf.get('retry_interval', 30),
+    )
+
+
+class _LazyWriter:
+    """Builds the process-wide writer from config.yaml on first use."""
+
+    def __init__(self):
+        self._writer: Optional[BufferedMongoWriter] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> BufferedMongoWriter:
+        with self._lock:
+            if self._writer is None:
+                self._writer = _from_config()
+            return self._writer
+
+    def write(self, collection: str, document: Dict[str, Any]) -> "ObjectId":
+        return self.get().write(collection, document)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+writer = _LazyWriter()
+# Registered after clients.registry, so it runs (and flushes) before clients are closed
+atexit.register(writer.close)
@@ -0,0 +1,325 @@
+"""
+Pooled async client for the Ollama OpenAI-compatible endpoints.
+One keep-alive connection pool and one concurrency semaphore per host,
+always-streamed chat completions (deltas are handed to the orchestrator),
+a first-token timeout separate from the total timeout, and retries with
+jittered exponential backoff. OllamaModelClient plugs it into AutoGen
+as a custom model client (model_client_cls); it gates every route through
+the shared ModelResidency, which also loads a non-resident model before
+the request, so slow swaps do not count as a hung model.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+# Parameters forwarded from AutoGen to /v1/chat/completions
+REQUEST_KEYS = {"messages", "model", "temperature", "top_p", "max_tokens", "stop", "seed", "tools",
+                "tool_choice", "response_format", "frequency_penalty", "presence_penalty"}
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class OllamaError(Exception):
+    """Request failed; `retryable` tells whether another attempt may succeed."""
+
+    def __init__(self, message: str, retryable: bool = False, timeout: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+        self.timeout = timeout
+        # Deltas of the failed attempt were already passed to on_delta
+        self.streamed = False
+
+
+class OllamaHost:
+    """Connection pool and parallel-slot semaphore of one Ollama server."""
+
+    def __init__(self, root_url: str, parallel: int, limits: httpx.Limits, connect_timeout: float):
+        self.root_url = root_url
+        self.parallel = max(1, parallel)
+        self.http = httpx.AsyncClient(base_url=root_url, limits=limits,
+                                      timeout=httpx.Timeout(None, connect=connect_timeout))
+        self.slots = asyncio.Semaphore(self.parallel)
+
+
+class OllamaClient:
+    """
+    Async client for all Ollama hosts, usable from sync code through chat_sync().
+
+    All requests run on one private event loop thread, so the pools and
+    semaphores are shared by every agent and project in the process.
+    """
+
+    def __init__(self, hosts: Dict[str, Dict[str, Any]], config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.first_token_timeout = config.get('first_token_timeout', 60)
+        self.idle_timeout = config.get('idle_timeout', 60)
+        self.total_timeout = config.get('total_timeout', 600)
+        self.connect_timeout = config.get('connect_timeout', 5)
+        self.retries = config.get('retries', 3)
+        self.backoff_base = config.get('backoff_base', 1.0)
+        self.backoff_max = config.get('backoff_max', 20.0)
+        self.limits = httpx.Limits(
+            max_connections=config.get('max_connections', 16),
+            max_keepalive_connections=config.get('max_keepalive_connections', 8),
+            keepalive_expiry=config.get('keepalive_expiry', 120),
+        )
+        # Base URL as used in config_list entries -> (root URL, parallel slots)
+        self.host_config = {
+            f"http://{host.get('host', 'localhost')}:{host.get('port', 11434)}":
+                host.get('parallel', config.get('parallel', 1))
+            for host in hosts.values()
+        }
+        self._hosts: Dict[str, OllamaHost] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # --- Event loop ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="aria-ollama", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _host(self, base_url: str) -> OllamaHost:
+        root = base_url.rstrip("/")
+        if root.endswith("/v1"):
+            root = root[:-3]
+        host = self._hosts.get(root)
+        if host is None:
+            host = self._hosts[root] = OllamaHost(root, self.host_config.get(root, 1), self.limits,
+                                                  self.connect_timeout)
+        return host
+
+    # --- Chat ---
+
+    async def chat(self, base_url: str, params: Dict[str, Any],
+                   on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Streams a chat completion and returns it as one OpenAI completion dict.
+
+        Args:
+            base_url: The config_list base_url (http://host:port/v1).
+            params: Request parameters (messages, model, tools, ...).
+            on_delta: Called with each content delta as it arrives.
+
+        Returns:
+            An OpenAI-style chat.completion dict with an extra 'timings'
+            entry (ttft, generation, total; seconds).
+        """
+        host = self._host(base_url)
+        body = {key: value for key, value in params.items() if key in REQUEST_KEYS and value is not None}
+        body.update(stream=True, stream_options={"include_usage": True})
+        attempt = 0
+        while True:
+            delivered = {"any": False}
+            try:
+                async with host.slots:
+                    return await asyncio.wait_for(self._stream(host, body, on_delta, delivered),
+                                                  self.total_timeout)
+            except asyncio.TimeoutError:
+                error = OllamaError(f"{body['model']} on {host.root_url} exceeded {self.total_timeout}s",
+                                    retryable=False, timeout=True)
+            except OllamaError as e:
+                error = e
+            except httpx.TransportError as e:
+                error = OllamaError(f"{type(e).__name__} talking to {host.root_url}: {e}", retryable=True,
+                                    timeout=isinstance(e, httpx.TimeoutException))
+            # Deltas already went to the orchestrator, so a retry would duplicate output
+            error.streamed = delivered["any"]
+            if not error.retryable or error.streamed or attempt >= self.retries:
+                raise error
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            attempt += 1
+            logger.warning(f"{error}; retry {attempt}/{self.retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _stream(self, host: OllamaHost, body: Dict[str, Any], on_delta, delivered) -> Dict[str, Any]:
+        started = time.monotonic()
+        first_token: Optional[float] = None
+        content: List[str] = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        usage: Dict[str, int] = {}
+        finish_reason = None
+        completion_id, model = None, body["model"]
+
+        async with host.http.stream("POST", "/v1/chat/completions", json=body) as response:
+            if response.status_code >= 400:
+                text = (await response.aread()).decode(errors="replace")[:300]
+                raise OllamaError(f"HTTP {response.status_code} from {host.root_url}: {text}",
+                                  retryable=response.status_code in RETRY_STATUS)
+            lines = response.aiter_lines()
+            while True:
+                timeout = self.first_token_timeout if first_token is None else self.idle_timeout
+                try:
+                    line = await asyncio.wait_for(lines.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    stage = "first token" if first_token is None else "next token"
+                    raise OllamaError(f"No {stage} from {model} on {host.root_url} within {timeout}s",
+                                      retryable=first_token is None, timeout=True)
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    raise OllamaError(f"Malformed stream chunk from {model} on {host.root_url}: {data[:100]}",
+                                      retryable=first_token is None)
+                completion_id = chunk.get("id", completion_id)
+                model = chunk.get("model", model)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta") or {}
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    text = delta.get("content")
+                    if text or delta.get("tool_calls"):
+                        if first_token is None:
+                            first_token = time.monotonic()
+                    if text:
+                        content.append(text)
+                        if on_delta is not None:
+                            delivered["any"] = True
+                            on_delta(text)
+                    for call in delta.get("tool_calls") or []:
+                        entry = tool_calls.setdefault(call.get("index", len(tool_calls)), {
+                            "id": call.get("id") or f"call_{uuid.uuid4().hex[:12]}",
+                            "type": "function", "function": {"name": "", "arguments": ""},
+                        })
+                        function = call.get("function") or {}
+                        entry["function"]["name"] += function.get("name") or ""
+                        entry["function"]["arguments"] += function.get("arguments") or ""
+
+        finished = time.monotonic()
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        ttft = (first_token or finished) - started
+        return {
+            "id": completion_id or f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": finish_reason or ("tool_calls" if tool_calls else "stop")}],
+            "usage": {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+            "timings": {"ttft": ttft, "generation": finished - (first_token or finished),
+                        "total": finished - started},
+        }
+
+    def chat_sync(self, base_url: str, params: Dict[str, Any],
+                  on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Blocking chat() for AutoGen's synchronous client interface."""
+        future = asyncio.run_coroutine_threadsafe(self.chat(base_url, params, on_delta), self._ensure_loop())
+        return future.result()
+
+    def close(self):
+        """Closes all connection pools and stops the event loop thread."""
+        if self._loop is None:
+            return
+
+        async def close_all():
+            for host in self._hosts.values():
+                await host.http.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_all(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.debug(f"Closing Ollama pools failed: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+
+class OllamaModelClient:
+    """
+    AutoGen ModelClient for config_list entries with model_client_cls 'OllamaModelClient'.
+
+    Register per agent with agent.register_model_client(OllamaModelClient,
+    client=<OllamaClient>, on_delta=<callable or None>, residency=<ModelResidency
+    or None>, project_id=<str>). on_delta gets every content delta, and None
+    when a partly streamed attempt failed (its text is superseded by the
+    fallback route's reply). With a residency every request, on the primary
+    and the fallback routes alike, holds a ModelResidency turn that loads the
+    model first when it is not resident. Timeouts, connection errors and
+    failed loads are raised as openai.APITimeoutError / APIConnectionError so
+    AutoGen moves on to the next fallback entry.
+    """
+
+    def __init__(self, config: Dict[str, Any], client: OllamaClient,
+                 on_delta: Optional[Callable[[str], None]] = None, residency=None,
+                 project_id: Optional[str] = None, **kwargs):
+        self.model = config["model"]
+        self.base_url = config["base_url"]
+        self.client = client
+        self.on_delta = on_delta
+        self.residency = residency
+        self.project_id = project_id or ""
+        self.host_key = residency.host_of(self.base_url) if residency else None
+
+    def _turn(self):
+        if self.host_key is None:
+            return nullcontext()
+        return self.residency.turn(self.host_key, self.model, self.project_id, load=True)
+
+    def create(self, params: Dict[str, Any]):
+        import openai
+        from openai.types.chat import ChatCompletion
+
+        request = httpx.Request("POST", f"{self.base_url}/chat/completions")
+        try:
+            with self._turn():
+                completion = self.client.chat_sync(self.base_url, dict(params, model=self.model), self.on_delta)
+        except OllamaError as e:
+            if e.streamed and self.on_delta is not None:
+                self.on_delta(None)
+            if e.timeout:
+                raise openai.APITimeoutError(request=request) from e
+            raise openai.APIConnectionError(message=str(e), request=request) from e
+        except OSError as e:
+            # Loading the model through ModelResidency failed
+            if isinstance(e, TimeoutError) or isinstance(getattr(e, "reason", None), TimeoutError):
+                raise openai.APITimeoutError(request=request) from e
+            raise openai.APIConnectionError(message=f"Loading {self.model} failed: {e}", request=request) from e
+        timings = completion.pop("timings")
+        response = ChatCompletion.model_validate(completion)
+        response.timings = timings
+        return response
+
+    def message_retrieval(self, response) -> List[Any]:
+        return [
+            choice.message if choice.message.tool_calls or choice.message.function_call
+            else choice.message.content
+            for choice in response.choices
+        ]
+
+    def cost(self, response) -> float:
+        return 0.0
+
+    @staticmethod
+    def get_usage(response) -> Dict[str, Any]:
+        usage = response.usage
+        return {
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+            "total_tokens": usage.total_tokens if usage else 0,
+            "cost": 0.0,
+            "model": response.model,
+        }
@@ -0,0 +1,128 @@
+"""
+Per-project sessions and the project scheduler.
+Each project runs in its own ProjectSession (agents, GroupChat, manager,
+memory namespace, Slack channel, dashboard stream); the ProjectScheduler
+caps how many sessions run at once on each LLM host.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from loguru import logger
+from typing import Any, Dict, Iterable, Optional, Set
+
+
+class ProjectSession:
+    """
+    Isolated state of one running project.
+
+    AriaCEO fills in agents, group_chat and manager when it builds the
+    session; nothing in here is shared with other sessions.
+    """
+
+    def __init__(self, project_id: str, channel: Optional[str] = None,
+                 memory_namespace: Optional[str] = None, dashboard_stream=None):
+        self.project_id = project_id
+        self.channel = channel
+        # None means the session reads/writes the shared team memory
+        self.memory_namespace = memory_namespace
+        self.dashboard_stream = dashboard_stream
+        # Token-level streaming of replies being generated (None if disabled)
+        self.token_stream = None
+        self.agents: Dict[str, Any] = {}
+        self.group_chat = None
+        self.manager = None
+        # Number of in-memory messages already persisted, per memory log
+        self.memory_saved: Dict[str, int] = {}
+        # Agents whose memory was loaded (on their first reply)
+        self.memory_loaded: Set[str] = set()
+        self.project_dir = None
+        self.code_extractor = None
+        self.speaker_selection = None
+        self.convergence = None
+        # Checkpoint metadata and messages already checkpointed, per thread
+        self.checkpoint: Optional[Dict[str, Any]] = None
+        self.checkpointed: Dict[str, int] = {}
+
+    def memory_key(self, name: str) -> str:
+        """
+        Returns the MemoryManager log name for an agent (or 'GroupChat') in this session.
+
+        Args:
+            name: Agent name or 'GroupChat'.
+        """
+        if self.memory_namespace:
+            return f"{self.memory_namespace}/{name}"
+        return name
+
+    @property
+    def aria(self):
+        """The CEO agent that starts the chat."""
+        return self.agents.get('Aria')
+
+
+class ProjectScheduler:
+    """
+    Limits concurrent projects globally and per LLM host.
+
+    A session holds one slot on every host its agents are routed to.
+    Slots are acquired in a fixed (sorted) order so two sessions can
+    never deadlock waiting on each other's hosts.
+    """
+
+    def __init__(self, host_limits: Dict[str, int], max_projects: Optional[int] = None):
+        """
+        Args:
+            host_limits: Maximum concurrent projects per host key (e.g. {'gmktec': 2}).
+            max_projects: Optional global cap on concurrent projects.
+        """
+        self.host_limits = {host: max(1, int(limit)) for host, limit in host_limits.items()}
+        self.max_projects = max_projects
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self.running: Dict[str, tuple] = {}
+        self.waiting = 0
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        # Created lazily so they bind to the running event loop
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.host_limits.get(host, 1))
+        return self._host_slots[host]
+
+    @asynccontextmanager
+    async def slot(self, project_id: str, hosts: Iterable[str]):
+        """
+        Waits until the project may run on all of its hosts.
+
+        Args:
+            project_id: Project identifier (for logging/status).
+            hosts: Host keys used by the project's agents.
+        """
+        hosts = tuple(sorted(set(hosts)))
+        if self.max_projects and self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(self.max_projects)
+
+        acquired = []
+        self.waiting += 1
+        try:
+            if self._global_slots is not None:
+                await self._global_slots.acquire()
+                acquired.append(self._global_slots)
+            for host in hosts:
+                semaphore = self._semaphore(host)
+                await semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.running[project_id] = hosts
+        logger.info(f"Project {project_id} scheduled on {', '.join(hosts) or 'no hosts'} "
+                    f"({len(self.running)} running, {self.waiting} waiting)")
+        try:
+            yield
+        finally:
+            self.running.pop(project_id, None)
+            for semaphore in reversed(acquired):
+                semaphore.release()
@@ -0,0 +1,305 @@
+"""
+Sandboxed pytest/pylint runs on generated projects, with result caching.
+Both tools run in a subprocess confined to the project directory (scrubbed
+environment, private HOME, CPU/memory limits, timeout). Results are cached
+per file content hash, so later rounds only lint changed files and only
+re-run test files whose content or project sources changed.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from loguru import logger
+from typing import Any, Dict, Iterable, List, Optional
+
+import diskcache as dc
+
+# Environment variables passed through to sandboxed runs; everything else
+# (tokens, passwords) is dropped
+ENV_ALLOWLIST = ("PATH", "LANG", "LC_ALL", "TZ", "VIRTUAL_ENV")
+SKIP_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules", ".pytest_cache"}
+MAX_REPORTED = 20
+
+
+class SandboxError(Exception):
+    """Raised when a path escapes the projects directory or a run cannot start."""
+
+
+class QARunner:
+    """
+    Runs pylint and pytest for project directories below `projects_dir`.
+
+    Cache keys include the tool version and arguments, so upgrading pylint
+    or changing options invalidates old entries.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, projects_dir: Optional[str] = None):
+        config = config or {}
+        self.projects_dir = Path(projects_dir or "/opt/aria-system/projects").resolve()
+        self.cache = dc.Cache(config.get('cache_dir', '/tmp/aria_qa_cache'),
+                              size_limit=config.get('cache_size_mb', 256) * 1024 * 1024)
+        self.timeout = config.get('timeout', 900)
+        self.pytest_workers = str(config.get('pytest_workers', 'auto'))
+        self.pylint_jobs = int(config.get('pylint_jobs', 0))
+        self.memory_limit_mb = config.get('memory_limit_mb', 2048)
+        self.cpu_time_limit = config.get('cpu_time_limit', 1800)
+        self.pylint_args = list(config.get('pylint_args', ["--disable=C0114,C0115,C0116"]))
+
+    # --- Sandbox ---
+
+    def resolve_project(self, project_path: str) -> Path:
+        """Returns the project directory, refusing anything outside projects_dir."""
+        path = Path(project_path)
+        if not path.is_absolute():
+            path = self.projects_dir / path
+        path = path.resolve()
+        if path != self.projects_dir and self.projects_dir not in path.parents:
+            raise SandboxError(f"{project_path} is outside the projects directory {self.projects_dir}")
+        if not path.is_dir():
+            raise SandboxError(f"Project directory {path} does not exist")
+        return path
+
+    def _limits(self):
+        import resource
+        if self.cpu_time_limit:
+            resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_time_limit, self.cpu_time_limit))
+        if self.memory_limit_mb:
+            limit = self.memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    def _run(self, args: List[str], cwd: Path) -> subprocess.CompletedProcess:
+        home = tempfile.mkdtemp(prefix="aria-qa-home-")
+        env = {name: os.environ[name] for name in ENV_ALLOWLIST if name in os.environ}
+        env.update(HOME=home, PYTHONDONTWRITEBYTECODE="1", PYTHONPATH=str(cwd))
+        try:
+            return subprocess.run(
+                args, cwd=cwd, env=env, capture_output=True, text=True, check=False,
+                timeout=self.timeout, preexec_fn=self._limits if os.name == "posix" else None,
+            )
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+
+    # --- Hashing ---
+
+    @staticmethod
+    def _python_files(root: Path, paths: Optional[Iterable[str]] = None) -> List[str]:
+        if paths:
+            files = []
+            for p in paths:
+                path = (root / p).resolve()
+                if root not in path.parents:
+                    raise SandboxError(f"{p} is outside the project")
+                if path.suffix == ".py" and path.is_file():
+                    files.append(str(path.relative_to(root)))
+        else:
+            files = [
+                str(path.relative_to(root)) for path in root.rglob("*.py")
+                if not SKIP_DIRS.intersection(path.relative_to(root).parts)
+            ]
+        return sorted(set(files))
+
+    @staticmethod
+    def _digest(*parts: bytes) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(hashlib.sha256(part).digest())
+        return digest.hexdigest()
+
+    def _tool_version(self, module: str) -> str:
+        key = f"version:{module}"
+        version = self.cache.get(key)
+        if version is None:
+            result = subprocess.run([sys.executable, "-m", module, "--version"],
+                                    capture_output=True, text=True, check=False)
+            version = result.stdout.strip().splitlines()[0] if result.stdout else "unknown"
+            self.cache.set(key, version, expire=3600)
+        return version
+
+    # --- pylint ---
+
+    def lint(self, project_path: str, files: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Lints Python files, reusing cached results for unchanged files.
+
+        Args:
+            project_path: Project directory (absolute or relative to projects_dir).
+            files: Optional relative paths; default is every .py file.
+
+        Returns:
+            {'messages': {path: [pylint messages]}, 'linted': n, 'cached': n}
+        """
+        root = self.resolve_project(project_path)
+        paths = self._python_files(root, files)
+        salt = json.dumps([self._tool_version("pylint"), self.pylint_args]).encode()
+        keys = {path: "pylint:" + self._digest(salt, (root / path).read_bytes()) for path in paths}
+
+        messages: Dict[str, List[Dict[str, Any]]] = {}
+        pending = []
+        for path, key in keys.items():
+            cached = self.cache.get(key)
+            if cached is None:
+                pending.append(path)
+            else:
+                messages[path] = cached
+
+        if pending:
+            result = self._run([sys.executable, "-m", "pylint", f"--jobs={self.pylint_jobs}",
+                                "--output-format=json", "--score=n", *self.pylint_args, *pending], root)
+            if result.returncode & 32 or (result.returncode and not result.stdout.strip()):
+                raise SandboxError(f"pylint could not run: {result.stderr.strip()[:500]}")
+            found: Dict[str, List[Dict[str, Any]]] = {path: [] for path in pending}
+            for message in json.loads(result.stdout or "[]"):
+                found.setdefault(message.get("path", ""), []).append({
+                    key: message.get(key) for key in ("type", "symbol", "message", "line", "column")
+                })
+            for path in pending:
+                self.cache.set(keys[path], found[path])
+                messages[path] = found[path]
+
+        return {"messages": messages, "linted": len(pending), "cached": len(paths) - len(pending)}
+
+    # --- pytest ---
+
+    @staticmethod
+    def _is_test_file(path: str) -> bool:
+        name = Path(path).name
+        return name.startswith("test_") or name.endswith("_test.py")
+
+    def test(self, project_path: str, test_path: str = "tests", extra_args: str = "",
+             use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Runs the project's tests, skipping test files cached with the same content and sources.
+
+        A test file's cache key covers its own content and every non-test
+        source file of the project, so code changes re-run all tests.
+
+        Args:
+            project_path: Project directory (absolute or relative to projects_dir).
+            test_path: Test directory or file, relative to the project.
+            extra_args: Additional pytest arguments.
+            use_cache: False runs every test file (e.g. against live services).
+
+        Returns:
+            {'files': {path: {'passed', 'failed', 'errors', 'skipped', 'failures'}},
+             'ran': n, 'cached': n, 'output': str}
+        """
+        root = self.resolve_project(project_path)
+        target = (root / test_path).resolve()
+        if root not in target.parents and target != root:
+            raise SandboxError(f"{test_path} is outside the project")
+        all_files = self._python_files(root)
+        sources = [path for path in all_files if not self._is_test_file(path)]
+        scope = str(target.relative_to(root)) if target != root else ""
+        tests = [path for path in all_files if self._is_test_file(path)
+                 and (not scope or path == scope or path.startswith(scope.rstrip("/") + "/"))]
+        if not tests:
+            return {"files": {}, "ran": 0, "cached": 0, "output": f"No test files found in {test_path}"}
+
+        source_digest = self._digest(*(path.encode() + b"\0" + (root / path).read_bytes() for path in sources))
+        salt = json.dumps([self._tool_version("pytest"), extra_args, source_digest]).encode()
+        keys = {path: "pytest:" + self._digest(salt, path.encode(), (root / path).read_bytes()) for path in tests}
+
+        files: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for path, key in keys.items():
+            cached = self.cache.get(key) if use_cache else None
+            if cached is None:
+                pending.append(path)
+            else:
+                files[path] = cached
+
+        output = ""
+        if pending:
+            report = Path(tempfile.mkstemp(prefix="aria-junit-", suffix=".xml")[1])
+            args = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+                    "-o", "junit_family=xunit1", f"--junitxml={report}"]
+            if self.pytest_workers not in ("0", "1") and importlib.util.find_spec("xdist"):
+                args += ["-n", self.pytest_workers]
+            args += extra_args.split() + pending
+            try:
+                result = self._run(args, root)
+                output = (result.stdout + result.stderr)[-4000:]
+                found = self._parse_junit(report, root)
+            finally:
+                report.unlink(missing_ok=True)
+            # Exit code 2-4: interrupted, internal or usage error -> do not cache
+            cacheable = result.returncode in (0, 1, 5)
+            for path in pending:
+                files[path] = found.get(path, {"passed": 0, "failed": 0, "errors": 0, "skipped": 0,
+                                               "failures": [] if cacheable else [output[-500:]]})
+                if cacheable and use_cache:
+                    self.cache.set(keys[path], files[path])
+
+        return {"files": files, "ran": len(pending), "cached": len(tests) - len(pending), "output": output}
+
+    @staticmethod
+    def _parse_junit(report: Path, root: Path) -> Dict[str, Dict[str, Any]]:
+        results: Dict[str, Dict[str, Any]] = {}
+        if not report.exists() or report.stat().st_size == 0:
+            return results
+        for case in ET.parse(report).getroot().iter("testcase"):
+            path = case.get("file") or case.get("classname", "").replace(".", "/") + ".py"
+            entry = results.setdefault(path, {"passed": 0, "failed": 0, "errors": 0, "skipped": 0, "failures": []})
+            outcome = next((child for child in case if child.tag in ("failure", "error", "skipped")), None)
+            if outcome is None:
+                entry["passed"] += 1
+            elif outcome.tag == "skipped":
+                entry["skipped"] += 1
+            else:
+                entry["failed" if outcome.tag == "failure" else "errors"] += 1
+                entry["failures"].append(f"{case.get('name')}: {(outcome.get('message') or '').strip()[:300]}")
+        return results
+
+
+def format_lint(result: Dict[str, Any]) -> str:
+    """Human-readable pylint summary for the chat."""
+    messages = [(path, message) for path, items in sorted(result["messages"].items()) for message in items]
+    counts: Dict[str, int] = {}
+    for _, message in messages:
+        counts[message["type"]] = counts.get(message["type"], 0) + 1
+    summary = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items())) or "no issues"
+    lines = [f"Pylint: {summary} in {len(result['messages'])} files "
+             f"({result['linted']} linted, {result['cached']} unchanged from cache)."]
+    for path, message in messages[:MAX_REPORTED]:
+        lines.append(f"{path}:{message['line']}: [{message['symbol']}] {message['message']}")
+    if len(messages) > MAX_REPORTED:
+        lines.append(f"... and {len(messages) - MAX_REPORTED} more")
+    return "\n".join(lines)
+
+
+def format_tests(result: Dict[str, Any]) -> str:
+    """Human-readable pytest summary for the chat."""
+    totals = {"passed": 0, "failed": 0, "errors": 0, "skipped": 0}
+    failures = []
+    for path, entry in sorted(result["files"].items()):
+        for key in totals:
+            totals[key] += entry[key]
+        failures.extend(f"{path}::{failure}" for failure in entry["failures"])
+    status = "PASS" if not totals["failed"] and not totals["errors"] else "FAIL"
+    lines = [f"Pytest {status}: {totals['passed']} passed, {totals['failed']} failed, "
+             f"{totals['errors']} errors, {totals['skipped']} skipped "
+             f"({result['ran']} test files run, {result['cached']} unchanged from cache)."]
+    lines.extend(failures[:MAX_REPORTED])
+    if not result["files"]:
+        lines = [result["output"]]
+    elif status == "FAIL" and not failures and result["output"]:
+        lines.append(result["output"][-1500:])
+    return "\n".join(lines)
+
+
+_runner: Optional[QARunner] = None
+
+
+def get_runner(config: Dict[str, Any]) -> QARunner:
+    """Returns the process-wide QARunner built from the full config.yaml dict."""
+    global _runner
+    if _runner is None:
+        _runner = QARunner(config.get('qa', {}), config.get('projects', {}).get('base_dir'))
+        logger.info(f"Initialized QARunner for {_runner.projects_dir}")
+    return _runner
@@ -0,0 +1,254 @@
+"""
+Coalesced, rate-limited Slack status messages.
+Each status key (a project, or one streamed agent turn) owns one Slack
+message that is posted once and then edited in place with chat_update.
+Updates only replace the wanted text; a background task sends the latest
+text at most once per coalescing window, within a per-channel token
+bucket, so callers never wait on Slack.
+"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from loguru import logger
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket of one channel; Slack's Retry-After blocks it entirely."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait_time(self) -> float:
+        """Seconds until a request may be sent (0 if a token is available)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class StatusMessage:
+    """Wanted and last sent text of one Slack message."""
+
+    def __init__(self, key: str, channel: str, window: float):
+        self.key = key
+        self.channel = channel
+        self.window = window
+        self.text = ""
+        self.sent_text = ""
+        self.ts: Optional[str] = None
+        self.due = 0.0
+        self.last_sent = float("-inf")
+        self.attempts = 0
+        # Forgotten once the wanted text is sent
+        self.final = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.text != self.sent_text
+
+
+class SlackStatus:
+    """
+    Background publisher of status messages for an async Slack client.
+
+    update(), post() and finish() never block and must be called from the
+    event loop; the sender task is started with the first update.
+    """
+
+    def __init__(self, slack_client=None, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.slack_client = slack_client
+        self.window = config.get('coalesce_window', 1.0)
+        self.rate = config.get('rate_per_channel', 1.0)
+        self.burst = config.get('burst', 3)
+        self.max_retries = config.get('max_retries', 3)
+        self.max_messages = config.get('max_messages', 500)
+        self.messages: "OrderedDict[str, StatusMessage]" = OrderedDict()
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.requested = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.dropped = 0
+        self._posts = itertools.count(1)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Producers (event loop) ---
+
+    def update(self, key: str, channel: Optional[str], text: str, window: Optional[float] = None,
+               final: bool = False):
+        """
+        Sets the wanted text of a status message; posts it first, edits it afterwards.
+
+        Args:
+            key: Identifies the Slack message, e.g. the project ID.
+            channel: Slack channel; updates without a channel are ignored.
+            text: Full message text (replaces any text not yet sent).
+            window: Minimum seconds between two sends of this message (default coalesce_window).
+            final: Forget the message once this text is sent.
+        """
+        if not self.slack_client or not channel:
+            return
+        self._ensure_sender()
+        self.requested += 1
+        message = self.messages.get(key)
+        if message is None:
+            if not self._make_room():
+                self.dropped += 1
+                logger.warning(f"Slack status '{key}' dropped: {self.max_messages} messages pending")
+                return
+            message = self.messages[key] = StatusMessage(key, channel, self.window if window is None else window)
+        elif message.dirty:
+            self.coalesced += 1
+        if not message.dirty:
+            message.due = max(time.monotonic(), message.last_sent + message.window)
+        message.text = text
+        message.final = message.final or final
+        if not message.dirty and message.final:
+            self.messages.pop(key, None)
+        self._wakeup.set()
+        self._idle.clear()
+
+    def post(self, channel: Optional[str], text: str):
+        """Sends a separate, never edited message through the same rate limit."""
+        self.update(f"post-{next(self._posts)}", channel, text, window=0, final=True)
+
+    def finish(self, key: str):
+        """Forgets a status message once its last wanted text is sent."""
+        message = self.messages.get(key)
+        if message is None:
+            return
+        message.final = True
+        if not message.dirty:
+            self.messages.pop(key, None)
+
+    def _make_room(self) -> bool:
+        if len(self.messages) < self.max_messages:
+            return True
+        # Evict the oldest message with nothing left to send
+        for key, message in self.messages.items():
+            if not message.dirty:
+                del self.messages[key]
+                return True
+        return False
+
+    async def drain(self, timeout: float = 10.0) -> bool:
+        """Waits until all wanted texts are sent (or given up); False on timeout."""
+        if not self._task or not any(m.dirty for m in self.messages.values()):
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Slack status: {sum(m.dirty for m in self.messages.values())} "
+                           f"update(s) still pending after {timeout}s")
+            return False
+
+    def close(self):
+        """Stops the sender task; unsent updates are discarded."""
+        if self._task and not self._task.done() and not self._task.get_loop().is_closed():
+            self._task.cancel()
+        self._task = None
+        logger.info(f"Slack status closed: {self.requested} updates, {self.sent} sent, "
+                    f"{self.coalesced} coalesced, {self.rate_limited} rate limited, "
+                    f"{self.failed} failed, {self.dropped} dropped")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": sum(m.dirty for m in self.messages.values()),
+        }
+
+    # --- Sender ---
+
+    def _ensure_sender(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _bucket(self, channel: str) -> TokenBucket:
+        bucket = self.buckets.get(channel)
+        if bucket is None:
+            bucket = self.buckets[channel] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            pending = [m for m in self.messages.values() if m.dirty]
+            if not pending:
+                self._idle.set()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            message = min(pending, key=lambda m: max(m.due, now + self._bucket(m.channel).wait_time()))
+            delay = max(message.due - now, self._bucket(message.channel).wait_time())
+            if delay > 0:
+                # A newer update may be due earlier
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._bucket(message.channel).take()
+            await self._send(message)
+
+    async def _send(self, message: StatusMessage):
+        text = message.text
+        try:
+            if message.ts is None:
+                response = await self.slack_client.chat_postMessage(channel=message.channel, text=text)
+                message.ts = response["ts"]
+            else:
+                await self.slack_client.chat_update(channel=message.channel, ts=message.ts, text=text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = getattr(e, "response", None)
+            if getattr(response, "status_code", None) == 429:
+                retry_after = float((getattr(response, "headers", None) or {}).get("Retry-After", 1))
+                self.rate_limited += 1
+                self._bucket(message.channel).block(retry_after)
+                logger.warning(f"Slack rate limited in {message.channel}; pausing {retry_after:.0f}s")
+                return
+            message.attempts += 1
+            if message.attempts <= self.max_retries:
+                message.due = time.monotonic() + 2 ** message.attempts
+                logger.debug(f"Slack status '{message.key}' failed ({e}); retry {message.attempts}")
+                return
+            self.failed += 1
+            logger.warning(f"Error sending Slack status '{message.key}': {e}")
+        else:
+            self.sent += 1
+            logger.debug(f"Slack status '{message.key}' sent: {text[:50]}...")
+        # Sent, or given up on this text
+        message.sent_text = text
+        message.attempts = 0
+        message.last_sent = time.monotonic()
+        message.due = message.last_sent + message.window
+        if message.final and not message.dirty:
+            self.messages.pop(message.key, None)
@@ -0,0 +1,169 @@
+"""
+Deterministic speaker selection for the GroupChat.
+Picks the next speaker from cheap rules (tool calls, direct addresses,
+role hand-offs from agents_config.yaml) and only falls back to the
+GroupChatManager's LLM selection when the rules cannot decide.
+"""
+import re
+from collections import Counter
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Returned to AutoGen to delegate the choice to the LLM-driven "auto" method
+LLM_FALLBACK = "auto"
+
+
+class RuleBasedSpeakerSelector:
+    """
+    Callable for GroupChat(speaker_selection_method=...).
+
+    Rules, in order:
+    1. A message with tool calls or tool results is followed by its caller.
+    2. A direct address ("Sam, ...", "@Sam", "Sam:") at the start of a
+       sentence selects the first agent addressed, other than the speaker.
+    3. The speaker's 'handoff' list from agents_config.yaml is cycled
+       through, skipping the speaker itself.
+    4. Otherwise "auto" (LLM selection).
+
+    With `prefer` (agent name -> model already loaded, see
+    model_residency.py), rules 2 and 3 pick a preferred agent among their
+    candidates; an agent passed over `max_preferred_streak` times is
+    selected next, so none is starved. `warm(next, current)` is called with the likely speaker
+    after the selected one.
+
+    Counts how often each path is taken in `counters`.
+    """
+
+    def __init__(self, agent_configs: Dict[str, Dict[str, Any]],
+                 prefer: Optional[Callable[[str], bool]] = None,
+                 warm: Optional[Callable[[str, str], None]] = None,
+                 max_preferred_streak: int = 3):
+        self.prefer = prefer
+        self.warm = warm
+        self.max_preferred_streak = max_preferred_streak
+        self._passed_over: Counter = Counter()
+        self.handoffs = {
+            name: list(config.get('handoff', []) or [])
+            for name, config in agent_configs.items()
+        }
+        names = sorted(agent_configs, key=len, reverse=True)
+        self.address_pattern = re.compile(
+            r"(?:^|[\n.!?]\s*|\*\*)@?(" + "|".join(map(re.escape, names)) + r")\b\s*[,:]",
+        ) if names else None
+        self._handoff_position: Dict[str, int] = {}
+        self.counters: Counter = Counter()
+
+    def addressed(self, content: str, speaker: Optional[str] = None) -> List[str]:
+        """Returns agent names directly addressed in a message, in order of appearance."""
+        if not content or not self.address_pattern:
+            return []
+        names = []
+        for match in self.address_pattern.finditer(content):
+            name = match.group(1)
+            if name != speaker and name not in names:
+                names.append(name)
+        return names
+
+    def _pick(self, names: List[str]) -> int:
+        """
+        Index of the name to use: the first preferred one, except that an
+        agent passed over `max_preferred_streak` times is picked regardless.
+        """
+        if self.prefer is None or len(names) < 2:
+            return 0
+        index = next((i for i, name in enumerate(names) if self._passed_over[name] >= self.max_preferred_streak),
+                     None)
+        if index is None:
+            index = next((i for i, name in enumerate(names) if self.prefer(name)), 0)
+            if index:
+                self.counters["resident_preferred"] += 1
+        for name in names[:index]:
+            self._passed_over[name] += 1
+        self._passed_over[names[index]] = 0
+        return index
+
+    def _handoff_order(self, speaker: str, groupchat) -> List[str]:
+        candidates = [name for name in self.handoffs.get(speaker, []) if name != speaker]
+        position = self._handoff_position.get(speaker, 0)
+        ordered = [candidates[(position + offset) % len(candidates)] for offset in range(len(candidates))]
+        return [name for name in ordered if self._agent(groupchat, name) is not None]
+
+    def _next_handoff(self, speaker: str, groupchat) -> Optional[Any]:
+        ordered = self._handoff_order(speaker, groupchat)
+        if not ordered:
+            return None
+        name = ordered[self._pick(ordered)]
+        candidates = [name for name in self.handoffs.get(speaker, []) if name != speaker]
+        self._handoff_position[speaker] = (candidates.index(name) + 1) % len(candidates)
+        return self._agent(groupchat, name)
+
+    def _selected(self, agent, groupchat):
+        """Warms the model of the agent likely to follow the selected one."""
+        if self.warm is not None:
+            following = self._handoff_order(agent.name, groupchat)
+            if following:
+                self.warm(following[0], agent.name)
+        return agent
+
+    @staticmethod
+    def _agent(groupchat, name: str):
+        return next((agent for agent in groupchat.agents if agent.name == name), None)
+
+    def __call__(self, last_speaker, groupchat) -> Union[Any, str]:
+        messages = groupchat.messages
+        if not messages:
+            self.counters["llm"] += 1
+            return LLM_FALLBACK
+        last = messages[-1]
+
+        # 1. Tool calls are executed by the agent that made them, which then
+        #    reads the results
+        if last.get("tool_calls") or last.get("function_call") or last.get("tool_responses"):
+            self.counters["tool_call"] += 1
+            return last_speaker
+
+        # 2. Direct address
+        content = last.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        addressed = [name for name in self.addressed(content, last_speaker.name)
+                     if self._agent(groupchat, name) is not None]
+        if addressed:
+            self.counters["address"] += 1
+            return self._selected(self._agent(groupchat, addressed[self._pick(addressed)]), groupchat)
+
+        # 3. Role hand-off
+        agent = self._next_handoff(last_speaker.name, groupchat)
+        if agent is not None:
+            self.counters["handoff"] += 1
+            return self._selected(agent, groupchat)
+
+        # 4. Ambiguous: let the manager's LLM decide
+        self.counters["llm"] += 1
+        return LLM_FALLBACK
+
+    def stats(self) -> Dict[str, int]:
+        """Returns how often each selection path was taken."""
+        return dict(self.counters)
+
+
+def build_speaker_selection(method: str, agent_configs: Dict[str, Dict[str, Any]], residency=None,
+                            max_preferred_streak: int = 3):
+    """
+    Returns the speaker_selection_method for GroupChat.
+
+    Args:
+        method: 'rule_based' for RuleBasedSpeakerSelector, or any AutoGen
+            built-in method name ('auto', 'round_robin', 'random', 'manual').
+        agent_configs: The 'agents' section of agents_config.yaml.
+        residency: Optional ModelResidency; rule-based selection then
+            prefers agents whose model is loaded and warms the next model.
+        max_preferred_streak: How often an agent may be passed over for a preferred one.
+    """
+    if method == "rule_based":
+        if residency is not None:
+            return RuleBasedSpeakerSelector(agent_configs, prefer=residency.is_resident, warm=residency.warm,
+                                            max_preferred_streak=max_preferred_streak)
+        return RuleBasedSpeakerSelector(agent_configs)
+    logger.info(f"Using AutoGen speaker selection method '{method}'")
+    return method
@@ -0,0 +1,217 @@
+"""
+Durable Redis work queue for project intake.
+Tasks are JSON payloads on the 'aria_queue:{priority}' lists that
+tools.queue_task already writes to. Consumers claim a task by atomically
+moving it to a processing list and holding a lease; tasks whose lease
+expires (crashed or stuck worker) are redelivered, and tasks that keep
+failing are moved to a dead-letter list.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from loguru import logger
+from typing import Any, Dict, List, Optional, Sequence
+
+PRIORITIES = ("high", "normal", "low")
+
+
+class QueuedTask:
+    """A claimed task: its decoded payload plus the raw entry in the processing list."""
+
+    def __init__(self, raw: str, priority: Optional[str] = None):
+        self.raw = raw
+        self.data: Dict[str, Any] = json.loads(raw)
+        self.priority = priority or self.data.get("priority", "normal")
+
+    @property
+    def id(self) -> str:
+        return self.data["task_id"]
+
+    @property
+    def attempts(self) -> int:
+        return self.data.get("attempts", 0)
+
+
+class TaskQueue:
+    """
+    Reliable queue on top of plain Redis lists.
+
+    Keys (with the default prefix):
+        aria_queue:{priority}  -> ready tasks; producers LPUSH, consumers pop from the right
+        aria_queue:notify      -> wake-up token for blocked consumers (at most one)
+        aria_queue:processing  -> claimed, unacknowledged tasks
+        aria_queue:leases      -> sorted set task_id -> lease deadline
+        aria_queue:dead        -> tasks that exhausted their attempts
+
+    Claiming uses RPOPLPUSH, so a task is always in exactly one list and a
+    crash between claim and lease only delays redelivery.
+    """
+
+    def __init__(self, redis_client, prefix: str = "aria_queue",
+                 priorities: Sequence[str] = PRIORITIES, visibility_timeout: float = 300,
+                 max_attempts: int = 3):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.priorities = tuple(priorities)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.processing_key = f"{prefix}:processing"
+        self.leases_key = f"{prefix}:leases"
+        self.dead_key = f"{prefix}:dead"
+        self.notify_key = f"{prefix}:notify"
+
+    def queue_key(self, priority: str) -> str:
+        return f"{self.prefix}:{priority}"
+
+    def enqueue(self, description: str, priority: str = "normal", **fields) -> str:
+        """
+        Adds a task and wakes up one blocked consumer.
+
+        Args:
+            description: Task or project description.
+            priority: One of the configured priorities.
+            **fields: Extra payload fields (e.g. user, channel).
+
+        Returns:
+            The task ID.
+        """
+        if priority not in self.priorities:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {self.priorities}")
+        task_id = f"task:{os.urandom(4).hex()}"
+        task = {
+            "task_id": task_id,
+            "description": description,
+            "timestamp": datetime.now().isoformat(),
+            "status": "queued",
+            "priority": priority,
+            "attempts": 0,
+            **fields,
+        }
+        self._push(task, priority)
+        return task_id
+
+    def _push(self, task: Dict[str, Any], priority: str, pipe=None):
+        pipe = pipe or self.redis.pipeline()
+        pipe.lpush(self.queue_key(priority), json.dumps(task))
+        self._notify(pipe)
+        pipe.execute()
+
+    def _notify(self, pipe):
+        # One pending token is enough to wake a consumer; more would only
+        # make idle consumers poll instead of blocking
+        pipe.lpush(self.notify_key, "1")
+        pipe.ltrim(self.notify_key, 0, 0)
+
+    def _has_ready(self) -> bool:
+        return any(self.redis.llen(self.queue_key(priority)) for priority in self.priorities)
+
+    def _try_claim(self) -> Optional[QueuedTask]:
+        for priority in self.priorities:
+            raw = self.redis.rpoplpush(self.queue_key(priority), self.processing_key)
+            if raw is not None:
+                task = QueuedTask(raw, priority)
+                self.redis.zadd(self.leases_key, {task.id: time.time() + self.visibility_timeout})
+                return task
+        return None
+
+    def claim(self, timeout: float = 5) -> Optional[QueuedTask]:
+        """
+        Claims the next task, highest priority first, waiting up to `timeout` seconds.
+
+        Returns:
+            The claimed task, or None if the queue stayed empty.
+        """
+        task = self._try_claim()
+        if task is not None:
+            return task
+        # Tokens only wake consumers up; a missed or extra token costs one poll
+        self.redis.brpop(self.notify_key, timeout=max(1, int(timeout)))
+        task = self._try_claim()
+        # Only one token is kept, so pass the wake-up on while tasks are waiting
+        if task is not None and self._has_ready():
+            pipe = self.redis.pipeline()
+            self._notify(pipe)
+            pipe.execute()
+        return task
+
+    def extend(self, task: QueuedTask):
+        """Renews the lease of a task that is still being worked on."""
+        self.redis.zadd(self.leases_key, {task.id: time.time() + self.visibility_timeout})
+
+    def ack(self, task: QueuedTask):
+        """Removes a successfully processed task."""
+        pipe = self.redis.pipeline()
+        pipe.lrem(self.processing_key, 1, task.raw)
+        pipe.zrem(self.leases_key, task.id)
+        removed, _ = pipe.execute()
+        if not removed:
+            logger.warning(f"Task {task.id} was acknowledged after its lease expired "
+                           f"and may run again")
+
+    def fail(self, task: QueuedTask, error: str):
+        """
+        Returns a failed task to its queue, or dead-letters it after max_attempts.
+
+        Args:
+            task: The claimed task.
+            error: Description of the failure, stored with the task.
+        """
+        # Only the caller that removes the entry may requeue it, so a task
+        # failed by its worker and by the lease reaper is not duplicated
+        if not self.redis.lrem(self.processing_key, 1, task.raw):
+            logger.warning(f"Task {task.id} is no longer in the processing list")
+            return
+        data = dict(task.data, attempts=task.attempts + 1, last_error=error)
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.leases_key, task.id)
+        if data["attempts"] >= self.max_attempts:
+            data["status"] = "dead"
+            pipe.lpush(self.dead_key, json.dumps(data))
+            pipe.execute()
+            logger.error(f"Task {task.id} dead-lettered after {data['attempts']} attempts: {error}")
+        else:
+            data["status"] = "queued"
+            self._push(data, task.priority, pipe)
+            logger.warning(f"Task {task.id} failed (attempt {data['attempts']}/{self.max_attempts}), "
+                           f"requeued: {error}")
+
+    def requeue_expired(self) -> int:
+        """
+        Redelivers claimed tasks whose lease has expired.
+
+        A task in the processing list without a lease (claimer died right
+        after claiming) is given a fresh lease first.
+
+        Returns:
+            The number of tasks requeued or dead-lettered.
+        """
+        now = time.time()
+        requeued = 0
+        for raw in self.redis.lrange(self.processing_key, 0, -1):
+            try:
+                task = QueuedTask(raw)
+            except (ValueError, AttributeError):
+                task = None
+            if task is None or "task_id" not in task.data:
+                logger.error(f"Dropping malformed task from processing list: {raw[:200]}")
+                self.redis.lrem(self.processing_key, 1, raw)
+                continue
+            deadline = self.redis.zscore(self.leases_key, task.id)
+            if deadline is None:
+                self.extend(task)
+            elif deadline < now:
+                self.fail(task, "visibility timeout expired")
+                requeued += 1
+        return requeued
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the length of every queue list."""
+        stats = {priority: self.redis.llen(self.queue_key(priority)) for priority in self.priorities}
+        stats["processing"] = self.redis.llen(self.processing_key)
+        stats["dead"] = self.redis.llen(self.dead_key)
+        return stats
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Returns the most recent dead-lettered tasks."""
+        return [json.loads(raw) for raw in self.redis.lrange(self.dead_key, 0, limit - 1)]
@@ -0,0 +1,37 @@
+"""Shared fixtures: the repo root on sys.path, benchmarks/fakes.py fakes and a fake clock."""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.fakes import FakeRedis  # noqa: E402
+
+
+class FakeClock:
+    """Stand-in for the `time` module whose clock only moves when advanced."""
+
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
@@ -0,0 +1,96 @@
+"""Tests for git_batch.LocalBareRepoBackend and the commit_files tool on a temporary bare repository."""
+import shutil
+import subprocess
+
+import pytest
+
+from git_batch import LocalBareRepoBackend, get_backend
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(repo, *args) -> str:
+    return subprocess.run(["git", f"--git-dir={repo}", *args], capture_output=True, text=True,
+                          check=True).stdout.strip()
+
+
+@pytest.fixture
+def repos_dir(tmp_path):
+    path = tmp_path / "repos"
+    path.mkdir()
+    return path
+
+
+def test_first_commit_creates_the_bare_repository(repos_dir):
+    repo = repos_dir / "app.git"
+    result = LocalBareRepoBackend(str(repo)).commit(
+        {"README.md": "# App\n", "backend/main.py": "print('hi')\n"}, "Initial commit")
+
+    assert git(repo, "rev-parse", "--is-bare-repository") == "true"
+    assert git(repo, "rev-parse", "refs/heads/main") == result["sha"]
+    assert git(repo, "symbolic-ref", "HEAD") == "refs/heads/main"
+    assert git(repo, "ls-tree", "-r", "--name-only", "main").splitlines() == ["README.md", "backend/main.py"]
+    assert git(repo, "show", "main:backend/main.py") == "print('hi')"
+    assert git(repo, "log", "-1", "--format=%s", "main") == "Initial commit"
+
+
+def test_later_commit_keeps_files_and_has_one_parent(repos_dir):
+    repo = repos_dir / "app.git"
+    backend = LocalBareRepoBackend(str(repo))
+    first = backend.commit({"a.py": "a = 1\n", "b.py": "b = 1\n"}, "First")
+    second = backend.commit({"b.py": "b = 2\n", "c.py": "c = 1\n"}, "Second")
+
+    assert git(repo, "rev-parse", f"{second['sha']}^") == first["sha"]
+    assert git(repo, "rev-list", "--count", "main") == "2"
+    assert git(repo, "ls-tree", "-r", "--name-only", "main").splitlines() == ["a.py", "b.py", "c.py"]
+    assert git(repo, "show", "main:b.py") == "b = 2"
+
+
+def test_commit_to_another_branch(repos_dir):
+    repo = repos_dir / "app.git"
+    backend = LocalBareRepoBackend(str(repo))
+    main = backend.commit({"a.py": "a = 1\n"}, "Main")
+    feature = backend.commit({"a.py": "a = 2\n"}, "Feature", branch="feature")
+
+    assert git(repo, "rev-parse", "refs/heads/main") == main["sha"]
+    assert git(repo, "show", "feature:a.py") == "a = 2"
+    assert feature["url"] == f"{repo}@{feature['sha']}"
+
+
+@pytest.mark.parametrize("name", ["app.git", "nested/app.git"])
+def test_file_urls_resolve_below_repos_dir(repos_dir, name):
+    backend = get_backend(f"file://{name}", repos_dir=str(repos_dir))
+
+    assert isinstance(backend, LocalBareRepoBackend)
+    assert backend.path == str((repos_dir / name).resolve())
+
+
+def test_absolute_path_inside_repos_dir_is_allowed(repos_dir):
+    backend = get_backend(str(repos_dir / "app.git"), repos_dir=str(repos_dir))
+
+    assert backend.path == str((repos_dir / "app.git").resolve())
+
+
+@pytest.mark.parametrize("name", ["file://../outside.git", "file:///tmp/outside.git", "/tmp/outside.git",
+                                  "file://."])
+def test_paths_outside_repos_dir_are_rejected(repos_dir, name):
+    with pytest.raises(ValueError):
+        get_backend(name, repos_dir=str(repos_dir))
+    assert not (repos_dir.parent / "outside.git").exists()
+
+
+def test_local_repositories_are_disabled_without_repos_dir():
+    with pytest.raises(ValueError):
+        get_backend("file://app.git")
+
+
+def test_commit_files_tool_commits_in_one_commit(repos_dir, monkeypatch):
+    import tools
+    monkeypatch.setattr(tools.registry, "_config", {"github": {"local_repos_dir": str(repos_dir)}})
+
+    message = tools.commit_files("file://app.git", {"a.py": "a = 1\n", "b.py": "b = 1\n"}, "Deliver")
+    assert message.startswith("Successfully committed 2 files")
+    assert git(repos_dir / "app.git", "rev-list", "--count", "main") == "1"
+
+    refused = tools.commit_files("/tmp/elsewhere.git", {"a.py": "a = 1\n"}, "Deliver")
+    assert refused.startswith("Error:") and "outside" in refused
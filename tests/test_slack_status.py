@@ -0,0 +1,211 @@
+"""Tests for slack_status.SlackStatus against benchmarks/fakes.FakeSlackClient."""
+import asyncio
+import time
+
+import pytest
+
+import slack_status
+from benchmarks.fakes import FakeSlackApiError, FakeSlackClient
+from slack_status import SlackStatus, StatusMessage, TokenBucket
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_updates_within_the_window_are_coalesced():
+    slack = FakeSlackClient()
+
+    async def scenario():
+        status = SlackStatus(slack, {"coalesce_window": 0.2})
+        for i in range(10):
+            status.update("p1", "C1", f"step {i}")
+        assert await status.drain(timeout=5)
+        return status
+
+    status = run(scenario())
+    assert slack.posted == 1 and slack.updated == 0
+    assert list(slack.messages.values()) == ["step 9"]
+    assert status.stats()["coalesced"] == 9
+
+
+def test_later_updates_edit_the_message_after_the_window():
+    slack = FakeSlackClient()
+
+    async def scenario():
+        status = SlackStatus(slack, {"coalesce_window": 0.2})
+        status.update("p1", "C1", "first")
+        assert await status.drain(timeout=5)
+        started = time.monotonic()
+        status.update("p1", "C1", "second")
+        assert await status.drain(timeout=5)
+        return time.monotonic() - started
+
+    elapsed = run(scenario())
+    assert elapsed >= 0.15
+    assert slack.posted == 1 and slack.updated == 1
+    assert list(slack.messages.values()) == ["second"]
+
+
+def test_updates_without_client_or_channel_are_ignored():
+    async def scenario():
+        status = SlackStatus(FakeSlackClient())
+        status.update("p1", None, "text")
+        SlackStatus(None).update("p1", "C1", "text")
+        return status
+
+    assert run(scenario()).stats()["requested"] == 0
+
+
+def test_post_sends_separate_messages():
+    slack = FakeSlackClient()
+
+    async def scenario():
+        status = SlackStatus(slack, {"burst": 5})
+        status.post("C1", "one")
+        status.post("C1", "two")
+        assert await status.drain(timeout=5)
+        return status
+
+    status = run(scenario())
+    assert sorted(slack.messages.values()) == ["one", "two"]
+    assert status.messages == {}
+
+
+class TestTokenBucket:
+    @pytest.fixture(autouse=True)
+    def fake_time(self, clock, monkeypatch):
+        monkeypatch.setattr(slack_status, "time", clock)
+
+    def test_burst_then_rate(self, clock):
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        for _ in range(3):
+            assert bucket.wait_time() == 0
+            bucket.take()
+        assert bucket.wait_time() == pytest.approx(0.5)
+        clock.advance(0.5)
+        assert bucket.wait_time() == 0
+
+    def test_refill_is_capped_at_capacity(self, clock):
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        clock.advance(60)
+        for _ in range(2):
+            assert bucket.wait_time() == 0
+            bucket.take()
+        assert bucket.wait_time() == pytest.approx(1.0)
+
+    def test_block_overrides_available_tokens(self, clock):
+        bucket = TokenBucket(rate=10.0, capacity=10)
+        bucket.block(30)
+        assert bucket.wait_time() == pytest.approx(30)
+        clock.advance(30)
+        assert bucket.wait_time() == 0
+
+
+class RateLimitedSlack(FakeSlackClient):
+    """Answers the first `limited` calls with HTTP 429."""
+
+    def __init__(self, limited: int, retry_after: str = "7"):
+        super().__init__()
+        self.limited = limited
+        self.retry_after = retry_after
+
+    async def chat_postMessage(self, channel, text, **kwargs):
+        if self.limited:
+            self.limited -= 1
+            self.rate_limited += 1
+            raise FakeSlackApiError("ratelimited", 429, {"Retry-After": self.retry_after})
+        return await super().chat_postMessage(channel, text, **kwargs)
+
+
+def test_retry_after_blocks_the_channel(clock, monkeypatch):
+    monkeypatch.setattr(slack_status, "time", clock)
+    slack = RateLimitedSlack(limited=1)
+    status = SlackStatus(slack)
+    message = StatusMessage("p1", "C1", window=1.0)
+    message.text = "hello"
+
+    run(status._send(message))
+    assert status.rate_limited == 1
+    assert message.dirty and message.attempts == 0
+    assert status._bucket("C1").wait_time() == pytest.approx(7)
+
+    clock.advance(7)
+    assert status._bucket("C1").wait_time() == 0
+    run(status._send(message))
+    assert not message.dirty
+    assert list(slack.messages.values()) == ["hello"]
+
+
+def test_other_errors_are_retried_then_given_up(clock, monkeypatch):
+    monkeypatch.setattr(slack_status, "time", clock)
+
+    class BrokenSlack(FakeSlackClient):
+        async def chat_postMessage(self, channel, text, **kwargs):
+            raise RuntimeError("channel_not_found")
+
+    status = SlackStatus(BrokenSlack(), {"max_retries": 2})
+    message = StatusMessage("p1", "C1", window=1.0)
+    message.text = "hello"
+    for attempt in (1, 2):
+        run(status._send(message))
+        assert message.dirty and message.attempts == attempt
+        assert message.due == pytest.approx(clock.time() + 2 ** attempt)
+    run(status._send(message))
+    assert not message.dirty
+    assert status.failed == 1
+
+
+def test_final_update_is_forgotten_once_sent():
+    slack = FakeSlackClient()
+
+    async def scenario():
+        status = SlackStatus(slack)
+        status.update("p1/turn-1", "C1", "partial")
+        status.update("p1/turn-1", "C1", "complete", final=True)
+        assert "p1/turn-1" in status.messages
+        assert await status.drain(timeout=5)
+        return status
+
+    status = run(scenario())
+    assert status.messages == {}
+    assert list(slack.messages.values()) == ["complete"]
+
+
+def test_finish_keeps_a_message_until_its_text_is_sent():
+    async def scenario():
+        status = SlackStatus(FakeSlackClient())
+        status.update("p1", "C1", "running")
+        status.finish("p1")
+        pending = "p1" in status.messages
+        assert await status.drain(timeout=5)
+        return pending, status
+
+    pending, status = run(scenario())
+    assert pending
+    assert status.messages == {}
+
+
+def test_finish_forgets_a_sent_message_immediately():
+    async def scenario():
+        status = SlackStatus(FakeSlackClient())
+        status.update("p1", "C1", "done")
+        assert await status.drain(timeout=5)
+        assert "p1" in status.messages
+        status.finish("p1")
+        return status
+
+    assert run(scenario()).messages == {}
+
+
+def test_pending_messages_beyond_the_limit_are_dropped():
+    async def scenario():
+        status = SlackStatus(FakeSlackClient(), {"max_messages": 2, "burst": 5})
+        for key in ("a", "b", "c"):
+            status.update(key, "C1", key)
+        stats = status.stats()
+        await status.drain(timeout=5)
+        return stats
+
+    stats = run(scenario())
+    assert stats["dropped"] == 1 and stats["pending"] == 2
@@ -0,0 +1,166 @@
+"""Tests for task_queue.TaskQueue against the in-memory FakeRedis."""
+import json
+import threading
+
+import pytest
+
+import task_queue
+from task_queue import TaskQueue
+
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    """Leases expire only when the test advances the clock."""
+    monkeypatch.setattr(task_queue, "time", clock)
+
+
+@pytest.fixture
+def queue(redis):
+    return TaskQueue(redis, visibility_timeout=60, max_attempts=3)
+
+
+def test_claims_highest_priority_first(queue):
+    low = queue.enqueue("low", priority="low")
+    normal = queue.enqueue("normal")
+    high = queue.enqueue("high", priority="high")
+
+    assert [queue.claim(timeout=1).id for _ in range(3)] == [high, normal, low]
+    assert queue.claim(timeout=1) is None
+
+
+def test_same_priority_is_first_in_first_out(queue):
+    first = queue.enqueue("first")
+    second = queue.enqueue("second")
+
+    assert queue.claim(timeout=1).id == first
+    assert queue.claim(timeout=1).id == second
+
+
+def test_unknown_priority_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("x", priority="urgent")
+
+
+def test_claim_moves_task_to_processing_with_lease(queue, redis, clock):
+    task_id = queue.enqueue("build", user="u1", channel="C1")
+    task = queue.claim(timeout=1)
+
+    assert task.data["user"] == "u1"
+    assert queue.stats()["processing"] == 1
+    assert redis.zscore(queue.leases_key, task_id) == clock.time() + 60
+
+
+def test_ack_removes_task_and_lease(queue, redis):
+    task_id = queue.enqueue("build")
+    task = queue.claim(timeout=1)
+    queue.ack(task)
+
+    assert queue.stats() == {"high": 0, "normal": 0, "low": 0, "processing": 0, "dead": 0}
+    assert redis.zscore(queue.leases_key, task_id) is None
+
+
+def test_expired_lease_is_requeued(queue, clock):
+    task_id = queue.enqueue("build")
+    queue.claim(timeout=1)
+    clock.advance(59)
+    assert queue.requeue_expired() == 0
+
+    clock.advance(2)
+    assert queue.requeue_expired() == 1
+    assert queue.stats()["processing"] == 0
+
+    task = queue.claim(timeout=1)
+    assert task.id == task_id
+    assert task.attempts == 1
+    assert task.data["last_error"] == "visibility timeout expired"
+
+
+def test_extend_keeps_lease_alive(queue, clock):
+    queue.enqueue("build")
+    task = queue.claim(timeout=1)
+    clock.advance(50)
+    queue.extend(task)
+    clock.advance(50)
+
+    assert queue.requeue_expired() == 0
+    assert queue.stats()["processing"] == 1
+
+
+def test_claimed_task_without_lease_gets_one(queue, redis):
+    queue.enqueue("build")
+    task = queue.claim(timeout=1)
+    redis.zrem(queue.leases_key, task.id)
+
+    assert queue.requeue_expired() == 0
+    assert redis.zscore(queue.leases_key, task.id) is not None
+
+
+def test_failed_task_is_requeued_with_its_priority(queue):
+    queue.enqueue("build", priority="high")
+    task = queue.claim(timeout=1)
+    queue.fail(task, "boom")
+
+    assert queue.stats()["high"] == 1
+    retried = queue.claim(timeout=1)
+    assert retried.attempts == 1
+    assert retried.priority == "high"
+
+
+def test_dead_letter_after_max_attempts(queue):
+    task_id = queue.enqueue("build")
+    for attempt in range(3):
+        task = queue.claim(timeout=1)
+        assert task.attempts == attempt
+        queue.fail(task, f"error {attempt}")
+
+    assert queue.claim(timeout=1) is None
+    stats = queue.stats()
+    assert stats["dead"] == 1 and stats["processing"] == 0
+    dead = queue.dead_letters()
+    assert dead[0]["task_id"] == task_id
+    assert dead[0]["status"] == "dead"
+    assert dead[0]["attempts"] == 3
+    assert dead[0]["last_error"] == "error 2"
+
+
+def test_fail_after_reaper_does_not_duplicate(queue, clock):
+    queue.enqueue("build")
+    task = queue.claim(timeout=1)
+    clock.advance(61)
+    queue.requeue_expired()
+    queue.fail(task, "late failure")
+
+    assert queue.stats()["normal"] == 1
+
+
+def test_notify_list_keeps_a_single_token(queue, redis):
+    for i in range(10):
+        queue.enqueue(f"task {i}")
+
+    assert redis.llen(queue.notify_key) == 1
+
+
+def test_malformed_processing_entries_are_dropped(queue, redis):
+    redis.lpush(queue.processing_key, "not json", json.dumps({"description": "no id"}))
+
+    assert queue.requeue_expired() == 0
+    assert queue.stats()["processing"] == 0
+
+
+def test_blocked_consumer_wakes_up_on_enqueue(queue, redis):
+    claimed = []
+    waiting = threading.Event()
+    brpop = redis.brpop
+
+    def signalling_brpop(*args, **kwargs):
+        waiting.set()
+        return brpop(*args, **kwargs)
+
+    redis.brpop = signalling_brpop
+    consumer = threading.Thread(target=lambda: claimed.append(queue.claim(timeout=30)))
+    consumer.start()
+    assert waiting.wait(5)
+    task_id = queue.enqueue("build")
+    consumer.join(timeout=10)
+
+    assert claimed and claimed[0].id == task_id
@@ -0,0 +1,230 @@
+"""
+Token-level streaming of agent replies while they are generated.
+Deltas from the Ollama client are coalesced per agent turn and sent to the
+dashboard as 'chat_delta' events every flush interval, and one Slack
+message per turn is edited in place at a slower interval (through
+slack_status.py), so users see the first tokens instead of waiting for the
+finished reply.
+"""
+import asyncio
+import time
+from loguru import logger
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class Turn:
+    """Streamed text of one agent reply."""
+
+    def __init__(self, agent: str, number: int, started: float):
+        self.agent = agent
+        self.number = number
+        # When the previous message was sent, i.e. when users started waiting for this one
+        self.started = started
+        self.first_token: Optional[float] = None
+        # Not yet sent to the dashboard
+        self.pending: List[str] = []
+        self.pending_chars = 0
+        self.seq = 0
+        self.chars = 0
+        self.truncated = False
+        self.reset = False
+        self.done = False
+        # Tail of the reply shown in Slack
+        self.text = ""
+
+
+class TokenStreamer:
+    """
+    Coalescing publisher of streamed agent output for one project session.
+
+    The make_callback() callbacks and end_turn() are safe to call from any
+    thread (the Ollama client runs on its own event loop) and never block:
+    when a turn has more than max_buffer pending characters, the oldest
+    pending text is dropped and the next event is flagged 'truncated'.
+    """
+
+    def __init__(self, send: Callable[[str, Dict[str, Any]], Awaitable[None]], slack=None,
+                 channel: Optional[str] = None, flush_interval: float = 0.1, slack_interval: float = 2.0,
+                 max_buffer: int = 8192, slack_max_chars: int = 3000):
+        """
+        Args:
+            send: Coroutine taking (event_type, data), e.g. AriaCEO._broadcast_to_dashboard.
+            slack: SlackStatus that edits the turn messages; None disables the Slack live edit.
+            channel: Slack channel of the project.
+            flush_interval: Seconds deltas are coalesced before a 'chat_delta' event.
+            slack_interval: Minimum seconds between two edits of a turn's Slack message.
+            max_buffer: Maximum pending characters per turn before the oldest are dropped.
+            slack_max_chars: Characters of the reply (its tail) shown in Slack.
+        """
+        self.send = send
+        self.slack = slack
+        self.channel = channel
+        self.flush_interval = flush_interval
+        self.slack_interval = slack_interval
+        self.max_buffer = max(1, max_buffer)
+        self.slack_max_chars = slack_max_chars
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.project_id = None
+        self.turns: Dict[str, Turn] = {}
+        self.turn_count = 0
+        self.events = 0
+        self.dropped_chars = 0
+        self._finished: List[Turn] = []
+        self._last_sent = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self, project_id: str):
+        """Starts the background flusher for a project. Must be called from the event loop."""
+        self.loop = asyncio.get_running_loop()
+        self.project_id = project_id
+        self.turns = {}
+        self.turn_count = 0
+        self.events = 0
+        self.dropped_chars = 0
+        self._finished = []
+        self._last_sent = time.monotonic()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Ends open turns, flushes everything and stops the flusher."""
+        if not self._task:
+            return
+        for agent in list(self.turns):
+            self._end_turn(agent)
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+        logger.info(f"Token stream for {self.project_id} closed: {self.turn_count} turns, "
+                    f"{self.events} delta events, {self.dropped_chars} characters dropped")
+
+    # --- Producers (any thread) ---
+
+    def make_callback(self, agent_name: str) -> Callable[[Optional[str]], None]:
+        """
+        Returns the on_delta callback for an agent's model client.
+
+        The callback takes a text delta, or None when the streamed attempt
+        failed and its text is superseded by a fallback route.
+        """
+        def on_delta(text: Optional[str]):
+            if self.loop and not self.loop.is_closed() and self._task:
+                self.loop.call_soon_threadsafe(self._delta, agent_name, text)
+        return on_delta
+
+    def end_turn(self, agent_name: str):
+        """Marks an agent's current reply as complete."""
+        if self.loop and not self.loop.is_closed() and self._task:
+            self.loop.call_soon_threadsafe(self._end_turn, agent_name)
+
+    def make_hook(self):
+        """
+        Returns an AutoGen 'process_message_before_send' hook that ends the
+        sender's streamed turn when its reply is sent.
+        """
+        def hook(sender, message, recipient, silent):
+            self.end_turn(getattr(sender, 'name', 'Unknown'))
+            return message
+        return hook
+
+    # --- Event loop ---
+
+    def _delta(self, agent: str, text: Optional[str]):
+        turn = self.turns.get(agent)
+        if turn is None:
+            if text is None:
+                return
+            self.turn_count += 1
+            turn = self.turns[agent] = Turn(agent, self.turn_count, self._last_sent)
+        if text is None:
+            turn.pending, turn.pending_chars = [], 0
+            turn.text = ""
+            turn.chars = 0
+            turn.reset = True
+            turn.truncated = False
+        else:
+            if turn.first_token is None:
+                turn.first_token = time.monotonic()
+            turn.pending.append(text)
+            turn.pending_chars += len(text)
+            turn.chars += len(text)
+            turn.text = (turn.text + text)[-self.slack_max_chars:]
+            while turn.pending_chars > self.max_buffer and len(turn.pending) > 1:
+                dropped = turn.pending.pop(0)
+                turn.pending_chars -= len(dropped)
+                self.dropped_chars += len(dropped)
+                turn.truncated = True
+        self._wakeup.set()
+
+    def _end_turn(self, agent: str):
+        self._last_sent = time.monotonic()
+        turn = self.turns.pop(agent, None)
+        if turn is None:
+            return
+        turn.done = True
+        self._finished.append(turn)
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            stopping = self._stopping
+            if not stopping:
+                # Coalesce the deltas that arrive within the flush interval
+                await asyncio.sleep(self.flush_interval)
+            finished, self._finished = self._finished, []
+            for turn in finished + list(self.turns.values()):
+                await self._flush(turn)
+            if stopping:
+                return
+
+    async def _flush(self, turn: Turn):
+        if not (turn.pending or turn.reset or turn.done):
+            return
+        delta = "".join(turn.pending)
+        turn.pending, turn.pending_chars = [], 0
+        data = {
+            'project_id': self.project_id,
+            'agent': turn.agent,
+            'turn': turn.number,
+            'seq': turn.seq,
+            'delta': delta,
+            'done': turn.done,
+        }
+        if turn.reset:
+            data['reset'] = True
+            turn.reset = False
+        if turn.truncated:
+            data['truncated'] = True
+            turn.truncated = False
+        if turn.seq == 0 and turn.first_token is not None:
+            data['first_token_seconds'] = round(turn.first_token - turn.started, 3)
+        if turn.done:
+            data['chars'] = turn.chars
+        turn.seq += 1
+        if self.slack:
+            self._edit_slack(turn)
+        try:
+            await self.send('chat_delta', data)
+            self.events += 1
+        except Exception as e:
+            logger.warning(f"Error streaming delta to dashboard: {e}")
+
+    def _edit_slack(self, turn: Turn):
+        key = f"{self.project_id}/turn-{turn.number}"
+        if not turn.text:
+            if turn.done:
+                self.slack.finish(key)
+            return
+        ellipsis = "…" if len(turn.text) >= self.slack_max_chars else ""
+        marker = "" if turn.done else " …"
+        self.slack.update(key, self.channel,
+                          f":speech_balloon: *{turn.agent}*\n{ellipsis}{turn.text}{marker}",
+                          window=self.slack_interval, final=turn.done)
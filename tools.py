@@ -3,24 +3,22 @@ Tool functions for Aria CEO agents.
 These functions are registered as available skills for the agents.
 """
 import os
-import json
 import subprocess
 from datetime import datetime
 from loguru import logger
-from github import Github
-import docker
-import requests # Added for potential future use in deploy_to_cloud or similar
-from redis import Redis
-from pymongo import MongoClient
-# import pylint.lint # Not needed, using subprocess
-# import pytest # Not needed, using subprocess
+from typing import Dict
+from clients import registry
+from git_batch import get_backend
+from task_queue import TaskQueue
+from mongo_writer import writer as mongo_writer
+from qa_runner import SandboxError, format_lint, format_tests, get_runner as get_qa_runner
+from knowledge_base import get_knowledge_base
 
-# --- Configuration (Placeholders - MUST be set via environment variables in production) ---
-GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "YOUR_GITHUB_TOKEN")
-REDIS_HOST = os.environ.get("REDIS_HOST")
-REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379)) if os.environ.get("REDIS_PORT") else None
-MONGO_URI = os.environ.get("MONGO_URI")
-MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "aria_logs")
+# --- Configuration ---
+# Redis, MongoDB, GitHub and Docker clients come from the shared registry in
+# clients.py, which reads config.yaml (GITHUB_TOKEN etc. remain env fallbacks).
+# Upper bound for subprocess-based tools; the child is killed when it expires
+SUBPROCESS_TIMEOUT = int(os.environ.get("ARIA_SUBPROCESS_TIMEOUT", 1800))
 
 # --- 1. GitHub Tools (PyGithub) ---
 
@@ -37,8 +35,7 @@ def fetch_specs(repo_name: str, file_path: str, branch: str = "main") -> str:
         The content of the file as a string, or an error message.
     """
     try:
-        g = Github(GITHUB_TOKEN)
-        repo = g.get_repo(repo_name)
+        repo = registry.github().get_repo(repo_name)
         contents = repo.get_contents(file_path, ref=branch)
         
         # contents is a ContentFile object, need to decode the content
@@ -62,8 +59,7 @@ def commit_code(repo_name: str, file_path: str, content: str, commit_message: st
         A success message with the commit URL or an error message.
     """
     try:
-        g = Github(GITHUB_TOKEN)
-        repo = g.get_repo(repo_name)
+        repo = registry.github().get_repo(repo_name)
         
         try:
             # Try to get the existing file to update it
@@ -90,6 +86,32 @@ def commit_code(repo_name: str, file_path: str, content: str, commit_message: st
         logger.error(f"GitHub commit_code failed: {e}")
         return f"Error: Could not commit code to GitHub. {e}"
 
+def commit_files(repo_name: str, files: Dict[str, str], commit_message: str, branch: str = "main") -> str:
+    """
+    Commits many files at once as a single commit (one tree, one commit).
+    Prefer this over repeated commit_code calls when delivering a project.
+    
+    Args:
+        repo_name: The full repository name (e.g., 'TheRealByteCommander/aria-ceo-v6.3'),
+                   or 'file://<name>.git' for a local bare repository in github.local_repos_dir.
+        files: Mapping of file path to file content (e.g., {'backend/main.py': '...'}).
+        commit_message: The commit message.
+        branch: The branch to commit to (default: 'main').
+        
+    Returns:
+        A success message with the commit URL or an error message.
+    """
+    if not files:
+        return "Error: No files given to commit."
+    try:
+        backend = get_backend(repo_name, registry.github,
+                              (registry.config.get('github', {}) or {}).get('local_repos_dir'))
+        result = backend.commit(files, commit_message, branch)
+        return f"Successfully committed {len(files)} files in one commit. Commit URL: {result['url']}"
+    except Exception as e:
+        logger.error(f"Batch commit_files failed: {e}")
+        return f"Error: Could not commit files. {e}"
+
 # --- 2. Redis Tools (for task queuing) ---
 
 def queue_task(task_description: str, priority: str = "normal") -> str:
@@ -104,18 +126,9 @@ def queue_task(task_description: str, priority: str = "normal") -> str:
         A confirmation message with the task ID.
     """
     try:
-        r = Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-        task_id = f"task:{os.urandom(4).hex()}"
-        queue_name = f"aria_queue:{priority}"
-        
-        task_data = {
-            "task_id": task_id,
-            "description": task_description,
-            "timestamp": datetime.now().isoformat(),
-            "status": "queued"
-        }
-        
-        r.lpush(queue_name, json.dumps(task_data))
+        queue = TaskQueue(registry.redis())
+        task_id = queue.enqueue(task_description, priority)
+        queue_name = queue.queue_key(priority)
         
         return f"Task successfully queued with ID {task_id} in queue '{queue_name}'."
     except Exception as e:
@@ -137,10 +150,6 @@ def log_test_result_to_mongo(project_name: str, test_summary: str, status: str)
         A confirmation message with the MongoDB document ID.
     """
     try:
-        client = MongoClient(MONGO_URI)
-        db = client[MONGO_DB_NAME]
-        collection = db["test_results"]
-        
         log_data = {
             "project_name": project_name,
             "test_summary": test_summary,
@@ -148,12 +157,13 @@ def log_test_result_to_mongo(project_name: str, test_summary: str, status: str)
             "timestamp": datetime.now()
         }
         
-        result = collection.insert_one(log_data)
+        # Buffered: written with the next batch (or spilled to disk if MongoDB is down)
+        document_id = mongo_writer.write("test_results", log_data)
         
-        return f"Test result successfully logged to MongoDB. Document ID: {result.inserted_id}"
+        return f"Test result successfully logged to MongoDB. Document ID: {document_id}"
     except Exception as e:
         logger.error(f"MongoDB log_test_result_to_mongo failed: {e}")
-        return f"Error: Could not log test result to MongoDB. Please check MONGO_URI. {e}"
+        return f"Error: Could not log test result to MongoDB. Please check the mongodb settings in config.yaml. {e}"
 
 # --- 4. Backend Tools (Sam) ---
 
@@ -205,7 +215,8 @@ def build_frontend(project_path: str, build_command: str = "npm run build") -> s
             cwd=project_path,
             capture_output=True,
             text=True,
-            check=False
+            check=False,
+            timeout=SUBPROCESS_TIMEOUT
         )
         
         if result.returncode == 0:
@@ -215,25 +226,96 @@ def build_frontend(project_path: str, build_command: str = "npm run build") -> s
             
     except FileNotFoundError:
         return f"Error: Build command or project path not found. Command: {build_command}"
+    except subprocess.TimeoutExpired:
+        return f"Error: Frontend build timed out after {SUBPROCESS_TIMEOUT} seconds."
     except Exception as e:
         logger.error(f"Frontend build failed: {e}")
         return f"Error during frontend build: {e}"
 
 # --- 6. QA Tools (Taylor) ---
 
-def run_integration_tests(test_suite: str, environment: str = "docker") -> str:
+def run_pylint_analysis(project_path: str, files: list = None) -> str:
+    """
+    Lints the project's Python files with pylint (parallel jobs, sandboxed).
+    Files whose content did not change since an earlier run are not re-linted.
+    
+    Args:
+        project_path: The project directory (absolute or relative to the projects directory).
+        files: Optional list of file paths relative to the project; default is all .py files.
+        
+    Returns:
+        A summary of the pylint findings or an error message.
+    """
+    try:
+        return format_lint(get_qa_runner(registry.config).lint(project_path, files))
+    except SandboxError as e:
+        return f"Error: {e}"
+    except subprocess.TimeoutExpired:
+        return f"Error: pylint timed out."
+    except Exception as e:
+        logger.error(f"Pylint analysis failed: {e}")
+        return f"Error during pylint analysis: {e}"
+
+def run_pytest(project_path: str, test_path: str = "tests", extra_args: str = "") -> str:
     """
-    Simulates running a full suite of integration or end-to-end tests.
+    Runs the project's tests with pytest, spread across cores with pytest-xdist
+    when it is installed. Test files are skipped when neither they nor the
+    project sources changed since an earlier run.
     
     Args:
-        test_suite: Identifier for the test suite to run.
-        environment: The environment where tests are run (e.g., 'docker', 'staging').
+        project_path: The project directory (absolute or relative to the projects directory).
+        test_path: Test directory or file relative to the project (default: 'tests').
+        extra_args: Additional pytest arguments (e.g. '-k health').
         
     Returns:
-        A summary of the integration test results.
+        A summary of the test results or an error message.
     """
-    # This is a simulation/placeholder. Actual implementation would involve running a Docker container with tests.
-    return f"Integration tests for suite '{test_suite}' executed in '{environment}' environment. Result: 85% coverage, 9/10 tests passed."
+    try:
+        return format_tests(get_qa_runner(registry.config).test(project_path, test_path, extra_args))
+    except SandboxError as e:
+        return f"Error: {e}"
+    except subprocess.TimeoutExpired:
+        return f"Error: pytest timed out."
+    except Exception as e:
+        logger.error(f"Pytest run failed: {e}")
+        return f"Error during pytest run: {e}"
+
+def run_integration_tests(project_path: str, test_suite: str = "tests/integration", environment: str = "docker") -> str:
+    """
+    Runs integration tests of a project. With environment 'docker' the project's
+    docker-compose.yml is started first and stopped afterwards; results are
+    never cached because they depend on the running services.
+    
+    Args:
+        project_path: The project directory (absolute or relative to the projects directory).
+        test_suite: Test directory or file relative to the project (default: 'tests/integration').
+        environment: 'docker' (start docker-compose services) or 'local'.
+        
+    Returns:
+        A summary of the integration test results or an error message.
+    """
+    try:
+        runner = get_qa_runner(registry.config)
+        root = runner.resolve_project(project_path)
+        compose_file = root / "docker-compose.yml"
+        if environment == "docker" and not compose_file.exists():
+            return f"Error: {compose_file} not found, cannot run integration tests in 'docker' environment."
+        if environment == "docker":
+            started = run_docker_compose(str(compose_file), "up -d --build --wait")
+            if "successful" not in started:
+                return started
+        try:
+            return format_tests(runner.test(str(root), test_suite, use_cache=False))
+        finally:
+            if environment == "docker":
+                run_docker_compose(str(compose_file), "down")
+    except SandboxError as e:
+        return f"Error: {e}"
+    except subprocess.TimeoutExpired:
+        return f"Error: Integration tests timed out."
+    except Exception as e:
+        logger.error(f"Integration tests failed: {e}")
+        return f"Error during integration tests: {e}"
 
 # --- 7. DevOps Tools (Morgan) ---
 
@@ -249,7 +331,7 @@ def build_docker_image(path: str, tag: str) -> str:
         A success message with the image ID or an error message.
     """
     try:
-        client = docker.from_env()
+        client = registry.docker()
         
         # Build the image and stream the output
         image, logs = client.images.build(path=path, tag=tag)
@@ -282,7 +364,8 @@ def run_docker_compose(compose_file_path: str, action: str = "up -d") -> str:
             command.split(),
             capture_output=True,
             text=True,
-            check=False
+            check=False,
+            timeout=SUBPROCESS_TIMEOUT
         )
         
         if result.returncode == 0:
@@ -292,6 +375,8 @@ def run_docker_compose(compose_file_path: str, action: str = "up -d") -> str:
             
     except FileNotFoundError:
         return f"Error: Docker Compose command not found."
+    except subprocess.TimeoutExpired:
+        return f"Error: Docker Compose command '{action}' timed out after {SUBPROCESS_TIMEOUT} seconds."
     except Exception as e:
         logger.error(f"Docker Compose failed: {e}")
         return f"Error during Docker Compose operation: {e}"
@@ -337,18 +422,31 @@ def generate_readme(project_summary: str, features: list, setup_steps: list) ->
 
 # --- 9. Research Tools (Riley) ---
 
-def search_best_practices(topic: str) -> str:
+def search_best_practices(topic: str, max_results: int = 3) -> str:
     """
-    Simulates searching a local knowledge base (e.g., MongoDB/FAISS) for best practices on a given topic.
+    Searches the local knowledge base (docs and past project READMEs) for best practices on a given topic.
     
     Args:
         topic: The topic to search for (e.g., 'JWT best practices', 'FastAPI error handling').
+        max_results: Maximum number of passages to return (default: 3).
         
     Returns:
-        A summary of the best practices found.
+        The most relevant passages with their sources, or an error message.
     """
-    # This is a simulation/placeholder. Actual implementation would involve a vector store query.
-    return f"Best practices for '{topic}' found: Always validate input, use least privilege principle, and implement rate limiting."
+    try:
+        results = get_knowledge_base(registry.config).search(topic, max_results)
+    except Exception as e:
+        logger.error(f"Knowledge base search failed: {e}")
+        return f"Error searching the knowledge base: {e}"
+    if not results:
+        return f"No best practices found for '{topic}' (is the knowledge base built? run `python knowledge_base.py ingest`)."
+    
+    answer = f"Best practices for '{topic}' ({len(results)} passages from the local knowledge base):\n"
+    for i, result in enumerate(results, 1):
+        source = os.path.basename(result['source'])
+        heading = f" > {result['heading']}" if result['heading'] else ""
+        answer += f"\n{i}. [{source}{heading}] (relevance {result['score']:.2f})\n{result['text'][:800]}\n"
+    return answer
 
 # --- 10. Utility Tools (Git CLI) ---
 
@@ -368,12 +466,15 @@ def git_clone(repo_url: str, target_dir: str) -> str:
             ["git", "clone", repo_url, target_dir],
             check=True,
             capture_output=True,
-            text=True
+            text=True,
+            timeout=SUBPROCESS_TIMEOUT
         )
         return f"Successfully cloned {repo_url} into {target_dir}"
     except subprocess.CalledProcessError as e:
         logger.error(f"Git clone failed: {e.stderr}")
         return f"Error cloning repository: {e.stderr}"
+    except subprocess.TimeoutExpired:
+        return f"Error cloning repository: timed out after {SUBPROCESS_TIMEOUT} seconds."
     except Exception as e:
         logger.error(f"Git clone failed: {e}")
         return f"Error cloning repository: {e}"
@@ -393,12 +494,15 @@ def git_push(branch: str = "main") -> str:
             ["git", "push", "origin", branch],
             check=True,
             capture_output=True,
-            text=True
+            text=True,
+            timeout=SUBPROCESS_TIMEOUT
         )
         return f"Successfully pushed branch {branch} to remote."
     except subprocess.CalledProcessError as e:
         logger.error(f"Git push failed: {e.stderr}")
         return f"Error pushing to remote: {e.stderr}"
+    except subprocess.TimeoutExpired:
+        return f"Error pushing to remote: timed out after {SUBPROCESS_TIMEOUT} seconds."
     except Exception as e:
         logger.error(f"Git push failed: {e}")
         return f"Error pushing to remote: {e}"
@@ -0,0 +1,200 @@
+"""
+Project intake workers.
+Runs N worker processes that claim project tasks from the Redis queue
+(task_queue.py) and execute them as AriaCEO sessions. Interrupted projects
+are resumed from their checkpoint when their task is redelivered.
+
+Usage:
+    python worker.py --workers 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from loguru import logger
+
+from aria_ceo import AriaCEO
+from clients import registry as client_registry
+from task_queue import TaskQueue
+
+try:
+    from slack_sdk.web.async_client import AsyncWebClient
+    SLACK_AVAILABLE = True
+except ImportError:
+    SLACK_AVAILABLE = False
+
+
+def project_id_for(task) -> str:
+    """Deterministic project ID, so a redelivered task finds its checkpoint."""
+    return f"project-{task.id.split(':')[-1]}"
+
+
+def _slack_client():
+    token = os.environ.get("SLACK_BOT_TOKEN")
+    if token and SLACK_AVAILABLE:
+        return AsyncWebClient(token=token)
+    logger.warning("Worker running without Slack client (SLACK_BOT_TOKEN or slack_sdk missing)")
+    return None
+
+
+class ProjectWorker:
+    """
+    Claims tasks and runs up to `sessions` projects concurrently in one AriaCEO.
+
+    Leases are renewed while a project runs; on success the task is
+    acknowledged, on error it is retried or dead-lettered by the queue.
+    """
+
+    def __init__(self, worker_id: int, aria: AriaCEO, queue: TaskQueue, config: dict):
+        self.worker_id = worker_id
+        self.aria = aria
+        self.queue = queue
+        self.sessions = max(1, config.get('sessions_per_worker', 1))
+        self.poll_timeout = config.get('poll_timeout', 5)
+        self.heartbeat_interval = config.get('heartbeat_interval', 60)
+        self.reap_interval = config.get('reap_interval', 30)
+        self._stopping = False
+        self._running = set()
+
+    def stop(self):
+        """Stops claiming new tasks; running projects are finished."""
+        logger.info(f"Worker {self.worker_id} stopping after {len(self._running)} running project(s)")
+        self._stopping = True
+
+    async def _heartbeat(self, task):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await asyncio.to_thread(self.queue.extend, task)
+
+    async def _process(self, task):
+        project_id = project_id_for(task)
+        data = task.data
+        heartbeat = asyncio.create_task(self._heartbeat(task))
+        try:
+            if project_id in self.aria.pending_projects():
+                result = await self.aria.resume(project_id)
+            else:
+                result = await self.aria.handle_project(
+                    data['description'], data.get('user'), data.get('channel'), project_id=project_id,
+                )
+            await asyncio.to_thread(self.queue.ack, task)
+            logger.info(f"Worker {self.worker_id} finished {task.id} ({result.get('status')})")
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} failed {task.id}: {e}")
+            await asyncio.to_thread(self.queue.fail, task, str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def run(self):
+        """Claims and processes tasks until stop() is called."""
+        slots = asyncio.Semaphore(self.sessions)
+        last_reap = 0.0
+        logger.info(f"Worker {self.worker_id} started ({self.sessions} concurrent project(s))")
+        while not self._stopping:
+            await slots.acquire()
+            if time.monotonic() - last_reap >= self.reap_interval:
+                last_reap = time.monotonic()
+                requeued = await asyncio.to_thread(self.queue.requeue_expired)
+                if requeued:
+                    logger.warning(f"Requeued {requeued} task(s) with expired leases")
+            try:
+                task = await asyncio.to_thread(self.queue.claim, self.poll_timeout)
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} could not claim a task: {e}")
+                task = None
+                await asyncio.sleep(self.poll_timeout)
+            if task is None:
+                slots.release()
+                continue
+            logger.info(f"Worker {self.worker_id} claimed {task.id} "
+                        f"(priority {task.priority}, attempt {task.attempts + 1})")
+            job = asyncio.create_task(self._process(task))
+            self._running.add(job)
+            job.add_done_callback(lambda finished: (self._running.discard(finished), slots.release()))
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+
+async def run_worker(worker_id: int):
+    """Entry point of one worker process."""
+    # One metrics endpoint per worker process: base port + worker ID
+    base_port = client_registry.config.get('metrics', {}).get('port', 9109)
+    os.environ.setdefault("ARIA_METRICS_PORT", str(base_port + worker_id))
+    aria = AriaCEO(slack_client=_slack_client())
+    queue_config = aria.config.get('queue', {})
+    queue = TaskQueue(
+        client_registry.redis(),
+        prefix=queue_config.get('prefix', 'aria_queue'),
+        visibility_timeout=queue_config.get('visibility_timeout', 300),
+        max_attempts=queue_config.get('max_attempts', 3),
+    )
+    worker = ProjectWorker(worker_id, aria, queue, queue_config)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        # Last progress edits and completion messages still go out
+        await aria.slack_status.drain(aria.config.get('slack', {}).get('drain_timeout', 10))
+        aria.shutdown()
+
+
+def _worker_main(worker_id: int):
+    asyncio.run(run_worker(worker_id))
+
+
+def supervise(workers: int, restart_delay: float = 5):
+    """
+    Runs `workers` worker processes and restarts any that exit unexpectedly.
+
+    Args:
+        workers: Number of worker processes.
+        restart_delay: Seconds to wait before restarting a crashed worker.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    stopping = False
+
+    def start(worker_id):
+        process = context.Process(target=_worker_main, args=(worker_id,), name=f"aria-worker-{worker_id}")
+        process.start()
+        processes[worker_id] = process
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for worker_id in range(workers):
+        start(worker_id)
+    logger.info(f"Started {workers} project worker(s)")
+
+    while not stopping:
+        time.sleep(1)
+        for worker_id, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"Worker {worker_id} exited with code {process.exitcode}, "
+                               f"restarting in {restart_delay}s")
+                time.sleep(restart_delay)
+                start(worker_id)
+
+    for process in processes.values():
+        process.join()
+    logger.info("All project workers stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aria CEO project intake workers")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: queue.workers in config.yaml)")
+    args = parser.parse_args()
+    workers = args.workers or client_registry.config.get('queue', {}).get('workers', 1)
+    supervise(workers)